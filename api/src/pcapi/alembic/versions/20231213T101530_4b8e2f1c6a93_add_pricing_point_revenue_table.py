@@ -0,0 +1,30 @@
+"""
+Add pricing_point_revenue table
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# pre/post deployment: pre
+# revision identifiers, used by Alembic.
+revision = "4b8e2f1c6a93"
+down_revision = "ce93f52f9f59"
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.create_table(
+        "pricing_point_revenue",
+        sa.Column("id", sa.BigInteger(), autoincrement=True, nullable=False),
+        sa.Column("pricingPointId", sa.BigInteger(), nullable=False),
+        sa.Column("year", sa.Integer(), nullable=False),
+        sa.Column("revenue", sa.BigInteger(), nullable=False),
+        sa.ForeignKeyConstraint(["pricingPointId"], ["venue.id"]),
+        sa.PrimaryKeyConstraint("id"),
+        sa.UniqueConstraint("pricingPointId", "year", name="unique_pricing_point_revenue_per_year"),
+    )
+
+
+def downgrade() -> None:
+    op.drop_table("pricing_point_revenue")
@@ -0,0 +1,88 @@
+"""
+Add offer_daily_booking_count table, maintained by a trigger on `booking`
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# pre/post deployment: pre
+# revision identifiers, used by Alembic.
+revision = "7c1d5e9a2b48"
+down_revision = "4b8e2f1c6a93"
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.create_table(
+        "offer_daily_booking_count",
+        sa.Column("id", sa.BigInteger(), autoincrement=True, nullable=False),
+        sa.Column("offerId", sa.BigInteger(), nullable=False),
+        sa.Column("ean", sa.Text(), nullable=True),
+        sa.Column("day", sa.Date(), nullable=False),
+        sa.Column("bookingCount", sa.Integer(), nullable=False),
+        sa.ForeignKeyConstraint(["offerId"], ["offer.id"], ondelete="CASCADE"),
+        sa.PrimaryKeyConstraint("id"),
+        sa.UniqueConstraint("offerId", "day", name="unique_offer_daily_booking_count"),
+    )
+    op.create_index(
+        "ix_offer_daily_booking_count_ean_day",
+        "offer_daily_booking_count",
+        ["ean", "day"],
+        unique=False,
+        postgresql_where=sa.text("ean IS NOT NULL"),
+    )
+    op.execute(
+        """
+        CREATE OR REPLACE FUNCTION update_offer_daily_booking_count()
+        RETURNS TRIGGER AS $$
+        DECLARE
+            booking_row booking%ROWTYPE;
+            delta integer := 0;
+        BEGIN
+            IF TG_OP = 'INSERT' THEN
+                booking_row := NEW;
+                IF NEW.status != 'CANCELLED' THEN
+                    delta := 1;
+                END IF;
+            ELSIF TG_OP = 'DELETE' THEN
+                booking_row := OLD;
+                IF OLD.status != 'CANCELLED' THEN
+                    delta := -1;
+                END IF;
+            ELSE
+                booking_row := NEW;
+                IF OLD.status = 'CANCELLED' AND NEW.status != 'CANCELLED' THEN
+                    delta := 1;
+                ELSIF OLD.status != 'CANCELLED' AND NEW.status = 'CANCELLED' THEN
+                    delta := -1;
+                END IF;
+            END IF;
+
+            IF delta != 0 AND booking_row."dateCreated" >= timezone('utc', now()) - INTERVAL '31 days' THEN
+                INSERT INTO offer_daily_booking_count ("offerId", ean, day, "bookingCount")
+                SELECT offer.id, COALESCE(product."extraData"->>'ean', offer."extraData"->>'ean'), booking_row."dateCreated"::date, delta
+                FROM stock
+                JOIN offer ON offer.id = stock."offerId"
+                LEFT OUTER JOIN product ON product.id = offer."productId"
+                WHERE stock.id = booking_row."stockId"
+                ON CONFLICT ("offerId", day) DO UPDATE
+                SET "bookingCount" = offer_daily_booking_count."bookingCount" + EXCLUDED."bookingCount";
+            END IF;
+            RETURN NULL;
+        END;
+        $$ LANGUAGE plpgsql;
+
+        DROP TRIGGER IF EXISTS booking_update_offer_daily_booking_count ON booking;
+        CREATE TRIGGER booking_update_offer_daily_booking_count
+        AFTER INSERT OR UPDATE OF status OR DELETE ON booking
+        FOR EACH ROW EXECUTE PROCEDURE update_offer_daily_booking_count();
+        """
+    )
+
+
+def downgrade() -> None:
+    op.execute("DROP TRIGGER IF EXISTS booking_update_offer_daily_booking_count ON booking")
+    op.execute("DROP FUNCTION IF EXISTS update_offer_daily_booking_count")
+    op.drop_index("ix_offer_daily_booking_count_ean_day", table_name="offer_daily_booking_count")
+    op.drop_table("offer_daily_booking_count")
@@ -0,0 +1,58 @@
+"""
+Add trigram indexes on unaccented name, type and city (and postal code) of educational institutions
+"""
+from alembic import op
+
+
+# pre/post deployment: pre
+# revision identifiers, used by Alembic.
+revision = "3e9f0a7b5c21"
+down_revision = "7c1d5e9a2b48"
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    # `unaccent()` is only STABLE (it depends on the search path), so it
+    # cannot be used in an index: this wrapper specifies the dictionary.
+    op.execute(
+        """
+        CREATE OR REPLACE FUNCTION immutable_unaccent(text)
+        RETURNS text AS $$
+            SELECT public.unaccent('public.unaccent', $1)
+        $$ LANGUAGE sql IMMUTABLE PARALLEL SAFE STRICT;
+        """
+    )
+    op.execute("COMMIT")
+    op.execute(
+        """
+        CREATE INDEX CONCURRENTLY IF NOT EXISTS "ix_educational_institution_trgm_unaccent_name"
+        ON educational_institution USING gin (immutable_unaccent(name) gin_trgm_ops);
+        """
+    )
+    op.execute(
+        """
+        CREATE INDEX CONCURRENTLY IF NOT EXISTS "ix_educational_institution_trgm_unaccent_institutionType"
+        ON educational_institution USING gin (immutable_unaccent("institutionType") gin_trgm_ops);
+        """
+    )
+    op.execute(
+        """
+        CREATE INDEX CONCURRENTLY IF NOT EXISTS "ix_educational_institution_trgm_unaccent_city"
+        ON educational_institution USING gin (immutable_unaccent(city) gin_trgm_ops);
+        """
+    )
+    op.execute(
+        """
+        CREATE INDEX CONCURRENTLY IF NOT EXISTS "ix_educational_institution_trgm_postalCode"
+        ON educational_institution USING gin ("postalCode" gin_trgm_ops);
+        """
+    )
+
+
+def downgrade() -> None:
+    op.execute('DROP INDEX IF EXISTS "ix_educational_institution_trgm_postalCode"')
+    op.execute('DROP INDEX IF EXISTS "ix_educational_institution_trgm_unaccent_city"')
+    op.execute('DROP INDEX IF EXISTS "ix_educational_institution_trgm_unaccent_institutionType"')
+    op.execute('DROP INDEX IF EXISTS "ix_educational_institution_trgm_unaccent_name"')
+    op.execute("DROP FUNCTION IF EXISTS immutable_unaccent")
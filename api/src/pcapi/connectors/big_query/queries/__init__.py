@@ -3,7 +3,6 @@ from .adage_playlists import LocalOfferersQuery  # noqa: F401
 from .adage_playlists import NewTemplateOffersPlaylist  # noqa: F401
 from .favorites_not_booked import FavoritesNotBooked  # noqa: F401
 from .favorites_not_booked import FavoritesNotBookedModel  # noqa: F401
-from .last_30_days_booking import Last30DaysBookings  # noqa: F401
 from .offerer_stats import OffererViewsPerDay  # noqa: F401
 from .offerer_stats import OffersData
 from .pro_email_churned_40_days_ago import ChurnedProEmail  # noqa: F401
@@ -1,17 +1,25 @@
 import datetime
 import logging
+import re
+import secrets
+import tempfile
 import typing
 
 import sentry_sdk
 import sqlalchemy as sa
 from sqlalchemy.orm import joinedload
 
+from pcapi import settings
 from pcapi.analytics.amplitude import events as amplitude_events
+from pcapi.core import object_storage
 from pcapi.core import search
 from pcapi.core.bookings.models import Booking
 from pcapi.core.bookings.models import BookingCancellationReasons
+from pcapi.core.bookings.models import BookingExportType
 from pcapi.core.bookings.models import BookingStatus
 from pcapi.core.bookings.models import ExternalBooking
+from pcapi.core.bookings.models import OfferDailyBookingCount
+import pcapi.core.bookings.repository as bookings_repository
 from pcapi.core.bookings.repository import generate_booking_token
 from pcapi.core.educational import utils as educational_utils
 from pcapi.core.educational.models import CollectiveBooking
@@ -53,6 +61,7 @@ from pcapi.tasks.serialization.external_api_booking_notification_tasks import Bo
 from pcapi.tasks.serialization.external_api_booking_notification_tasks import ExternalApiBookingNotificationRequest
 from pcapi.utils import queue
 import pcapi.utils.cinema_providers as cinema_providers_utils
+from pcapi.workers import booking_job
 from pcapi.workers import push_notification_job
 from pcapi.workers import user_emails_job
 
@@ -67,6 +76,18 @@ from .exceptions import BookingIsAlreadyUsed
 logger = logging.getLogger(__name__)
 
 QR_CODE_PASS_CULTURE_VERSION = "v3"
+BOOKINGS_EXPORT_FOLDER = "bookings_exports"
+BOOKINGS_EXPORT_CONTENT_TYPES = {
+    BookingExportType.CSV: "text/csv; charset=utf-8",
+    BookingExportType.EXCEL: "application/vnd.openxmlformats-officedocument.spreadsheetml.sheet",
+}
+BOOKINGS_EXPORT_EXTENSIONS = {
+    BookingExportType.CSV: "csv",
+    BookingExportType.EXCEL: "xlsx",
+}
+# Tokens are generated by `secrets.token_urlsafe()`.
+BOOKINGS_EXPORT_TOKEN_RE = re.compile(r"[\w-]+")
+BOOKINGS_EXPORT_FILENAME_RE = re.compile(r"\w+\.\w+")
 
 
 def _is_ended_booking(booking: Booking) -> bool:
@@ -309,26 +330,66 @@ def book_offer(
             "stock_quantity": stock.quantity,
         },
     )
-    amplitude_events.track_book_offer_event(booking)
-    _send_external_booking_notification_if_necessary(booking, BookingAction.BOOK)
+    # Side effects are run by a background job, so that we can return
+    # the response as soon as the booking has been committed. They
+    # are not batched here: indexation and external attributes are
+    # only enqueued by the job, and processed by batches elsewhere.
+    booking_job.run_book_offer_side_effects_job.delay(booking.id, BOOK_OFFER_SIDE_EFFECTS, first_venue_booking)
 
+    return booking
+
+
+def _send_new_booking_email_to_pro(booking: Booking, first_venue_booking: bool) -> None:
     if not transactional_mails.send_user_new_booking_to_pro_email(booking, first_venue_booking):
         logger.warning(
             "Could not send booking confirmation email to offerer",
             extra={"booking": booking.id},
         )
+
+
+def _send_booking_confirmation_email_to_beneficiary(booking: Booking, first_venue_booking: bool) -> None:
     if not transactional_mails.send_individual_booking_confirmation_email_to_beneficiary(booking):
         logger.warning("Could not send booking=%s confirmation email to beneficiary", booking.id)
 
-    search.async_index_offer_ids(
-        [stock.offerId],
+
+_BOOK_OFFER_SIDE_EFFECT_FUNCTIONS: dict[str, typing.Callable[[Booking, bool], None]] = {
+    "amplitude": lambda booking, _: amplitude_events.track_book_offer_event(booking),
+    "external_booking_notification": lambda booking, _: _send_external_booking_notification_if_necessary(
+        booking, BookingAction.BOOK
+    ),
+    "pro_email": _send_new_booking_email_to_pro,
+    "beneficiary_email": _send_booking_confirmation_email_to_beneficiary,
+    "indexation": lambda booking, _: search.async_index_offer_ids(
+        [booking.stock.offerId],
         reason=search.IndexationReason.BOOKING_CREATION,
-    )
+    ),
+    "external_user": lambda booking, _: update_external_user(booking.user),
+    "external_pro": lambda booking, _: update_external_pro(booking.stock.offer.venue.bookingEmail),
+}
+BOOK_OFFER_SIDE_EFFECTS = list(_BOOK_OFFER_SIDE_EFFECT_FUNCTIONS)
 
-    update_external_user(booking.user)
-    update_external_pro(stock.offer.venue.bookingEmail)
 
-    return booking
+def run_book_offer_side_effects(
+    booking: Booking,
+    side_effects: typing.Iterable[str],
+    first_venue_booking: bool,
+) -> list[str]:
+    """Run the given side effects of a new booking (see
+    `BOOK_OFFER_SIDE_EFFECTS`) and return those that failed.
+
+    A side effect that fails does not prevent others from running.
+    """
+    failed = []
+    for side_effect in side_effects:
+        try:
+            _BOOK_OFFER_SIDE_EFFECT_FUNCTIONS[side_effect](booking, first_venue_booking)
+        except Exception as exc:  # pylint: disable=broad-except
+            failed.append(side_effect)
+            logger.exception(
+                "Could not run side effect of new booking",
+                extra={"booking": booking.id, "side_effect": side_effect, "exc": str(exc)},
+            )
+    return failed
 
 
 def _book_cinema_external_ticket(booking: Booking, stock: Stock, beneficiary: User) -> None:
@@ -797,6 +858,49 @@ def recompute_dnBookedQuantity(stock_ids: list[int]) -> None:
     db.session.execute(query, {"stock_ids": tuple(stock_ids)})
 
 
+def recompute_offer_daily_booking_counts() -> None:
+    """Recompute the daily booking counts of all offers from the
+    `booking` table (for the last `OFFER_DAILY_BOOKING_COUNT_RETENTION`
+    days).
+
+    Counts are maintained by a trigger on `booking`: this function
+    should only be needed to initialize the table. The table is locked
+    until the transaction is committed, which blocks new bookings and
+    cancellations in the meantime.
+
+    Changes are not commited within this function, use db.session.commit() if necessary.
+    """
+    db.session.execute("LOCK TABLE offer_daily_booking_count IN EXCLUSIVE MODE")
+    db.session.execute("DELETE FROM offer_daily_booking_count")
+    query = f"""
+      INSERT INTO offer_daily_booking_count ("offerId", ean, day, "bookingCount")
+      SELECT
+        offer.id,
+        COALESCE(product."extraData"->>'ean', offer."extraData"->>'ean'),
+        booking."dateCreated"::date,
+        COUNT(booking.id)
+      FROM booking
+      JOIN stock ON stock.id = booking."stockId"
+      JOIN offer ON offer.id = stock."offerId"
+      LEFT OUTER JOIN product ON product.id = offer."productId"
+      WHERE
+        booking."dateCreated" >= :since
+        AND booking.status != '{BookingStatus.CANCELLED.value}'
+      GROUP BY 1, 2, 3
+    """
+    since = datetime.datetime.utcnow() - constants.OFFER_DAILY_BOOKING_COUNT_RETENTION
+    db.session.execute(query, {"since": since})
+
+
+def delete_old_offer_daily_booking_counts() -> None:
+    oldest_day = (datetime.datetime.utcnow() - constants.OFFER_DAILY_BOOKING_COUNT_RETENTION).date()
+    deleted = OfferDailyBookingCount.query.filter(OfferDailyBookingCount.day < oldest_day).delete(
+        synchronize_session=False
+    )
+    db.session.commit()
+    logger.info("Deleted old daily booking counts of offers", extra={"deleted": deleted})
+
+
 def auto_mark_as_used_after_event() -> None:
     """Automatically mark as used bookings that correspond to events that
     have happened (with a delay).
@@ -1022,3 +1126,100 @@ def cancel_unstored_external_bookings() -> None:
                     int(external_booking_info["venue_id"]),
                     [external_booking_info["barcode"]],
                 )
+
+
+def write_csv_export(chunks: typing.Iterable[str], output: typing.BinaryIO) -> None:
+    for chunk in utils.encode_csv_chunks(chunks):
+        output.write(chunk)
+
+
+def store_and_send_bookings_export(
+    user: User,
+    write_export: typing.Callable[[typing.BinaryIO], None],
+    filename: str,
+    export_type: BookingExportType,
+    is_collective: bool = False,
+) -> str:
+    """Write an export of bookings to a temporary file, store it in
+    the private object storage and send its link to the user. Return
+    the URL of the export.
+
+    The export holds personal data of beneficiaries: it can only be
+    downloaded by the user who requested it (see
+    `open_bookings_export()`), until it is deleted by
+    `delete_expired_bookings_exports()`.
+
+    The file is streamed to the object storage: it is never loaded in
+    memory as a whole.
+    """
+    token = secrets.token_urlsafe(32)
+    export_filename = f"{filename}.{BOOKINGS_EXPORT_EXTENSIONS[export_type]}"
+    with tempfile.TemporaryFile() as output:
+        write_export(output)
+        size = output.tell()
+        output.seek(0)
+        object_storage.store_private_file(
+            folder=BOOKINGS_EXPORT_FOLDER,
+            object_id=_get_bookings_export_object_id(user, token, export_filename),
+            file=output,
+            content_type=BOOKINGS_EXPORT_CONTENT_TYPES[export_type],
+        )
+    url = f"{settings.API_URL}/bookings/exports/{token}/{export_filename}"
+    logger.info(
+        "Stored bookings export",
+        extra={
+            "user_id": user.id,
+            "export_type": export_type.value,
+            "is_collective": is_collective,
+            "size": size,
+        },
+    )
+    transactional_mails.send_bookings_export_ready_email(user, url, is_collective=is_collective)
+    return url
+
+
+def _get_bookings_export_object_id(user: User, token: str, filename: str) -> str:
+    # Exports are stored by user, so that a user can only open theirs.
+    return f"{user.id}/{token}/{filename}"
+
+
+def open_bookings_export(user: User, token: str, filename: str) -> tuple[typing.BinaryIO, str]:
+    """Return a file object to read an export of bookings of the given
+    user, and its content type. Raise `FileNotFoundError` if the user
+    has no such export (or if it has expired).
+    """
+    if not BOOKINGS_EXPORT_TOKEN_RE.fullmatch(token) or not BOOKINGS_EXPORT_FILENAME_RE.fullmatch(filename):
+        raise FileNotFoundError(filename)
+    export_types = {extension: export_type for export_type, extension in BOOKINGS_EXPORT_EXTENSIONS.items()}
+    export_type = export_types.get(filename.rsplit(".", 1)[1])
+    if not export_type:
+        raise FileNotFoundError(filename)
+    content_type = BOOKINGS_EXPORT_CONTENT_TYPES[export_type]
+    object_id = _get_bookings_export_object_id(user, token, filename)
+    return object_storage.open_private_object(BOOKINGS_EXPORT_FOLDER, object_id), content_type
+
+
+def delete_expired_bookings_exports() -> None:
+    oldest_date = datetime.datetime.utcnow() - constants.BOOKINGS_EXPORT_RETENTION
+    deleted = 0
+    for object_id, date_created in object_storage.list_private_objects(BOOKINGS_EXPORT_FOLDER):
+        if date_created < oldest_date:
+            object_storage.delete_private_object(BOOKINGS_EXPORT_FOLDER, object_id)
+            deleted += 1
+    logger.info("Deleted expired bookings exports", extra={"deleted": deleted})
+
+
+def export_bookings(user: User, filters: dict, export_type: BookingExportType) -> str:
+    """Export bookings of the offerers of the user that match
+    `filters` (see `bookings_repository.get_export_query()`), and send
+    the link to the file to the user.
+    """
+    query = bookings_repository.get_export_query(user=user, **filters)
+
+    def write_export(output: typing.BinaryIO) -> None:
+        if export_type == BookingExportType.EXCEL:
+            bookings_repository.write_excel_report(query, output)
+        else:
+            write_csv_export(bookings_repository.iter_csv_report(query), output)
+
+    return store_and_send_bookings_export(user, write_export, "reservations_pass_culture", export_type)
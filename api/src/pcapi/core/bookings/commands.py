@@ -1,5 +1,6 @@
 import logging
 
+from pcapi.models import db
 import pcapi.scheduled_tasks.decorators as cron_decorators
 from pcapi.utils.blueprint import Blueprint
 
@@ -14,3 +15,21 @@ logger = logging.getLogger(__name__)
 @cron_decorators.log_cron_with_transaction
 def archive_old_bookings() -> None:
     api.archive_old_bookings()
+
+
+@blueprint.cli.command("delete_old_offer_daily_booking_counts")
+@cron_decorators.log_cron_with_transaction
+def delete_old_offer_daily_booking_counts() -> None:
+    api.delete_old_offer_daily_booking_counts()
+
+
+@blueprint.cli.command("delete_expired_bookings_exports")
+@cron_decorators.log_cron_with_transaction
+def delete_expired_bookings_exports() -> None:
+    api.delete_expired_bookings_exports()
+
+
+@blueprint.cli.command("recompute_offer_daily_booking_counts")
+def recompute_offer_daily_booking_counts() -> None:
+    api.recompute_offer_daily_booking_counts()
+    db.session.commit()
@@ -20,6 +20,10 @@ BOOKS_BOOKINGS_AUTO_EXPIRY_DELAY = datetime.timedelta(days=10)
 BOOKINGS_EXPIRY_NOTIFICATION_DELAY = datetime.timedelta(days=7)
 BOOKS_BOOKINGS_EXPIRY_NOTIFICATION_DELAY = datetime.timedelta(days=5)
 AUTO_USE_AFTER_EVENT_TIME_DELAY = datetime.timedelta(hours=48)
+OFFER_DAILY_BOOKING_COUNT_RETENTION = datetime.timedelta(days=31)
+# Exports of bookings hold personal data of beneficiaries: they are
+# deleted after a few days (see `delete_expired_bookings_exports()`).
+BOOKINGS_EXPORT_RETENTION = datetime.timedelta(days=7)
 REDIS_EXTERNAL_BOOKINGS_NAME = "api:external_bookings:barcodes"
 EXTERNAL_BOOKINGS_MINIMUM_ITEM_AGE_IN_QUEUE = 60
 
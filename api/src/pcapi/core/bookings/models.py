@@ -1,3 +1,4 @@
+from datetime import date
 from datetime import datetime
 import decimal
 from decimal import Decimal
@@ -8,6 +9,7 @@ from sqlalchemy import BigInteger
 from sqlalchemy import Boolean
 from sqlalchemy import Column
 from sqlalchemy import DDL
+from sqlalchemy import Date
 from sqlalchemy import DateTime
 from sqlalchemy import Enum
 from sqlalchemy import ForeignKey
@@ -16,6 +18,7 @@ from sqlalchemy import Integer
 from sqlalchemy import Numeric
 from sqlalchemy import String
 from sqlalchemy import Text
+from sqlalchemy import UniqueConstraint
 from sqlalchemy import and_
 from sqlalchemy import case
 from sqlalchemy import event
@@ -32,6 +35,7 @@ from sqlalchemy.sql.elements import Label
 from pcapi.core.bookings import exceptions
 from pcapi.core.bookings.constants import BOOKINGS_AUTO_EXPIRY_DELAY
 from pcapi.core.bookings.constants import BOOKS_BOOKINGS_AUTO_EXPIRY_DELAY
+from pcapi.core.bookings.constants import OFFER_DAILY_BOOKING_COUNT_RETENTION
 from pcapi.core.categories import subcategories_v2 as subcategories
 import pcapi.core.finance.models as finance_models
 from pcapi.core.offers import models as offers_models
@@ -461,3 +465,79 @@ Booking.trig_update_cancellationDate_on_isCancelled_ddl = f"""
     """
 
 event.listen(Booking.__table__, "after_create", DDL(Booking.trig_update_cancellationDate_on_isCancelled_ddl))
+
+
+class OfferDailyBookingCount(PcObject, Base, Model):
+    """The number of bookings of an offer that have been made on a given
+    day and have not been cancelled since.
+
+    It is maintained by a trigger on the `booking` table (see below)
+    when bookings are made, cancelled, uncancelled or deleted, so that
+    the number of recent bookings of offers (and EANs) is a cheap sum
+    over a few rows. Rows older than `OFFER_DAILY_BOOKING_COUNT_RETENTION`
+    are not updated anymore and are regularly deleted.
+    """
+
+    __tablename__ = "offer_daily_booking_count"
+
+    offerId: int = Column(BigInteger, ForeignKey("offer.id", ondelete="CASCADE"), nullable=False)
+    # Denormalized from `Product.extraData["ean"]` (or `Offer.extraData["ean"]`), to sum bookings by EAN.
+    ean: str | None = Column(Text, nullable=True)
+    day: date = Column(Date, nullable=False)
+    bookingCount: int = Column(Integer, nullable=False)
+
+    __table_args__ = (
+        UniqueConstraint("offerId", "day", name="unique_offer_daily_booking_count"),
+        Index("ix_offer_daily_booking_count_ean_day", ean, day, postgresql_where=ean.isnot(None)),
+    )
+
+
+OfferDailyBookingCount.trig_ddl = f"""
+    CREATE OR REPLACE FUNCTION update_offer_daily_booking_count()
+    RETURNS TRIGGER AS $$
+    DECLARE
+        booking_row booking%ROWTYPE;
+        delta integer := 0;
+    BEGIN
+        IF TG_OP = 'INSERT' THEN
+            booking_row := NEW;
+            IF NEW.status != '{BookingStatus.CANCELLED.value}' THEN
+                delta := 1;
+            END IF;
+        ELSIF TG_OP = 'DELETE' THEN
+            booking_row := OLD;
+            IF OLD.status != '{BookingStatus.CANCELLED.value}' THEN
+                delta := -1;
+            END IF;
+        ELSE
+            booking_row := NEW;
+            IF OLD.status = '{BookingStatus.CANCELLED.value}' AND NEW.status != '{BookingStatus.CANCELLED.value}' THEN
+                delta := 1;
+            ELSIF OLD.status != '{BookingStatus.CANCELLED.value}' AND NEW.status = '{BookingStatus.CANCELLED.value}' THEN
+                delta := -1;
+            END IF;
+        END IF;
+
+        IF delta != 0 AND booking_row."dateCreated" >= timezone('utc', now()) - INTERVAL '{OFFER_DAILY_BOOKING_COUNT_RETENTION.days} days' THEN
+            INSERT INTO offer_daily_booking_count ("offerId", ean, day, "bookingCount")
+            SELECT offer.id, COALESCE(product."extraData"->>'ean', offer."extraData"->>'ean'), booking_row."dateCreated"::date, delta
+            FROM stock
+            JOIN offer ON offer.id = stock."offerId"
+            LEFT OUTER JOIN product ON product.id = offer."productId"
+            WHERE stock.id = booking_row."stockId"
+            ON CONFLICT ("offerId", day) DO UPDATE
+            SET "bookingCount" = offer_daily_booking_count."bookingCount" + EXCLUDED."bookingCount";
+        END IF;
+        RETURN NULL;
+    END;
+    $$ LANGUAGE plpgsql;
+
+    DROP TRIGGER IF EXISTS booking_update_offer_daily_booking_count ON booking;
+
+    CREATE TRIGGER booking_update_offer_daily_booking_count
+    AFTER INSERT OR UPDATE OF status OR DELETE ON booking
+    FOR EACH ROW
+    EXECUTE PROCEDURE update_offer_daily_booking_count()
+    """
+
+event.listen(Booking.__table__, "after_create", DDL(OfferDailyBookingCount.trig_ddl))
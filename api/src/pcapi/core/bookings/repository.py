@@ -53,6 +53,7 @@ from pcapi.utils.token import random_token
 
 
 DUO_QUANTITY = 2
+EXPORT_CHUNK_SIZE = 1000
 
 
 BOOKING_STATUS_LABELS = {
@@ -327,7 +328,7 @@ def get_bookings_from_deposit(deposit_id: int) -> list[Booking]:
     )
 
 
-def get_export(
+def get_export_query(
     user: User,
     booking_period: tuple[date, date] | None = None,
     status_filter: BookingStatusFilter | None = BookingStatusFilter.BOOKED,
@@ -335,8 +336,7 @@ def get_export(
     venue_id: int | None = None,
     offer_id: int | None = None,
     offer_type: OfferType | None = None,
-    export_type: BookingExportType | None = BookingExportType.CSV,
-) -> str | bytes:
+) -> BaseQuery:
     bookings_query = _get_filtered_booking_report(
         pro_user=user,
         period=booking_period,
@@ -346,7 +346,28 @@ def get_export(
         offer_id=offer_id,
         offer_type=offer_type,
     )
-    bookings_query = _duplicate_booking_when_quantity_is_two(bookings_query)
+    return _duplicate_booking_when_quantity_is_two(bookings_query)
+
+
+def get_export(
+    user: User,
+    booking_period: tuple[date, date] | None = None,
+    status_filter: BookingStatusFilter | None = BookingStatusFilter.BOOKED,
+    event_date: date | None = None,
+    venue_id: int | None = None,
+    offer_id: int | None = None,
+    offer_type: OfferType | None = None,
+    export_type: BookingExportType | None = BookingExportType.CSV,
+) -> str | bytes:
+    bookings_query = get_export_query(
+        user=user,
+        booking_period=booking_period,
+        status_filter=status_filter,
+        event_date=event_date,
+        venue_id=venue_id,
+        offer_id=offer_id,
+        offer_type=offer_type,
+    )
     if export_type == BookingExportType.EXCEL:
         return _serialize_excel_report(bookings_query)
     return _serialize_csv_report(bookings_query)
@@ -603,45 +624,61 @@ def _get_booking_status(status: BookingStatus, is_confirmed: bool) -> str:
     return BOOKING_STATUS_LABELS[status]
 
 
-def _serialize_csv_report(query: BaseQuery) -> str:
+def _get_csv_report_row(booking: typing.Any) -> tuple:
+    return (
+        booking.venueName,
+        booking.offerName,
+        convert_booking_dates_utc_to_venue_timezone(booking.stockBeginningDatetime, booking),
+        booking.ean,
+        f"{booking.beneficiaryLastName} {booking.beneficiaryFirstName}",
+        booking.beneficiaryEmail,
+        booking.beneficiaryPhoneNumber,
+        convert_booking_dates_utc_to_venue_timezone(booking.bookedAt, booking),
+        convert_booking_dates_utc_to_venue_timezone(booking.usedAt, booking),
+        booking_recap_utils.get_booking_token(
+            booking.token,
+            booking.status,
+            booking.isExternal,
+            booking.stockBeginningDatetime,
+        ),
+        booking.priceCategoryLabel or "",
+        booking.amount,
+        _get_booking_status(booking.status, booking.isConfirmed),
+        convert_booking_dates_utc_to_venue_timezone(booking.reimbursedAt, booking),
+        # This method is still used in the old Payment model
+        serialize_offer_type_educational_or_individual(offer_is_educational=False),
+        booking.beneficiaryPostalCode or "",
+        "Oui" if booking.quantity == DUO_QUANTITY else "Non",
+    )
+
+
+def iter_csv_report(query: BaseQuery) -> typing.Iterator[str]:
+    """Yield the CSV report in chunks of `EXPORT_CHUNK_SIZE` rows, so
+    that it can be streamed without being fully built in memory.
+    """
     output = StringIO()
     writer = csv.writer(output, dialect=csv.excel, delimiter=";", quoting=csv.QUOTE_NONNUMERIC)
     writer.writerow(BOOKING_EXPORT_HEADER)
-    for booking in query.yield_per(1000):
-        writer.writerow(
-            (
-                booking.venueName,
-                booking.offerName,
-                convert_booking_dates_utc_to_venue_timezone(booking.stockBeginningDatetime, booking),
-                booking.ean,
-                f"{booking.beneficiaryLastName} {booking.beneficiaryFirstName}",
-                booking.beneficiaryEmail,
-                booking.beneficiaryPhoneNumber,
-                convert_booking_dates_utc_to_venue_timezone(booking.bookedAt, booking),
-                convert_booking_dates_utc_to_venue_timezone(booking.usedAt, booking),
-                booking_recap_utils.get_booking_token(
-                    booking.token,
-                    booking.status,
-                    booking.isExternal,
-                    booking.stockBeginningDatetime,
-                ),
-                booking.priceCategoryLabel or "",
-                booking.amount,
-                _get_booking_status(booking.status, booking.isConfirmed),
-                convert_booking_dates_utc_to_venue_timezone(booking.reimbursedAt, booking),
-                # This method is still used in the old Payment model
-                serialize_offer_type_educational_or_individual(offer_is_educational=False),
-                booking.beneficiaryPostalCode or "",
-                "Oui" if booking.quantity == DUO_QUANTITY else "Non",
-            )
-        )
+    for index, booking in enumerate(query.yield_per(EXPORT_CHUNK_SIZE), 1):
+        writer.writerow(_get_csv_report_row(booking))
+        if index % EXPORT_CHUNK_SIZE == 0:
+            yield output.getvalue()
+            output.seek(0)
+            output.truncate()
+    yield output.getvalue()
 
-    return output.getvalue()
 
+def _serialize_csv_report(query: BaseQuery) -> str:
+    return "".join(iter_csv_report(query))
 
-def _serialize_excel_report(query: BaseQuery) -> bytes:
-    output = BytesIO()
-    workbook = xlsxwriter.Workbook(output)
+
+def write_excel_report(query: BaseQuery, output: typing.BinaryIO) -> None:
+    """Write the Excel report to `output`.
+
+    The workbook is written in "constant memory" mode: each row is
+    flushed to a temporary file once the next one is started.
+    """
+    workbook = xlsxwriter.Workbook(output, {"constant_memory": True})
 
     bold = workbook.add_format({"bold": 1})
     currency_format = workbook.add_format({"num_format": "###0.00[$€-fr-FR]"})
@@ -654,7 +691,7 @@ def _serialize_excel_report(query: BaseQuery) -> bytes:
         worksheet.write(row, col_num, title, bold)
         worksheet.set_column(col_num, col_num, col_width)
     row = 1
-    for booking in query.yield_per(1000):
+    for booking in query.yield_per(EXPORT_CHUNK_SIZE):
         worksheet.write(row, 0, booking.venueName)
         worksheet.write(row, 1, booking.offerName)
         worksheet.write(
@@ -690,6 +727,11 @@ def _serialize_excel_report(query: BaseQuery) -> bytes:
         row += 1
 
     workbook.close()
+
+
+def _serialize_excel_report(query: BaseQuery) -> bytes:
+    output = BytesIO()
+    write_excel_report(query, output)
     return output.getvalue()
 
 
@@ -1,3 +1,4 @@
+import codecs
 from datetime import datetime
 from hashlib import sha256
 import hmac
@@ -49,3 +50,12 @@ def convert_booking_dates_utc_to_venue_timezone(
         )
     offerer_department_code = postal_code_utils.PostalCode(booking.offererPostalCode).get_departement_code()
     return _apply_departement_timezone(naive_datetime=date_without_timezone, departement_code=offerer_department_code)
+
+
+def encode_csv_chunks(chunks: typing.Iterable[str]) -> typing.Iterator[bytes]:
+    """Encode chunks of a CSV file in UTF-8, preceded by a BOM so that
+    Excel detects the encoding (as with the "utf-8-sig" codec).
+    """
+    yield codecs.BOM_UTF8
+    for chunk in chunks:
+        yield chunk.encode("utf-8")
@@ -9,7 +9,7 @@ import pcapi.core.finance.repository as finance_repository
 from pcapi.core.offers import repository as offers_repository
 from pcapi.core.offers.models import Offer
 from pcapi.core.offers.models import Stock
-from pcapi.core.users.api import get_domains_credit
+from pcapi.core.users import api as users_api
 from pcapi.core.users.models import User
 from pcapi.models import api_errors
 from pcapi.models import db
@@ -65,7 +65,7 @@ def check_expenses_limits(user: User, requested_amount: Decimal, offer: Offer) -
     """Raise an error if the requested amount would exceed the user's
     expense limits.
     """
-    domains_credit = get_domains_credit(user)
+    domains_credit = users_api.get_domains_credit(user)
     deposit = user.deposit
     if not domains_credit or not deposit:
         raise exceptions.UserHasInsufficientFunds()
@@ -1,12 +1,14 @@
 import datetime
 import decimal
 import logging
+import typing
 
 from pydantic.v1.error_wrappers import ValidationError
 import sqlalchemy as sa
 
 from pcapi.core import search
 from pcapi.core.bookings import models as bookings_models
+import pcapi.core.bookings.api as bookings_api
 from pcapi.core.educational import adage_backends as adage_client
 from pcapi.core.educational import exceptions
 from pcapi.core.educational import models as educational_models
@@ -245,6 +247,50 @@ def get_collective_booking_report(
     return collective_bookings_serialize.serialize_collective_booking_csv_report(bookings_query)
 
 
+def stream_collective_booking_csv_report(
+    user: User,
+    booking_period: tuple[datetime.date, datetime.date] | None = None,
+    status_filter: educational_models.CollectiveBookingStatusFilter
+    | None = educational_models.CollectiveBookingStatusFilter.BOOKED,
+    event_date: datetime.datetime | None = None,
+    venue_id: int | None = None,
+) -> typing.Iterator[str]:
+    bookings_query = educational_repository.get_filtered_collective_booking_report(
+        pro_user=user,
+        period=booking_period,
+        status_filter=status_filter,
+        event_date=event_date,
+        venue_id=venue_id,
+    )
+    return collective_bookings_serialize.iter_collective_booking_csv_report(bookings_query)
+
+
+def export_collective_bookings(user: User, filters: dict, export_type: bookings_models.BookingExportType) -> str:
+    """Export collective bookings of the offerers of the user that
+    match `filters` (see `get_collective_booking_report()`), and send
+    the link to the file to the user.
+    """
+    bookings_query = educational_repository.get_filtered_collective_booking_report(
+        pro_user=user,
+        period=filters["booking_period"],
+        status_filter=filters["status_filter"],
+        event_date=filters["event_date"],
+        venue_id=filters["venue_id"],
+    )
+
+    def write_export(output: typing.BinaryIO) -> None:
+        if export_type == bookings_models.BookingExportType.EXCEL:
+            collective_bookings_serialize.write_collective_booking_excel_report(bookings_query, output)
+        else:
+            bookings_api.write_csv_export(
+                collective_bookings_serialize.iter_collective_booking_csv_report(bookings_query), output
+            )
+
+    return bookings_api.store_and_send_bookings_export(
+        user, write_export, "reservations_eac_pass_culture", export_type, is_collective=True
+    )
+
+
 def get_collective_booking_by_id(booking_id: int) -> educational_models.CollectiveBooking:
     query = educational_models.CollectiveBooking.query.filter(educational_models.CollectiveBooking.id == booking_id)
     query = query.options(
@@ -8,6 +8,8 @@ from pcapi.core.educational import repository as educational_repository
 from pcapi.core.educational.adage_backends import get_adage_educational_institutions
 from pcapi.core.educational.adage_backends.serialize import AdageEducationalInstitution
 from pcapi.core.educational.constants import INSTITUTION_TYPES
+from pcapi.core.educational.institution_directory import institution_directory
+from pcapi.core.educational.institution_directory import invalidate_institution_directory
 from pcapi.core.educational.models import EducationalInstitution
 from pcapi.core.educational.repository import find_educational_year_by_date
 from pcapi.models import db
@@ -17,7 +19,7 @@ import pcapi.utils.postal_code as postal_code_utils
 
 def get_all_educational_institutions(page: int, per_page_limit: int) -> tuple[tuple, int]:
     offset = (per_page_limit * (page - 1)) if page > 0 else 0
-    return educational_repository.get_all_educational_institutions(offset=offset, limit=per_page_limit)
+    return institution_directory.get_page(offset=offset, limit=per_page_limit)
 
 
 def get_educational_institution_department_code(
@@ -118,6 +120,7 @@ def import_deposit_institution_data(
             db.session.add(deposit)
 
     db.session.commit()
+    invalidate_institution_directory()
 
 
 def get_current_year_remaining_credit(institution: educational_models.EducationalInstitution) -> Decimal:
@@ -177,4 +180,5 @@ def create_educational_institution_from_adage(institution: AdageEducationalInsti
     )
 
     repository.save(educational_institution)
+    invalidate_institution_directory()
     return educational_institution
@@ -1,5 +1,6 @@
 import datetime
 from decimal import Decimal
+import functools
 import logging
 import typing
 
@@ -81,7 +82,7 @@ def notify_educational_redactor_on_collective_offer_or_stock_edit(
         )
 
 
-def unindex_expired_collective_offers(process_all_expired: bool = False) -> None:
+def unindex_expired_collective_offers(process_all_expired: bool = False, workers: int = 1) -> None:
     """Unindex collective offers that have expired.
 
     By default, process collective offers that have expired within the last 2
@@ -98,28 +99,26 @@ def unindex_expired_collective_offers(process_all_expired: bool = False) -> None
         start_of_day,
     )
 
-    page = 0
-    limit = settings.ALGOLIA_DELETING_COLLECTIVE_OFFERS_CHUNK_SIZE
-    while collective_offer_ids := _get_expired_collective_offer_ids(interval, page, limit):
-        logger.info(
-            "[ALGOLIA] Found %d expired collective offers to unindex",
-            len(collective_offer_ids),
-        )
-        search.unindex_collective_offer_ids(collective_offer_ids)
-        page += 1
+    search.unindex_by_batches(
+        "expired_collective_offers",
+        get_ids=functools.partial(_get_expired_collective_offer_ids, interval),
+        unindex_ids=search.unindex_collective_offer_ids,
+        batch_size=settings.ALGOLIA_DELETING_COLLECTIVE_OFFERS_CHUNK_SIZE,
+        checkpoint_tag="|".join(date.isoformat() for date in interval),
+        workers=workers,
+    )
 
 
-def unindex_expired_collective_offers_template(process_all_expired: bool = False) -> None:
+def unindex_expired_collective_offers_template(process_all_expired: bool = False, workers: int = 1) -> None:
     """Unindex collective offers template that have expired."""
-    page = 0
-    limit = settings.ALGOLIA_DELETING_COLLECTIVE_OFFERS_CHUNK_SIZE
-    while collective_offer_template_ids := _get_expired_collective_offer_template_ids(page, limit):
-        logger.info(
-            "[ALGOLIA] Found %d expired collective offers template to unindex",
-            len(collective_offer_template_ids),
-        )
-        search.unindex_collective_offer_template_ids(collective_offer_template_ids)
-        page += 1
+    search.unindex_by_batches(
+        "expired_collective_offers_template",
+        get_ids=_get_expired_collective_offer_template_ids,
+        unindex_ids=search.unindex_collective_offer_template_ids,
+        batch_size=settings.ALGOLIA_DELETING_COLLECTIVE_OFFERS_CHUNK_SIZE,
+        checkpoint_tag=datetime.date.today().isoformat(),
+        workers=workers,
+    )
 
 
 def list_collective_offers_for_pro_user(
@@ -716,20 +715,22 @@ def attach_image(
 
 def _get_expired_collective_offer_ids(
     interval: tuple[datetime.datetime, datetime.datetime],
-    page: int,
+    after_id: int,
     limit: int,
 ) -> list[int]:
     collective_offers = educational_repository.get_expired_collective_offers(interval)
-    collective_offers = collective_offers.offset(page * limit).limit(limit)
+    collective_offers = collective_offers.filter(educational_models.CollectiveOffer.id > after_id).limit(limit)
     return [offer_id for offer_id, in collective_offers.with_entities(educational_models.CollectiveOffer.id)]
 
 
 def _get_expired_collective_offer_template_ids(
-    page: int,
+    after_id: int,
     limit: int,
 ) -> list[int]:
     collective_offers_template = educational_repository.get_expired_collective_offers_template()
-    collective_offers_template = collective_offers_template.offset(page * limit).limit(limit)
+    collective_offers_template = collective_offers_template.filter(
+        educational_models.CollectiveOfferTemplate.id > after_id
+    ).limit(limit)
     return [offer_template.id for offer_template in collective_offers_template]
 
 
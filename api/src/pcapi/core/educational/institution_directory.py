@@ -0,0 +1,108 @@
+"""An in-memory directory of active educational institutions.
+
+The list of institutions is used by the autocomplete of the pro
+interface, which requests it on each keystroke. It changes only when
+institutions are imported from ADAGE, so each process keeps a copy of
+it, reloaded every `settings.EDUCATIONAL_INSTITUTIONS_DIRECTORY_TTL`
+seconds. When institutions are created or updated,
+`invalidate_institution_directory()` should be called: it bumps a
+version number stored in Redis, which each process checks before
+using its copy.
+"""
+import dataclasses
+import logging
+import time
+
+import flask
+
+from pcapi import settings
+from pcapi.core.educational import repository as educational_repository
+
+
+logger = logging.getLogger(__name__)
+
+DIRECTORY_VERSION_KEY = "pcapi:educational_institution_directory:version"
+
+
+@dataclasses.dataclass(frozen=True)
+class DirectoryInstitution:
+    id: int
+    name: str
+    institutionType: str
+    postalCode: str
+    city: str
+    phoneNumber: str
+    institutionId: str
+
+
+def _load_institutions() -> tuple[DirectoryInstitution, ...]:
+    rows, _total = educational_repository.get_all_educational_institutions()
+    return tuple(
+        DirectoryInstitution(
+            id=row.id,
+            name=row.name,
+            institutionType=row.institutionType,
+            postalCode=row.postalCode,
+            city=row.city,
+            phoneNumber=row.phoneNumber,
+            institutionId=row.institutionId,
+        )
+        for row in rows
+    )
+
+
+def _get_directory_version() -> str | None:
+    return flask.current_app.redis_client.get(DIRECTORY_VERSION_KEY)
+
+
+class InstitutionDirectory:
+    """A process-wide copy of active educational institutions, sorted
+    by name.
+    """
+
+    def __init__(self) -> None:
+        self._institutions: tuple[DirectoryInstitution, ...] | None = None
+        self._version: str | None = None
+        self._expires_at = 0.0
+
+    def get_all(self) -> tuple[DirectoryInstitution, ...]:
+        ttl = settings.EDUCATIONAL_INSTITUTIONS_DIRECTORY_TTL
+        if ttl <= 0:
+            return _load_institutions()
+        try:
+            version = _get_directory_version()
+        except Exception:  # pylint: disable=broad-except
+            logger.exception("Could not get version of educational institution directory, will only expire after TTL")
+            version = self._version
+        institutions = self._institutions
+        if institutions is None or version != self._version or time.monotonic() >= self._expires_at:
+            institutions = _load_institutions()
+            self._institutions = institutions
+            self._version = version
+            self._expires_at = time.monotonic() + ttl
+        return institutions
+
+    def get_page(self, offset: int, limit: int) -> tuple[tuple[DirectoryInstitution, ...], int]:
+        institutions = self.get_all()
+        if limit:
+            return institutions[offset : offset + limit], len(institutions)
+        return institutions[offset:], len(institutions)
+
+    def invalidate(self) -> None:
+        self._institutions = None
+
+
+institution_directory = InstitutionDirectory()
+
+
+def invalidate_institution_directory() -> None:
+    """Invalidate the institution directory in all processes.
+
+    This function must be called after institutions have been created
+    or updated (and the change committed).
+    """
+    institution_directory.invalidate()
+    try:
+        flask.current_app.redis_client.incr(DIRECTORY_VERSION_KEY)
+    except Exception:  # pylint: disable=broad-except
+        logger.exception("Could not publish invalidation of educational institution directory")
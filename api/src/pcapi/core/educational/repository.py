@@ -1023,6 +1023,12 @@ def get_all_educational_institutions(offset: int = 0, limit: int = 0) -> tuple[t
     return query.all(), total
 
 
+def _unaccented_like_pattern(value: str) -> str:
+    value = value.replace(" ", "%")
+    value = value.replace("-", "%")
+    return f"%{clean_accents(value)}%"
+
+
 def search_educational_institution(
     educational_institution_id: int | None,
     name: str | None,
@@ -1032,52 +1038,58 @@ def search_educational_institution(
     uai: str | None,
     limit: int,
 ) -> educational_models.EducationalInstitution:
+    # `immutable_unaccent()` (rather than `unaccent()`) is required to
+    # use trigram indexes on name, type and city.
     filters = []
     if educational_institution_id is not None:
         filters.append(educational_models.EducationalInstitution.id == educational_institution_id)
 
     if name is not None:
-        name = name.replace(" ", "%")
-        name = name.replace("-", "%")
         filters.append(
-            sa.func.unaccent(educational_models.EducationalInstitution.name).ilike(f"%{clean_accents(name)}%"),
+            sa.func.immutable_unaccent(educational_models.EducationalInstitution.name).ilike(
+                _unaccented_like_pattern(name)
+            ),
         )
 
     if institution_type is not None:
-        institution_type = institution_type.replace(" ", "%")
-        institution_type = institution_type.replace("-", "%")
         filters.append(
-            sa.func.unaccent(educational_models.EducationalInstitution.institutionType).ilike(
-                f"%{clean_accents(institution_type)}%"
+            sa.func.immutable_unaccent(educational_models.EducationalInstitution.institutionType).ilike(
+                _unaccented_like_pattern(institution_type)
             ),
         )
 
     if city is not None:
-        city = city.replace(" ", "%")
-        city = city.replace("-", "%")
         filters.append(
-            sa.func.unaccent(educational_models.EducationalInstitution.city).ilike(f"%{clean_accents(city)}%"),
+            sa.func.immutable_unaccent(educational_models.EducationalInstitution.city).ilike(
+                _unaccented_like_pattern(city)
+            ),
         )
 
     if postal_code is not None:
         postal_code = postal_code.replace(" ", "%")
         postal_code = postal_code.replace("-", "%")
         filters.append(
-            sa.func.unaccent(educational_models.EducationalInstitution.postalCode).ilike(f"%{postal_code}%"),
+            educational_models.EducationalInstitution.postalCode.ilike(f"%{postal_code}%"),
         )
 
     if uai is not None:
         filters.append(educational_models.EducationalInstitution.institutionId == uai)
 
-    return (
-        educational_models.EducationalInstitution.query.filter(
-            *filters,
-            educational_models.EducationalInstitution.isActive,
-        )
-        .order_by(educational_models.EducationalInstitution.id)
-        .limit(limit)
-        .all()
+    query = educational_models.EducationalInstitution.query.filter(
+        *filters,
+        educational_models.EducationalInstitution.isActive,
     )
+    if name is not None:
+        # Rank best matches first.
+        query = query.order_by(
+            sa.desc(
+                sa.func.similarity(
+                    sa.func.immutable_unaccent(educational_models.EducationalInstitution.name),
+                    clean_accents(name),
+                )
+            )
+        )
+    return query.order_by(educational_models.EducationalInstitution.id).limit(limit).all()
 
 
 def find_pending_booking_confirmation_limit_date_in_3_days() -> list[educational_models.CollectiveBooking]:
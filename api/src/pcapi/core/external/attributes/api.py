@@ -12,6 +12,7 @@ from pcapi.core.bookings import models as bookings_models
 from pcapi.core.bookings import repository as bookings_repository
 from pcapi.core.categories import categories
 from pcapi.core.educational import models as educational_models
+from pcapi.core.external.attributes import debounce
 from pcapi.core.external.attributes import models
 from pcapi.core.external.batch import update_user_attributes as update_batch_user
 from pcapi.core.external.sendinblue import update_contact_attributes as update_sendinblue_user
@@ -35,18 +36,31 @@ def update_external_user(
     cultural_survey_answers: dict[str, list[str]] | None = None,
     skip_batch: bool = False,
     skip_sendinblue: bool = False,
+    immediate: bool = False,
 ) -> None:
+    """Update attributes of the user in Batch and Sendinblue.
+
+    If debouncing is enabled (see `debounce` module), the update is
+    postponed and merged with other updates of the same user, unless
+    `immediate` is set or survey answers are given.
+    """
     if user.has_pro_role:
         update_external_pro(user.email)
-    else:
-        user_attributes = get_user_attributes(user)
+        return
+
+    if debounce.is_enabled() and not immediate and not cultural_survey_answers:
+        if debounce.enqueue_user_update(user.id, update_batch=not skip_batch, update_sendinblue=not skip_sendinblue):
+            return
+        # The update could not be recorded: send it right away.
+
+    user_attributes = get_user_attributes(user)
 
-        update_batch = user.has_enabled_push_notifications()
-        if not skip_batch and update_batch:
-            update_batch_user(user.id, user_attributes, cultural_survey_answers=cultural_survey_answers)
+    update_batch = user.has_enabled_push_notifications()
+    if not skip_batch and update_batch:
+        update_batch_user(user.id, user_attributes, cultural_survey_answers=cultural_survey_answers)
 
-        if not skip_sendinblue:
-            update_sendinblue_user(user.email, user_attributes, cultural_survey_answers=cultural_survey_answers)
+    if not skip_sendinblue:
+        update_sendinblue_user(user.email, user_attributes, cultural_survey_answers=cultural_survey_answers)
 
 
 def update_external_pro(email: str | None) -> None:
@@ -57,6 +71,8 @@ def update_external_pro(email: str | None) -> None:
     from pcapi.tasks.serialization.external_pro_tasks import UpdateProAttributesRequest
 
     if email:
+        if debounce.is_enabled() and debounce.enqueue_pro_update(email):
+            return
         now = datetime.utcnow()
         update_sib_pro_attributes_task.delay(
             UpdateProAttributesRequest(email=email, time_id=f"{now.hour}:{now.minute // 15}")
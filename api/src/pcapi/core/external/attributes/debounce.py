@@ -0,0 +1,263 @@
+"""Debounce and coalesce updates of external attributes (Batch,
+Beamer and Sendinblue).
+
+When `settings.EXTERNAL_ATTRIBUTES_UPDATE_DELAY` is set,
+`update_external_user()` and `update_external_pro()` do not compute
+attributes right away. They record the id of the user (or the pro
+email) in a Redis sorted set, with the time of the request.
+`flush_pending_updates()`, run regularly by a cron job, handles users
+and emails that have not been updated since this delay: their
+attributes are computed once, and sent with the bulk endpoints of
+Batch and Sendinblue. A burst of updates of the same user (a few
+bookings, a cancellation, etc.) is thus merged into a single update.
+"""
+import dataclasses
+import logging
+import time
+import typing
+
+import flask
+import redis.exceptions
+
+from pcapi import settings
+from pcapi.connectors import beamer
+from pcapi.core.external import batch
+from pcapi.core.external.attributes import models
+from pcapi.core.users import models as users_models
+from pcapi.models.feature import FeatureToggle
+import pcapi.notifications.push as push_notifications
+from pcapi.notifications.push.backends.batch import UserUpdateData
+
+
+if typing.TYPE_CHECKING:
+    from pcapi.core.external import sendinblue
+
+
+logger = logging.getLogger(__name__)
+
+PENDING_BATCH_USERS_KEY = "pcapi:external_attributes:pending:batch_users"
+PENDING_SENDINBLUE_USERS_KEY = "pcapi:external_attributes:pending:sendinblue_users"
+PENDING_PROS_KEY = "pcapi:external_attributes:pending:pros"
+REQUESTED_UPDATES_KEY = "pcapi:external_attributes:requested_updates"
+FLUSH_BATCH_SIZE = 500
+
+
+@dataclasses.dataclass
+class FlushStats:
+    requested_updates: int = 0
+    users: int = 0
+    pros: int = 0
+    errors: int = 0
+
+    @property
+    def coalescing_ratio(self) -> float:
+        """Number of requested updates for each update that has been
+        sent. Requests are counted since the previous flush, including
+        those that are still pending, so this is an approximation.
+        """
+        flushed = self.users + self.pros
+        if not flushed:
+            return 0.0
+        return self.requested_updates / flushed
+
+
+def is_enabled() -> bool:
+    return settings.EXTERNAL_ATTRIBUTES_UPDATE_DELAY > 0
+
+
+def enqueue_user_update(user_id: int, update_batch: bool = True, update_sendinblue: bool = True) -> bool:
+    """Record that external attributes of the user must be updated.
+    Return False if the update could not be recorded.
+    """
+    now = time.time()
+    pipeline = flask.current_app.redis_client.pipeline(transaction=False)
+    if update_batch:
+        pipeline.zadd(PENDING_BATCH_USERS_KEY, {str(user_id): now})
+    if update_sendinblue:
+        pipeline.zadd(PENDING_SENDINBLUE_USERS_KEY, {str(user_id): now})
+    pipeline.incr(REQUESTED_UPDATES_KEY)
+    try:
+        pipeline.execute()
+    except redis.exceptions.RedisError:
+        logger.exception("Could not record pending update of external attributes", extra={"user_id": user_id})
+        return False
+    return True
+
+
+def enqueue_pro_update(email: str) -> bool:
+    """Record that external attributes of the pro email must be
+    updated. Return False if the update could not be recorded.
+    """
+    pipeline = flask.current_app.redis_client.pipeline(transaction=False)
+    pipeline.zadd(PENDING_PROS_KEY, {email: time.time()})
+    pipeline.incr(REQUESTED_UPDATES_KEY)
+    try:
+        pipeline.execute()
+    except redis.exceptions.RedisError:
+        logger.exception("Could not record pending update of external attributes", extra={"email": email})
+        return False
+    return True
+
+
+def _pop_quiet_members(key: str, max_score: float, count: int) -> list[str]:
+    # If a member is requested again between both calls, we still
+    # remove it: its attributes are computed after this call anyway.
+    redis_client = flask.current_app.redis_client
+    members = redis_client.zrangebyscore(key, "-inf", max_score, start=0, num=count)
+    if members:
+        redis_client.zrem(key, *members)
+    return members
+
+
+def _requeue(key: str, members: list[str]) -> None:
+    now = time.time()
+    flask.current_app.redis_client.zadd(key, {member: now for member in members})
+
+
+@dataclasses.dataclass
+class _SendinblueUpdate:
+    data: "sendinblue.SendinblueUserUpdateData"
+    marketing_email_subscription: bool
+    # The member of the pending set to requeue if the import fails.
+    member: str
+
+
+def _import_in_sendinblue(updates: list[_SendinblueUpdate], pending_key: str, stats: FlushStats) -> None:
+    from pcapi.core.external import sendinblue  # avoid import loop
+
+    # The import endpoint blacklists all or none of the contacts of
+    # the request: contacts are split by subscription.
+    for email_blacklist in (False, True):
+        group = [update for update in updates if (not update.marketing_email_subscription) is email_blacklist]
+        if not group:
+            continue
+        try:
+            sendinblue.import_contacts_in_sendinblue(
+                [update.data for update in group], email_blacklist=email_blacklist, raise_on_error=True
+            )
+        except Exception:  # pylint: disable=broad-except
+            if settings.IS_RUNNING_TESTS:
+                raise
+            stats.errors += 1
+            logger.exception("Could not import contacts in Sendinblue, will retry")
+            _requeue(pending_key, [update.member for update in group])
+
+
+def _flush_users(batch_user_ids: set[int], sendinblue_user_ids: set[int], stats: FlushStats) -> list[str]:
+    from pcapi.core.external import sendinblue  # avoid import loop
+    from pcapi.core.external.attributes import api  # avoid import loop
+
+    batch_users_data = []
+    sendinblue_updates = []
+    pro_emails = []
+    users = users_models.User.query.filter(users_models.User.id.in_(batch_user_ids | sendinblue_user_ids))
+    for user in users:
+        if user.has_pro_role:
+            pro_emails.append(user.email)
+            continue
+        try:
+            attributes = api.get_user_attributes(user)
+        except Exception:  # pylint: disable=broad-except
+            if settings.IS_RUNNING_TESTS:
+                raise
+            stats.errors += 1
+            logger.exception("Could not compute external attributes of user", extra={"user_id": user.id})
+            continue
+        stats.users += 1
+        if user.id in batch_user_ids and user.has_enabled_push_notifications():
+            batch_users_data.append(
+                UserUpdateData(user_id=str(user.id), attributes=batch.format_user_attributes(attributes))
+            )
+        if user.id in sendinblue_user_ids:
+            sendinblue_updates.append(
+                _SendinblueUpdate(
+                    data=sendinblue.SendinblueUserUpdateData(
+                        email=user.email, attributes=sendinblue.format_user_attributes(attributes)
+                    ),
+                    marketing_email_subscription=attributes.marketing_email_subscription,
+                    member=str(user.id),
+                )
+            )
+
+    if batch_users_data:
+        try:
+            push_notifications.update_users_attributes(batch_users_data)
+        except Exception:  # pylint: disable=broad-except
+            if settings.IS_RUNNING_TESTS:
+                raise
+            stats.errors += 1
+            logger.exception("Could not update users attributes in Batch, will retry")
+            _requeue(PENDING_BATCH_USERS_KEY, [user_data.user_id for user_data in batch_users_data])
+    _import_in_sendinblue(sendinblue_updates, PENDING_SENDINBLUE_USERS_KEY, stats)
+    return pro_emails
+
+
+def _flush_pros(emails: list[str], stats: FlushStats) -> None:
+    from pcapi.core.external import sendinblue  # avoid import loop
+    from pcapi.core.external.attributes import api  # avoid import loop
+
+    sendinblue_updates = []
+    for email in emails:
+        try:
+            attributes: models.ProAttributes = api.get_pro_attributes(email)
+            if FeatureToggle.ENABLE_BEAMER.is_active():
+                beamer.update_beamer_user(attributes)
+        except Exception:  # pylint: disable=broad-except
+            if settings.IS_RUNNING_TESTS:
+                raise
+            stats.errors += 1
+            logger.exception("Could not update external attributes of pro", extra={"email": email})
+            continue
+        stats.pros += 1
+        sendinblue_updates.append(
+            _SendinblueUpdate(
+                data=sendinblue.SendinblueUserUpdateData(
+                    email=email, attributes=sendinblue.format_user_attributes(attributes)
+                ),
+                marketing_email_subscription=attributes.marketing_email_subscription,
+                member=email,
+            )
+        )
+    _import_in_sendinblue(sendinblue_updates, PENDING_PROS_KEY, stats)
+
+
+def flush_pending_updates(delay: int | None = None, batch_size: int = FLUSH_BATCH_SIZE) -> FlushStats:
+    """Update external attributes of users and pro emails whose last
+    update has been requested more than `delay` seconds ago (by
+    default, `settings.EXTERNAL_ATTRIBUTES_UPDATE_DELAY`).
+    """
+    if delay is None:
+        delay = settings.EXTERNAL_ATTRIBUTES_UPDATE_DELAY
+    start = time.perf_counter()
+    max_score = time.time() - delay
+    redis_client = flask.current_app.redis_client
+    stats = FlushStats(requested_updates=int(redis_client.getset(REQUESTED_UPDATES_KEY, 0) or 0))
+
+    while True:
+        batch_user_ids = {
+            int(user_id) for user_id in _pop_quiet_members(PENDING_BATCH_USERS_KEY, max_score, batch_size)
+        }
+        sendinblue_user_ids = {
+            int(user_id) for user_id in _pop_quiet_members(PENDING_SENDINBLUE_USERS_KEY, max_score, batch_size)
+        }
+        if not batch_user_ids and not sendinblue_user_ids:
+            break
+        pro_emails = _flush_users(batch_user_ids, sendinblue_user_ids, stats)
+        if pro_emails:
+            _flush_pros(pro_emails, stats)
+
+    while emails := _pop_quiet_members(PENDING_PROS_KEY, max_score, batch_size):
+        _flush_pros(emails, stats)
+
+    logger.info(
+        "Flushed pending updates of external attributes",
+        extra={
+            "requested_updates": stats.requested_updates,
+            "users": stats.users,
+            "pros": stats.pros,
+            "errors": stats.errors,
+            "coalescing_ratio": round(stats.coalescing_ratio, 2),
+            "duration": round(time.perf_counter() - start, 3),
+        },
+    )
+    return stats
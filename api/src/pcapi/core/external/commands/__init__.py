@@ -1,5 +1,7 @@
 import click
 
+from pcapi.core.external.attributes import debounce
+import pcapi.scheduled_tasks.decorators as cron_decorators
 from pcapi.utils.blueprint import Blueprint
 
 from .update_sendinblue_batch_attributes import update_sendinblue_batch_loop
@@ -23,3 +25,9 @@ def update_sendinblue_batch(chunk_size: int, min_id: int, max_id: int, sync_send
 @click.option("--start-index", type=int, default=0, help="start index for resume (emails sorted alphabetically)")
 def update_sendinblue_pro(start_index: int) -> None:
     sendinblue_update_all_pro_attributes(start_index=start_index)
+
+
+@blueprint.cli.command("flush_external_attributes_updates")
+@cron_decorators.log_cron_with_transaction
+def flush_external_attributes_updates() -> None:
+    debounce.flush_pending_updates()
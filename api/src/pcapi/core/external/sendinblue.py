@@ -18,7 +18,6 @@ from pcapi.core import mails as mails_api
 from pcapi.core.cultural_survey import models as cultural_survey_models
 from pcapi.core.external.attributes import models as attributes_models
 import pcapi.core.users.models as users_models
-from pcapi.tasks.sendinblue_tasks import update_contact_attributes_task
 from pcapi.tasks.serialization.sendinblue_tasks import UpdateSendinblueContactRequest
 
 
@@ -110,6 +109,8 @@ class SendinblueOptionalAttributes(Enum):
 
 
 def update_contact_email(user: users_models.User, old_email: str, new_email: str, asynchronous: bool = True) -> None:
+    from pcapi.tasks.sendinblue_tasks import update_contact_attributes_task  # avoid import loop
+
     contact_list_ids = (
         [settings.SENDINBLUE_PRO_CONTACT_LIST_ID]
         if (user.has_pro_role or user.has_non_attached_pro_role)
@@ -135,6 +136,8 @@ def update_contact_attributes(
     cultural_survey_answers: dict[str, list[str]] | None = None,
     asynchronous: bool = True,
 ) -> None:
+    from pcapi.tasks.sendinblue_tasks import update_contact_attributes_task  # avoid import loop
+
     formatted_attributes = format_user_attributes(attributes)
 
     if cultural_survey_answers:
@@ -275,7 +278,11 @@ def make_update_request(payload: UpdateSendinblueContactRequest) -> None:
 
 
 def send_import_contacts_request(
-    api_instance: ContactsApi, file_body: str, list_ids: list[int], email_blacklist: bool = False
+    api_instance: ContactsApi,
+    file_body: str,
+    list_ids: list[int],
+    email_blacklist: bool = False,
+    raise_on_error: bool = False,
 ) -> None:
     request_contact_import = sib_api_v3_sdk.RequestContactImport(
         email_blacklist=email_blacklist,
@@ -289,6 +296,8 @@ def send_import_contacts_request(
     try:
         api_instance.import_contacts(request_contact_import)
     except SendinblueApiException as e:
+        if raise_on_error:
+            raise
         logger.exception("Exception when calling ContactsApi->import_contacts: %s", e)
 
 
@@ -322,7 +331,7 @@ def build_file_body(users_data: list[SendinblueUserUpdateData]) -> str:
 
 
 def import_contacts_in_sendinblue(
-    sendinblue_users_data: list[SendinblueUserUpdateData], email_blacklist: bool = False
+    sendinblue_users_data: list[SendinblueUserUpdateData], email_blacklist: bool = False, raise_on_error: bool = False
 ) -> None:
     configuration = sib_api_v3_sdk.Configuration()
     configuration.api_key["api-key"] = settings.SENDINBLUE_API_KEY
@@ -344,6 +353,7 @@ def import_contacts_in_sendinblue(
             file_body=pro_users_file_body,
             list_ids=[settings.SENDINBLUE_PRO_CONTACT_LIST_ID],
             email_blacklist=email_blacklist,
+            raise_on_error=raise_on_error,
         )
     # send young users request
     if young_users:
@@ -353,6 +363,7 @@ def import_contacts_in_sendinblue(
             file_body=young_users_file_body,
             list_ids=[settings.SENDINBLUE_YOUNG_CONTACT_LIST_ID],
             email_blacklist=email_blacklist,
+            raise_on_error=raise_on_error,
         )
 
 
@@ -66,6 +66,7 @@ def disable_external_bookings() -> None:
         {"isActive": True}, synchronize_session=False
     )
     db.session.commit()
+    feature.invalidate_feature_cache()
 
 
 def _get_external_bookings_client_api(venue_id: int) -> external_bookings_models.ExternalBookingsClientAPI:
@@ -27,9 +27,11 @@ from collections import defaultdict
 import csv
 import datetime
 import decimal
+import gzip
 import itertools
 import logging
 import math
+import multiprocessing
 import pathlib
 import secrets
 import tempfile
@@ -87,6 +89,9 @@ RECREDIT_UNDERAGE_USERS_BATCH_SIZE = 1000
 # Prior bookings have been priced manually.
 MIN_DATE_TO_PRICE = datetime.datetime(2021, 12, 31, 23, 0)  # UTC
 PRICE_EVENTS_BATCH_SIZE = 100
+# Number of rows fetched at once from server-side cursors when
+# exporting large CSV files.
+CSV_EXPORT_YIELD_PER = 1_000
 CASHFLOW_BATCH_LABEL_PREFIX = "VIR"
 
 
@@ -221,9 +226,15 @@ def cancel_latest_event(
 def price_events(
     min_date: datetime.datetime = MIN_DATE_TO_PRICE,
     batch_size: int = PRICE_EVENTS_BATCH_SIZE,
+    workers: int = 1,
 ) -> None:
     """Price finance events that are ready to be priced.
 
+    Events of different pricing points do not depend on each other.
+    If `workers` is greater than 1, pricing points are split between
+    as many worker processes, each of them pricing events of its own
+    pricing points in the usual order.
+
     This function is normally called by a cron job.
     """
     # The upper bound on `pricingOrderingDate` avoids selecting a very
@@ -233,6 +244,76 @@ def price_events(
     threshold = datetime.datetime.utcnow() - datetime.timedelta(minutes=1)
     window = (min_date, threshold)
 
+    if workers <= 1:
+        _price_events(window, batch_size)
+        return
+
+    partitions = _partition_pricing_points(window, workers)
+    # Release our connection before forking, so that it is not shared
+    # with child processes.
+    db.session.remove()
+    context = multiprocessing.get_context("fork")
+    app_object = app._get_current_object()  # type: ignore [attr-defined]
+    processes = [
+        context.Process(
+            target=_price_events_in_worker_process,
+            args=(app_object, window, batch_size, pricing_point_ids),
+            name=f"pricing-worker-{i}",
+        )
+        for i, pricing_point_ids in enumerate(partitions)
+    ]
+    for process in processes:
+        process.start()
+    for process in processes:
+        process.join()
+        if process.exitcode != 0:
+            logger.error(
+                "Pricing worker exited with an error",
+                extra={"worker": process.name, "exitcode": process.exitcode},
+            )
+
+
+def _price_events_in_worker_process(
+    app_object: typing.Any,
+    window: tuple[datetime.datetime, datetime.datetime],
+    batch_size: int,
+    pricing_point_ids: list[int],
+) -> None:
+    with app_object.app_context():
+        # Connections of the pool have been inherited from the parent
+        # process. Forget them without closing them.
+        db.engine.dispose(close=False)
+        _price_events(window, batch_size, pricing_point_ids)
+
+
+def _partition_pricing_points(
+    window: tuple[datetime.datetime, datetime.datetime],
+    partitions: int,
+) -> list[list[int]]:
+    """Split pricing points that have events to price in (at most)
+    `partitions` disjoint lists, with roughly the same number of
+    events to price in each list.
+    """
+    event_counts = _filter_events_to_price(
+        db.session.query(models.FinanceEvent.pricingPointId, sqla.func.count(models.FinanceEvent.id)),
+        window,
+    ).group_by(models.FinanceEvent.pricingPointId)
+    pricing_point_ids: list[list[int]] = [[] for _ in range(partitions)]
+    loads = [0] * partitions
+    for pricing_point_id, count in sorted(event_counts, key=lambda row: row[1], reverse=True):
+        index = loads.index(min(loads))
+        pricing_point_ids[index].append(pricing_point_id)
+        loads[index] += count
+    return [ids for ids in pricing_point_ids if ids]
+
+
+def _price_events(
+    window: tuple[datetime.datetime, datetime.datetime],
+    batch_size: int,
+    pricing_point_ids: list[int] | None = None,
+) -> None:
+    start = time.perf_counter()
+    priced_events_count = 0
     errored_pricing_point_ids = set()
 
     # This is a quick hack to avoid fetching all events at once,
@@ -240,6 +321,8 @@ def price_events(
     # commit, which takes a lot of time (up to 1 or 2 seconds per
     # commit).
     event_query = _get_events_to_price(window)
+    if pricing_point_ids is not None:
+        event_query = event_query.filter(models.FinanceEvent.pricingPointId.in_(pricing_point_ids))
     loops = math.ceil(event_query.count() / batch_size)
 
     def _get_loop_query(
@@ -273,6 +356,7 @@ def price_events(
                 }
                 with log_elapsed(logger, "Priced event", extra):
                     price_event(event)
+                priced_events_count += 1
             except Exception as exc:  # pylint: disable=broad-except
                 errored_pricing_point_ids.add(event.pricingPointId)
                 logger.info(
@@ -295,6 +379,18 @@ def price_events(
                 if event != last_event:
                     db.session.expunge(event)
 
+    duration = time.perf_counter() - start
+    logger.info(
+        "Finished pricing events",
+        extra={
+            "pricing_points": len(pricing_point_ids) if pricing_point_ids is not None else None,
+            "priced_events": priced_events_count,
+            "errored_pricing_points": len(errored_pricing_point_ids),
+            "duration": round(duration, 3),
+            "throughput": round(priced_events_count / duration, 1) if duration else None,
+        },
+    )
+
 
 def _get_pricing_point_link(
     booking: bookings_models.Booking | educational_models.CollectiveBooking,
@@ -325,9 +421,9 @@ def _get_pricing_point_link(
     raise ValueError(f"Could not find pricing point for booking {booking.id}")
 
 
-def _get_events_to_price(window: tuple[datetime.datetime, datetime.datetime]) -> BaseQuery:
+def _filter_events_to_price(query: BaseQuery, window: tuple[datetime.datetime, datetime.datetime]) -> BaseQuery:
     return (
-        models.FinanceEvent.query.filter(
+        query.filter(
             models.FinanceEvent.pricingPointId.is_not(None),
             models.FinanceEvent.status == models.FinanceEventStatus.READY,
             models.FinanceEvent.pricingOrderingDate.between(*window),
@@ -336,6 +432,12 @@ def _get_events_to_price(window: tuple[datetime.datetime, datetime.datetime]) ->
         .filter(
             models.Pricing.id.is_(None) | (models.Pricing.status == models.PricingStatus.CANCELLED),
         )
+    )
+
+
+def _get_events_to_price(window: tuple[datetime.datetime, datetime.datetime]) -> BaseQuery:
+    return (
+        _filter_events_to_price(models.FinanceEvent.query, window)
         .order_by(models.FinanceEvent.pricingOrderingDate, models.FinanceEvent.id)
         .options(
             sqla.orm.joinedload(models.FinanceEvent.booking),
@@ -464,21 +566,80 @@ def _get_revenue_period(value_date: datetime.datetime) -> tuple[datetime.datetim
     return first_second, last_second
 
 
-def _get_current_revenue(event: models.FinanceEvent) -> int:
+def _get_revenue_year(value_date: datetime.datetime) -> int:
+    return value_date.replace(tzinfo=pytz.utc).astimezone(utils.ACCOUNTING_TIMEZONE).year
+
+
+def _compute_revenue(
+    pricing_point_id: int,
+    revenue_period: tuple[datetime.datetime, datetime.datetime],
+    excluded_booking_id: int | None = None,
+) -> int:
+    """Return the revenue of a pricing point for the given period,
+    from its pricings.
+    """
+    # Collective bookings must not be included in revenue.
+    query = bookings_models.Booking.query.join(models.Pricing).filter(
+        models.Pricing.pricingPointId == pricing_point_id,
+        models.Pricing.valueDate.between(*revenue_period),
+        models.Pricing.status.notin_(
+            (
+                models.PricingStatus.CANCELLED,
+                models.PricingStatus.REJECTED,
+            )
+        ),
+    )
+    if excluded_booking_id:
+        query = query.filter(models.Pricing.bookingId != excluded_booking_id)
+    current_revenue = query.with_entities(
+        sqla.func.sum(bookings_models.Booking.amount * bookings_models.Booking.quantity)
+    ).scalar()
+    return utils.to_eurocents(current_revenue or 0)
+
+
+def _get_revenue_accumulator(event: models.FinanceEvent) -> models.PricingPointRevenue:
     """Return the current year revenue for the pricing point of an
     event, NOT including the given event.
+
+    The accumulator is initialized from existing pricings if needed.
+    Callers must hold a lock on the pricing point.
     """
-    revenue_period = _get_revenue_period(event.valueDate)
-    # Collective bookings must not be included in revenue.
-    current_revenue = (
-        bookings_models.Booking.query.join(models.Pricing)
-        .filter(
-            models.Pricing.pricingPointId == event.pricingPointId,
-            # The following filter is not strictly necessary, because
-            # this function is called before we create the pricing for
-            # this event.
-            models.Pricing.bookingId != event.bookingId,
-            models.Pricing.valueDate.between(*revenue_period),
+    assert event.pricingPointId  # helps mypy
+    year = _get_revenue_year(event.valueDate)
+    accumulator = models.PricingPointRevenue.query.filter_by(
+        pricingPointId=event.pricingPointId,
+        year=year,
+    ).one_or_none()
+    if not accumulator:
+        revenue = _compute_revenue(
+            event.pricingPointId,
+            _get_revenue_period(event.valueDate),
+            # Not strictly necessary, because this function is called
+            # before we create the pricing for this event.
+            excluded_booking_id=event.bookingId,
+        )
+        accumulator = models.PricingPointRevenue(pricingPointId=event.pricingPointId, year=year, revenue=revenue)
+        db.session.add(accumulator)
+    return accumulator
+
+
+def _remove_pricings_from_revenue(
+    pricing_point_id: int,
+    value_date: datetime.datetime,
+    pricing_ids: typing.Collection[int],
+) -> None:
+    """Update the revenue accumulator of the pricing point before the
+    given pricings (that all belong to the year of `value_date`) are
+    cancelled or deleted.
+    """
+    amount = (
+        sqla.select(
+            sqla.func.coalesce(sqla.func.sum(bookings_models.Booking.amount * bookings_models.Booking.quantity), 0)
+        )
+        .select_from(models.Pricing)
+        .join(bookings_models.Booking, models.Pricing.bookingId == bookings_models.Booking.id)
+        .where(
+            models.Pricing.id.in_(pricing_ids),
             models.Pricing.status.notin_(
                 (
                     models.PricingStatus.CANCELLED,
@@ -486,14 +647,55 @@ def _get_current_revenue(event: models.FinanceEvent) -> int:
                 )
             ),
         )
-        .with_entities(sqla.func.sum(bookings_models.Booking.amount * bookings_models.Booking.quantity))
-        .scalar()
+        .scalar_subquery()
+    )
+    models.PricingPointRevenue.query.filter_by(
+        pricingPointId=pricing_point_id,
+        year=_get_revenue_year(value_date),
+    ).update(
+        {"revenue": models.PricingPointRevenue.revenue - sqla.cast(amount * 100, sqla.BigInteger)},
+        synchronize_session=False,
     )
-    return utils.to_eurocents(current_revenue or 0)
+
+
+def check_pricing_point_revenues(year: int | None = None, fix: bool = False) -> list[models.PricingPointRevenue]:
+    """Compare revenue accumulators with the revenue computed from
+    pricings, and return those that differ. If `fix` is True, fix them.
+    """
+    query = models.PricingPointRevenue.query.order_by(models.PricingPointRevenue.id)
+    if year:
+        query = query.filter_by(year=year)
+    accumulator_ids = [id_ for id_, in query.with_entities(models.PricingPointRevenue.id)]
+
+    inconsistent_accumulators = []
+    for accumulator_id in accumulator_ids:
+        with transaction():
+            accumulator = models.PricingPointRevenue.query.get(accumulator_id)
+            lock_pricing_point(accumulator.pricingPointId)
+            db.session.refresh(accumulator)
+            first_second = utils.ACCOUNTING_TIMEZONE.localize(datetime.datetime(accumulator.year, 1, 1))
+            revenue = _compute_revenue(accumulator.pricingPointId, _get_revenue_period(first_second))
+            if revenue == accumulator.revenue:
+                continue
+            logger.error(
+                "Found inconsistent revenue for pricing point",
+                extra={
+                    "pricing_point": accumulator.pricingPointId,
+                    "year": accumulator.year,
+                    "accumulated_revenue": accumulator.revenue,
+                    "computed_revenue": revenue,
+                    "fixed": fix,
+                },
+            )
+            inconsistent_accumulators.append(accumulator)
+            if fix:
+                accumulator.revenue = revenue
+    return inconsistent_accumulators
 
 
 def _price_event(event: models.FinanceEvent) -> models.Pricing:
-    new_revenue = _get_current_revenue(event)
+    revenue_accumulator = _get_revenue_accumulator(event)
+    new_revenue = revenue_accumulator.revenue
     is_incident_event = event.motive in (
         models.FinanceEventMotive.INCIDENT_REVERSAL_OF_ORIGINAL_EVENT,
         models.FinanceEventMotive.INCIDENT_NEW_PRICE,
@@ -508,6 +710,9 @@ def _price_event(event: models.FinanceEvent) -> models.Pricing:
     if not collective_booking:  # Collective bookings are not included in revenue
         if not is_incident_event:
             new_revenue += utils.to_eurocents(individual_booking.total_amount)
+            # Pricings of incidents are not linked to a booking, so
+            # they are not included in the accumulated revenue.
+            revenue_accumulator.revenue = new_revenue
         elif event.motive in (
             models.FinanceEventMotive.INCIDENT_NEW_PRICE,
             models.FinanceEventMotive.INCIDENT_COMMERCIAL_GESTURE,
@@ -613,6 +818,8 @@ def _cancel_event_pricing(
             # cancel an event after it has been reimbursed.
             raise exceptions.NonCancellablePricingError()
 
+        _remove_pricings_from_revenue(pricing.pricingPointId, pricing.valueDate, [pricing.id])
+
         # We need to *cancel* the pricing of the requested event AND
         # *delete* all pricings that depended on it (i.e. all pricings
         # for events that were priced after the requested event), so
@@ -703,6 +910,8 @@ def _delete_dependent_event_pricings(event: models.FinanceEvent, log_message: st
     # since the beginning of the function (since we should have an
     # exclusive lock on the pricing point to avoid that)... but let's
     # be defensive.
+    assert event.pricingPointId  # helps mypy
+    _remove_pricings_from_revenue(event.pricingPointId, event.valueDate, pricing_ids)
     lines = models.PricingLine.query.filter(models.PricingLine.pricingId.in_(pricing_ids))
     lines.delete(synchronize_session=False)
     logs = models.PricingLog.query.filter(models.PricingLog.pricingId.in_(pricing_ids))
@@ -1128,17 +1337,44 @@ def _write_csv(
     rows: typing.Iterable,
     row_formatter: typing.Callable[[typing.Iterable], typing.Iterable] = lambda row: row,
     compress: bool = False,
+    use_gzip: bool = False,
 ) -> pathlib.Path:
+    """Write rows to a new CSV file and return its path.
+
+    Rows are written as they are iterated over. To keep memory usage
+    constant, `rows` should be a generator or a query that streams its
+    results (see `CSV_EXPORT_YIELD_PER`).
+
+    If `compress` is True, the file is zipped after being written. If
+    `use_gzip` is True, the file is gzipped while it is being written.
+    """
+    assert not (compress and use_gzip)
     local_now = pytz.utc.localize(datetime.datetime.utcnow()).astimezone(utils.ACCOUNTING_TIMEZONE)
     filename = filename_base + local_now.strftime("_%Y%m%d_%H%M%S") + ".csv"
+    if use_gzip:
+        filename += ".gz"
     # Store file in a dedicated directory within "/tmp". It's easier
     # to clean files in tests that way.
     path = pathlib.Path(tempfile.mkdtemp()) / filename
-    with open(path, "w+", encoding="utf-8") as fp:
+    start = time.perf_counter()
+    n_rows = 0
+    with gzip.open(path, "wt", encoding="utf-8") if use_gzip else open(path, "w+", encoding="utf-8") as fp:
         writer = csv.writer(fp, quoting=csv.QUOTE_NONNUMERIC)
         writer.writerow(header)
         if rows is not None:
-            writer.writerows(row_formatter(row) for row in rows)
+            for row in rows:
+                writer.writerow(row_formatter(row))
+                n_rows += 1
+    duration = time.perf_counter() - start
+    logger.info(
+        "Wrote CSV file",
+        extra={
+            "path": str(path),
+            "rows": n_rows,
+            "duration": round(duration, 3),
+            "rows_per_second": round(n_rows / duration, 1) if duration else None,
+        },
+    )
     if compress:
         compressed_path = pathlib.Path(str(path) + ".zip")
         with zipfile.ZipFile(
@@ -1177,6 +1413,7 @@ def _generate_reimbursement_points_file(cutoff: datetime.datetime) -> pathlib.Pa
             models.BankInformation.iban.label("iban"),
             models.BankInformation.bic.label("bic"),
         )
+        .yield_per(CSV_EXPORT_YIELD_PER)
     )
     row_formatter = lambda row: (
         human_ids.humanize(row.id),
@@ -1229,6 +1466,7 @@ def _generate_payments_file(batch_id: int) -> pathlib.Path:
             models.Deposit.type.label("deposit_type"),
             sqla_func.sum(models.Pricing.amount).label("pricing_amount"),
         )
+        .yield_per(CSV_EXPORT_YIELD_PER)
     )
 
     collective_bookings_query = (
@@ -1264,6 +1502,7 @@ def _generate_payments_file(batch_id: int) -> pathlib.Path:
             educational_models.EducationalDeposit.ministry.label("ministry"),
             sqla_func.sum(models.Pricing.amount).label("pricing_amount"),
         )
+        .yield_per(CSV_EXPORT_YIELD_PER)
     )
 
     return _write_csv(
@@ -1376,9 +1615,26 @@ def _get_cashflows_by_reimbursement_points(batch: models.CashflowBatch) -> list:
     return rows
 
 
-def generate_invoices(batch: models.CashflowBatch) -> None:
-    """Generate (and store) all invoices."""
+def generate_invoices(batch: models.CashflowBatch, workers: int = 1) -> None:
+    """Generate (and store) all invoices.
 
+    If `workers` is greater than 1, PDF invoices are rendered in
+    parallel by as many processes (see `invoice_pipeline`).
+    """
+    if workers > 1:
+        from pcapi.core.finance import invoice_pipeline  # avoid import loop
+
+        invoice_pipeline.generate_and_store_invoices(batch, pdf_workers=workers)
+    else:
+        _generate_invoices_sequentially(batch)
+    with log_elapsed(logger, "Generated CSV invoices file"):
+        path = generate_invoice_file(batch)
+    drive_folder_name = _get_drive_folder_name(batch)
+    with log_elapsed(logger, "Uploaded CSV invoices file to Google Drive"):
+        _upload_files_to_google_drive(drive_folder_name, [path])
+
+
+def _generate_invoices_sequentially(batch: models.CashflowBatch) -> None:
     rows = _get_cashflows_by_reimbursement_points(batch)
 
     for row in rows:
@@ -1401,11 +1657,6 @@ def generate_invoices(batch: models.CashflowBatch) -> None:
                     "exc": str(exc),
                 },
             )
-    with log_elapsed(logger, "Generated CSV invoices file"):
-        path = generate_invoice_file(batch)
-    drive_folder_name = _get_drive_folder_name(batch)
-    with log_elapsed(logger, "Uploaded CSV invoices file to Google Drive"):
-        _upload_files_to_google_drive(drive_folder_name, [path])
 
 
 def async_generate_invoices(batch: models.CashflowBatch) -> None:
@@ -1776,6 +2027,7 @@ def get_reimbursements_by_venue(
         .join(models.Pricing.booking)
         .join(bookings_models.Booking.venue)
         .order_by(offerers_models.Venue.id, offerers_models.Venue.common_name)
+        .yield_per(CSV_EXPORT_YIELD_PER)
     )
     collective_query = (
         pricing_query.with_entities(
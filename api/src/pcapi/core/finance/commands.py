@@ -24,11 +24,30 @@ logger = logging.getLogger(__name__)
 
 
 @blueprint.cli.command("price_finance_events")
+@click.option(
+    "--workers",
+    type=int,
+    default=1,
+    help="Number of worker processes, each of them pricing events of its own set of pricing points",
+)
 @cron_decorators.log_cron_with_transaction
 @cron_decorators.cron_require_feature(FeatureToggle.PRICE_FINANCE_EVENTS)
-def price_finance_events() -> None:
+def price_finance_events(workers: int) -> None:
     """Price finance events that have recently been created."""
-    finance_api.price_events()
+    finance_api.price_events(workers=workers)
+
+
+@blueprint.cli.command("check_pricing_point_revenues")
+@click.option("--year", type=int, help="Only check revenues of this year")
+@click.option("--fix", help="Fix inconsistent revenues", is_flag=True, default=False)
+def check_pricing_point_revenues(year: int | None, fix: bool) -> None:
+    """Check that the revenue of each pricing point, as accumulated when
+    pricing events, matches the revenue computed from its pricings.
+    """
+    inconsistent = finance_api.check_pricing_point_revenues(year=year, fix=fix)
+    for accumulator in inconsistent:
+        print(f"Inconsistent revenue for pricing point {accumulator.pricingPointId} in {accumulator.year}")
+    print(f"Found {len(inconsistent)} inconsistent revenue(s){' (fixed)' if fix and inconsistent else ''}")
 
 
 @blueprint.cli.command("generate_cashflows_and_payment_files")
@@ -46,7 +65,13 @@ def generate_cashflows_and_payment_files(override_feature_flag: bool) -> None:
 
 @blueprint.cli.command("generate_invoices")
 @click.option("--batch-id", type=int, required=True)
-def generate_invoices(batch_id: int) -> None:
+@click.option(
+    "--workers",
+    type=int,
+    default=1,
+    help="Number of worker processes that render PDF invoices",
+)
+def generate_invoices(batch_id: int, workers: int) -> None:
     """Generate (and store) all invoices of a CashflowBatch.
 
     This command can be run multiple times.
@@ -57,7 +82,7 @@ def generate_invoices(batch_id: int) -> None:
         print(f"Could not generate invoices for this batch, as it doesn't exist :{batch_id}")
         return
 
-    finance_api.generate_invoices(batch)
+    finance_api.generate_invoices(batch, workers=workers)
 
 
 @blueprint.cli.command("add_custom_offer_reimbursement_rule")
@@ -0,0 +1,330 @@
+"""Generate invoices of a cashflow batch with a pipeline.
+
+`api.generate_invoices()` handles reimbursement points one after the
+other: it creates the invoice, renders its HTML, renders the PDF,
+uploads it to the object storage and sends an e-mail. Rendering the
+PDF is CPU-bound and by far the slowest step, which makes invoice day
+last hours. This module splits the work in stages:
+
+- in the main process, invoices are created (one transaction for each
+  reimbursement point) and their HTML is rendered. These are the only
+  stages that access the database, with the e-mail stage below;
+- PDF files are rendered in a pool of processes;
+- PDF files are uploaded to the object storage from a pool of threads.
+  Failed uploads are retried;
+- once uploaded, the e-mail is sent from the main process.
+
+The number of invoices that are waiting for their PDF or their upload
+is bounded. Note that, unlike in `generate_and_store_invoice()`, the
+invoice is committed before its PDF is stored. Its id is thus recorded
+in a Redis set (in the same transaction) until its e-mail has been
+sent. If we could not store the PDF (or send the e-mail), running the
+function again for the same batch resumes these invoices: their PDF is
+rendered and stored again, and the e-mail is sent.
+"""
+import collections
+import concurrent.futures
+import dataclasses
+import logging
+import multiprocessing
+import time
+import typing
+
+import flask
+
+from pcapi import settings
+from pcapi.core.finance import api
+from pcapi.core.finance import models
+import pcapi.core.mails.transactional as transactional_mails
+from pcapi.core.object_storage import store_public_object
+from pcapi.repository import transaction
+import pcapi.utils.pdf as pdf_utils
+
+
+logger = logging.getLogger(__name__)
+
+STAGES = ("invoice", "html", "pdf", "upload", "email")
+REPORT_EVERY_N_INVOICES = 50
+UPLOAD_MAX_ATTEMPTS = 3
+UPLOAD_RETRY_DELAY = 1  # seconds, doubled after each attempt
+PENDING_INVOICES_KEY = "pcapi:invoice_pipeline:{batch_id}:pending_invoices"
+
+
+@dataclasses.dataclass
+class StageStats:
+    count: int = 0
+    duration: float = 0.0
+
+
+@dataclasses.dataclass
+class PipelineStats:
+    total: int = 0
+    done: int = 0
+    errors: int = 0
+    upload_retries: int = 0
+    stages: dict[str, StageStats] = dataclasses.field(default_factory=lambda: {stage: StageStats() for stage in STAGES})
+
+    def record(self, stage: str, duration: float) -> None:
+        self.stages[stage].count += 1
+        self.stages[stage].duration += duration
+
+    def as_log_extra(self) -> dict:
+        extra: dict[str, typing.Any] = {
+            "total": self.total,
+            "done": self.done,
+            "errors": self.errors,
+            "upload_retries": self.upload_retries,
+        }
+        for stage, stats in self.stages.items():
+            extra[f"{stage}_count"] = stats.count
+            extra[f"{stage}_duration"] = round(stats.duration, 3)
+        return extra
+
+
+@dataclasses.dataclass
+class _PendingInvoice:
+    invoice_id: int
+    reimbursement_point_id: int
+    storage_object_id: str
+    future: concurrent.futures.Future
+
+
+def _render_pdf(html: str) -> tuple[bytes, float]:
+    """Render the PDF and return it with the elapsed time.
+
+    This function is called from a worker process and must not access
+    the database.
+    """
+    start = time.perf_counter()
+    pdf = pdf_utils.generate_pdf_from_html(html_content=html)
+    return pdf, time.perf_counter() - start
+
+
+def _upload_pdf(storage_object_id: str, pdf: bytes, max_attempts: int) -> tuple[float, int]:
+    """Store the PDF in the object storage, retrying on failure. Return
+    the elapsed time and the number of attempts.
+
+    This function is called from a thread of the pool and must not
+    access the database.
+    """
+    start = time.perf_counter()
+    delay = UPLOAD_RETRY_DELAY
+    for attempt in range(1, max_attempts + 1):
+        try:
+            store_public_object(
+                folder="invoices",
+                object_id=storage_object_id,
+                blob=pdf,
+                content_type="application/pdf",
+            )
+        except Exception:  # pylint: disable=broad-except
+            if attempt == max_attempts:
+                raise
+            logger.warning(
+                "Could not store PDF invoice, will retry",
+                extra={"storage_object_id": storage_object_id, "attempt": attempt},
+                exc_info=True,
+            )
+            time.sleep(delay)
+            delay *= 2
+        else:
+            break
+    return time.perf_counter() - start, attempt
+
+
+def _get_pdf_executor(pdf_workers: int) -> concurrent.futures.Executor:
+    if pdf_workers <= 1:
+        return concurrent.futures.ThreadPoolExecutor(max_workers=1)
+    # Workers are started on demand, while upload threads are running:
+    # forking this process could copy locks held by these threads.
+    # Workers are rather forked from a server process, that has only
+    # imported this module. They don't need the application, nor the
+    # database.
+    mp_context = multiprocessing.get_context("forkserver")
+    mp_context.set_forkserver_preload([__name__])
+    return concurrent.futures.ProcessPoolExecutor(max_workers=pdf_workers, mp_context=mp_context)
+
+
+def _get_pending_invoices_key(batch: models.CashflowBatch) -> str:
+    return PENDING_INVOICES_KEY.format(batch_id=batch.id)
+
+
+def get_pending_invoice_ids(batch: models.CashflowBatch) -> set[int]:
+    """Return ids of invoices of the batch whose PDF has not been
+    stored, or whose e-mail has not been sent.
+    """
+    redis_client = flask.current_app.redis_client
+    return {int(invoice_id) for invoice_id in redis_client.smembers(_get_pending_invoices_key(batch))}
+
+
+def _log_error(message: str, pending: _PendingInvoice, exc: Exception, stats: PipelineStats) -> None:
+    if settings.IS_RUNNING_TESTS:
+        raise exc
+    stats.errors += 1
+    logger.exception(
+        message,
+        extra={
+            "invoice_id": pending.invoice_id,
+            "reimbursement_point_id": pending.reimbursement_point_id,
+            "exc": str(exc),
+        },
+    )
+
+
+def _report_progress(stats: PipelineStats) -> None:
+    stats.done += 1
+    if stats.done % REPORT_EVERY_N_INVOICES == 0:
+        logger.info("Invoice generation progress", extra=stats.as_log_extra())
+
+
+def generate_and_store_invoices(
+    batch: models.CashflowBatch,
+    pdf_workers: int = 4,
+    upload_workers: int = 4,
+    max_in_flight: int | None = None,
+    upload_max_attempts: int = UPLOAD_MAX_ATTEMPTS,
+) -> PipelineStats:
+    """Generate (and store) invoices of all reimbursement points of
+    the batch, with PDF invoices rendered by `pdf_workers` processes
+    and uploaded by `upload_workers` threads.
+
+    This function does not generate the CSV invoices file, see
+    `api.generate_invoices()`.
+    """
+    start = time.perf_counter()
+    in_flight_limit = max_in_flight or 2 * (pdf_workers + upload_workers)
+    redis_client = flask.current_app.redis_client
+    pending_invoices_key = _get_pending_invoices_key(batch)
+    pending_invoice_ids = get_pending_invoice_ids(batch)
+    pending_invoices = (
+        models.Invoice.query.filter(models.Invoice.id.in_(pending_invoice_ids)).order_by(models.Invoice.id).all()
+    )
+    if pending_invoice_ids:
+        logger.info(
+            "Resuming invoices whose PDF has not been stored or e-mail has not been sent",
+            extra={"batch_id": batch.id, "invoice_ids": [invoice.id for invoice in pending_invoices]},
+        )
+        # These invoices have not been committed.
+        uncommitted_invoice_ids = pending_invoice_ids - {invoice.id for invoice in pending_invoices}
+        if uncommitted_invoice_ids:
+            redis_client.srem(pending_invoices_key, *uncommitted_invoice_ids)
+    # Cashflows of pending invoices have been invoiced: they are not
+    # in `rows`.
+    rows = api._get_cashflows_by_reimbursement_points(batch)
+    stats = PipelineStats(total=len(pending_invoices) + len(rows))
+    rendering: collections.deque[_PendingInvoice] = collections.deque()
+    uploading: collections.deque[_PendingInvoice] = collections.deque()
+
+    def complete_rendering(pending: _PendingInvoice) -> None:
+        try:
+            pdf, duration = pending.future.result()
+        except Exception as exc:  # pylint: disable=broad-except
+            _log_error("Could not generate PDF invoice", pending, exc, stats)
+            _report_progress(stats)
+            return
+        stats.record("pdf", duration)
+        pending.future = upload_executor.submit(_upload_pdf, pending.storage_object_id, pdf, upload_max_attempts)
+        uploading.append(pending)
+
+    def complete_upload(pending: _PendingInvoice) -> None:
+        try:
+            duration, attempts = pending.future.result()
+        except Exception as exc:  # pylint: disable=broad-except
+            _log_error("Could not store PDF invoice", pending, exc, stats)
+            _report_progress(stats)
+            return
+        stats.record("upload", duration)
+        stats.upload_retries += attempts - 1
+        try:
+            email_start = time.perf_counter()
+            invoice = models.Invoice.query.get(pending.invoice_id)
+            transactional_mails.send_invoice_available_to_pro_email(invoice, batch)
+            stats.record("email", time.perf_counter() - email_start)
+        except Exception as exc:  # pylint: disable=broad-except
+            _log_error("Could not send invoice e-mail", pending, exc, stats)
+        else:
+            redis_client.srem(pending_invoices_key, pending.invoice_id)
+        _report_progress(stats)
+
+    def submit_rendering(invoice: models.Invoice, invoice_html: str) -> None:
+        assert invoice.reimbursementPointId  # helps mypy
+        rendering.append(
+            _PendingInvoice(
+                invoice_id=invoice.id,
+                reimbursement_point_id=invoice.reimbursementPointId,
+                storage_object_id=invoice.storage_object_id,
+                future=pdf_executor.submit(_render_pdf, invoice_html),
+            )
+        )
+        drain(in_flight_limit)
+
+    def drain(max_pending: int) -> None:
+        # Handle completed jobs in order, and wait for the oldest jobs
+        # if there are too many invoices in the pipeline.
+        while rendering and (rendering[0].future.done() or len(rendering) + len(uploading) > max_pending):
+            complete_rendering(rendering.popleft())
+        while uploading and (uploading[0].future.done() or len(rendering) + len(uploading) > max_pending):
+            complete_upload(uploading.popleft())
+
+    with _get_pdf_executor(pdf_workers) as pdf_executor, concurrent.futures.ThreadPoolExecutor(
+        max_workers=upload_workers
+    ) as upload_executor:
+        for invoice in pending_invoices:
+            try:
+                stage_start = time.perf_counter()
+                invoice_html = api._generate_invoice_html(invoice, batch)
+                stats.record("html", time.perf_counter() - stage_start)
+            except Exception as exc:  # pylint: disable=broad-except
+                if settings.IS_RUNNING_TESTS:
+                    raise
+                stats.errors += 1
+                stats.done += 1
+                logger.exception(
+                    "Could not generate invoice HTML",
+                    extra={"invoice_id": invoice.id, "exc": str(exc)},
+                )
+                continue
+            submit_rendering(invoice, invoice_html)
+
+        for row in rows:
+            try:
+                with transaction():
+                    stage_start = time.perf_counter()
+                    invoice = api._generate_invoice(
+                        reimbursement_point_id=row.reimbursement_point_id,
+                        cashflow_ids=row.cashflow_ids,
+                    )
+                    if not invoice:
+                        stats.total -= 1
+                        continue
+                    stats.record("invoice", time.perf_counter() - stage_start)
+                    stage_start = time.perf_counter()
+                    invoice_html = api._generate_invoice_html(invoice, batch)
+                    stats.record("html", time.perf_counter() - stage_start)
+                    # If the invoice cannot be committed, it is ignored
+                    # when resuming.
+                    redis_client.sadd(pending_invoices_key, invoice.id)
+            except Exception as exc:  # pylint: disable=broad-except
+                if settings.IS_RUNNING_TESTS:
+                    raise
+                stats.errors += 1
+                stats.done += 1
+                logger.exception(
+                    "Could not generate invoice",
+                    extra={
+                        "reimbursement_point_id": row.reimbursement_point_id,
+                        "cashflow_ids": row.cashflow_ids,
+                        "exc": str(exc),
+                    },
+                )
+                continue
+
+            submit_rendering(invoice, invoice_html)
+
+        drain(0)
+
+    logger.info(
+        "Finished generating invoices",
+        extra={"batch_id": batch.id, "duration": round(time.perf_counter() - start, 3)} | stats.as_log_extra(),
+    )
+    return stats
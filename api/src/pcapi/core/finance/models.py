@@ -457,6 +457,31 @@ class Pricing(Base, Model):
         return self.cashflows[0]
 
 
+class PricingPointRevenue(Base, Model):
+    """The current revenue of a pricing point for a (civil) year,
+    i.e. the sum of the amount of individual bookings that have been
+    priced and whose pricing has not been cancelled.
+
+    It is maintained by functions that create, cancel and delete
+    pricings, so that pricing an event does not have to sum all
+    pricings of the year. See `api._get_revenue_accumulator()`.
+    """
+
+    id: int = sqla.Column(sqla.BigInteger, primary_key=True, autoincrement=True)
+    pricingPointId: int = sqla.Column(sqla.BigInteger, sqla.ForeignKey("venue.id"), nullable=False)
+    year: int = sqla.Column(sqla.Integer, nullable=False)
+    # In euro cents.
+    revenue: int = sqla.Column(sqla.BigInteger, nullable=False)
+
+    __table_args__ = (
+        sqla.UniqueConstraint(
+            "pricingPointId",
+            "year",
+            name="unique_pricing_point_revenue_per_year",
+        ),
+    )
+
+
 class PricingLine(Base, Model):
     id: int = sqla.Column(sqla.BigInteger, primary_key=True, autoincrement=True)
 
@@ -86,6 +86,13 @@ def move_siret(
         set "pricingPointId" = :target_id
         where "pricingPointId" = :source_id
         """,
+        # Revenues of both pricing points are not valid anymore. They
+        # are computed again from their pricings when needed, see
+        # `api._get_revenue_accumulator()`.
+        """
+        delete from pricing_point_revenue
+        where "pricingPointId" in (:source_id, :target_id)
+        """,
         """
         update venue
         set siret = NULL, comment = :comment
@@ -202,6 +209,12 @@ def _delete_ongoing_pricings(venue: offerers_models.Venue) -> None:
         delete from pricing
         where "pricingPointId" = :venue_id and status = :validated_pricing_status
         """,
+        # The revenue of the pricing point is computed again from its
+        # remaining pricings when needed.
+        """
+        delete from pricing_point_revenue
+        where "pricingPointId" = :venue_id
+        """,
     )
 
     for query in queries:
@@ -1,3 +1,4 @@
+import io
 import logging
 import os.path
 import pathlib
@@ -15,6 +16,8 @@ from . import models
 
 logger = logging.getLogger(__name__)
 
+IRIS_COPY_BATCH_SIZE = 1000
+
 
 def import_iris_from_7z(path: str) -> None:
     if not os.path.exists(path):
@@ -33,37 +36,49 @@ def import_iris_from_7z(path: str) -> None:
 
 
 def import_iris_from_shp_file(path: pathlib.Path) -> int:
+    # Rows are written with `COPY` (by batches, to bound memory
+    # usage), which is much faster than inserting objects one by one.
     with fiona.open(path) as shapefile:
         count = 0
         transformer = pyproj.Transformer.from_crs(
             shapefile.crs,
             constants.WGS_SPATIAL_REFERENCE_IDENTIFIER,
         )
+        rows = io.StringIO()
         for feature in shapefile.values():
-            iris = models.IrisFrance(
-                code=feature.properties["CODE_IRIS"],
-                shape=_to_wkt(feature.geometry, transformer),
-            )
-            db.session.add(iris)
+            code = feature.properties["CODE_IRIS"]
+            shape = _to_wkt(feature.geometry, transformer)
+            rows.write(f"{code}\tSRID={constants.WGS_SPATIAL_REFERENCE_IDENTIFIER};{shape}\n")
             count += 1
+            if count % IRIS_COPY_BATCH_SIZE == 0:
+                _copy_iris_rows(rows)
+                rows = io.StringIO()
+        _copy_iris_rows(rows)
     return count
 
 
+def _copy_iris_rows(rows: io.StringIO) -> None:
+    rows.seek(0)
+    cursor = db.session.connection().connection.cursor()
+    try:
+        cursor.copy_expert(f"COPY {models.IrisFrance.__tablename__} (code, shape) FROM STDIN", rows)
+    finally:
+        cursor.close()
+
+
 # If this function ever gets too complex, we could use the `geomet`
 # Python package instead.
 def _to_wkt(geometry: fiona.Geometry, transformer: pyproj.Transformer) -> str:
+    def _ring(ring: list) -> str:
+        # Transform all points of the ring at once, which is much
+        # faster than transforming them one by one.
+        xs, ys = zip(*ring)
+        lats, lons = transformer.transform(xs, ys)
+        # /!\ Order must be the same as in `get_iris_from_coordinates()`.
+        return ", ".join(f"{lon} {lat}" for lat, lon in zip(lats, lons))
+
     def _polygon(rings: list) -> str:
-        s = ""
-        for ring in rings:
-            s += "("
-            for point in ring:
-                lat, lon = transformer.transform(*point)
-                # /!\ Order must be the same as in `get_iris_from_coordinates()`.
-                s += f"{lon} {lat}, "
-            s = s.rstrip(", ")
-            s += "), "
-        s = s.rstrip(", ")
-        return s
+        return ", ".join(f"({_ring(ring)})" for ring in rings)
 
     if geometry.type == "Polygon":
         return "POLYGON (%s)" % _polygon(geometry.coordinates)
@@ -1,5 +1,4 @@
 from pcapi.core import mails
-import pcapi.core.bookings.api as bookings_api
 from pcapi.core.bookings.models import Booking
 from pcapi.core.mails import models
 from pcapi.core.mails.transactional.bookings import common as bookings_common
@@ -23,6 +22,8 @@ def send_individual_booking_event_reminder_email_to_beneficiary(booking: Booking
 def get_booking_event_reminder_to_beneficiary_email_data(
     booking: Booking,
 ) -> models.TransactionalEmailData | None:
+    import pcapi.core.bookings.api as bookings_api  # avoid import loop
+
     if booking.stock.beginningDatetime is None:
         return None
 
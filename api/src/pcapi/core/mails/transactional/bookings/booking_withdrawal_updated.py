@@ -9,7 +9,7 @@ from pcapi.core.offers.models import ActivationCode
 from pcapi.core.offers.models import Offer
 from pcapi.core.offers.models import Stock
 from pcapi.core.users.models import User
-from pcapi.tasks.mails_tasks import send_withdrawal_detail_changed_emails
+from pcapi.tasks import mails_tasks
 from pcapi.tasks.serialization.mails_tasks import WithdrawalChangedMailBookingDetail
 from pcapi.tasks.serialization.mails_tasks import WithdrawalChangedMailRequest
 from pcapi.utils.date import format_time_in_second_to_human_readable
@@ -54,7 +54,7 @@ def send_email_for_each_ongoing_booking(offer: Offer) -> None:
                 offer_token=booking.activationCode.code if booking.activationCode else booking.token,
             )
         )
-    send_withdrawal_detail_changed_emails.delay(mails_request)
+    mails_tasks.send_withdrawal_detail_changed_emails.delay(mails_request)
 
 
 def send_booking_withdrawal_updated(
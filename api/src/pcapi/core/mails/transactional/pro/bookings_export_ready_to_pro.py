@@ -0,0 +1,25 @@
+from flask import render_template
+
+from pcapi.core import mails
+from pcapi.core.bookings import constants as bookings_constants
+from pcapi.core.mails import models
+from pcapi.core.users.models import User
+
+
+def send_bookings_export_ready_email(user: User, export_url: str, is_collective: bool = False) -> bool:
+    data = get_bookings_export_ready_email_data(export_url, is_collective)
+    return mails.send(recipients=[user.email], data=data)
+
+
+def get_bookings_export_ready_email_data(
+    export_url: str,
+    is_collective: bool,
+) -> models.TransactionalWithoutTemplateEmailData:
+    subject = "Votre export de réservations est prêt"
+    html_content = render_template(
+        "mails/bookings_export_ready.html",
+        export_url=export_url,
+        is_collective=is_collective,
+        retention_days=bookings_constants.BOOKINGS_EXPORT_RETENTION.days,
+    )
+    return models.TransactionalWithoutTemplateEmailData(subject=subject, html_content=html_content)
@@ -1,4 +1,8 @@
+import datetime
+import typing
+
 from pcapi import settings
+from pcapi.core.object_storage.backends.base import BaseBackend
 from pcapi.utils.module_loading import import_string
 
 
@@ -52,3 +56,41 @@ def delete_public_object(folder: str, object_id: str) -> None:
     for backend_path in _get_backends():
         backend = import_string(backend_path)
         backend().delete_public_object(folder, object_id)
+
+
+def _get_private_backend() -> BaseBackend:
+    # Private objects are stored in a single bucket, even while public
+    # objects are stored in 2 buckets (see `GCPAlternateBackend`).
+    if BACKENDS_MAPPING[LOCAL_FILE_STORAGE] in _get_backends():
+        backend_path = BACKENDS_MAPPING[LOCAL_FILE_STORAGE]
+    else:
+        backend_path = BACKENDS_MAPPING[GCP]
+    return import_string(backend_path)()
+
+
+def store_private_file(folder: str, object_id: str, file: typing.BinaryIO, content_type: str) -> None:
+    """Store the content of a file object, from its current position,
+    without reading it all in memory.
+
+    Private objects are not publicly readable: they must be served by
+    a route that checks permissions (see `open_private_object()`).
+    """
+    _get_private_backend().store_private_file(folder, object_id, file, content_type)
+
+
+def open_private_object(folder: str, object_id: str) -> typing.BinaryIO:
+    """Return a file object to read a private object. Raise
+    `FileNotFoundError` if it does not exist.
+    """
+    return _get_private_backend().open_private_object(folder, object_id)
+
+
+def list_private_objects(folder: str) -> typing.Iterator[tuple[str, datetime.datetime]]:
+    """Yield the id and the creation date of each private object of
+    the given folder.
+    """
+    return _get_private_backend().list_private_objects(folder)
+
+
+def delete_private_object(folder: str, object_id: str) -> None:
+    _get_private_backend().delete_private_object(folder, object_id)
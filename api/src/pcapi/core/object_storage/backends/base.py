@@ -1,6 +1,22 @@
+import datetime
+import typing
+
+
 class BaseBackend:
     def store_public_object(self, folder: str, object_id: str, blob: bytes, content_type: str) -> None:
         raise NotImplementedError()
 
     def delete_public_object(self, folder: str, object_id: str) -> None:
         raise NotImplementedError()
+
+    def store_private_file(self, folder: str, object_id: str, file: typing.BinaryIO, content_type: str) -> None:
+        raise NotImplementedError()
+
+    def open_private_object(self, folder: str, object_id: str) -> typing.BinaryIO:
+        raise NotImplementedError()
+
+    def list_private_objects(self, folder: str) -> typing.Iterator[tuple[str, datetime.datetime]]:
+        raise NotImplementedError()
+
+    def delete_private_object(self, folder: str, object_id: str) -> None:
+        raise NotImplementedError()
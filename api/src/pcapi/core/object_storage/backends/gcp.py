@@ -1,4 +1,6 @@
+import datetime
 import logging
+import typing
 
 from google.cloud.exceptions import NotFound
 from google.cloud.storage import Client
@@ -28,6 +30,9 @@ RETRY_STRATEGY = google.cloud.storage.retry.DEFAULT_RETRY.with_deadline(TIMEOUT)
 class GCPBackend(BaseBackend):
     bucket_credentials = settings.GCP_BUCKET_CREDENTIALS
     default_bucket_name = settings.GCP_BUCKET_NAME
+    # Objects of this bucket are not publicly readable: they are served
+    # by our own routes, which check permissions.
+    private_bucket_name = settings.GCP_PRIVATE_BUCKET_NAME
 
     def __init__(
         self,
@@ -37,10 +42,10 @@ class GCPBackend(BaseBackend):
         self.project_id = project_id or self.bucket_credentials.get("project_id")
         self.bucket_name = bucket_name or self.default_bucket_name
 
-    def get_gcp_storage_client_bucket(self) -> Bucket:
+    def get_gcp_storage_client_bucket(self, bucket_name: str | None = None) -> Bucket:
         credentials = Credentials.from_service_account_info(self.bucket_credentials)
         storage_client = Client(credentials=credentials, project=self.project_id)
-        return storage_client.bucket(self.bucket_name)
+        return storage_client.bucket(bucket_name or self.bucket_name)
 
     def store_public_object(self, folder: str, object_id: str, blob: bytes, content_type: str) -> None:
         storage_path = folder + "/" + object_id
@@ -85,6 +90,65 @@ class GCPBackend(BaseBackend):
             )
             raise exc
 
+    def store_private_file(self, folder: str, object_id: str, file: typing.BinaryIO, content_type: str) -> None:
+        storage_path = folder + "/" + object_id
+        try:
+            bucket = self.get_gcp_storage_client_bucket(self.private_bucket_name)
+            gcp_cloud_blob = bucket.blob(storage_path)
+            gcp_cloud_blob.upload_from_file(
+                file,
+                content_type=content_type,
+                timeout=TIMEOUT,
+                retry=RETRY_STRATEGY,
+            )
+        except Exception as exc:
+            logger.exception(
+                "An error has occured while trying to upload file on GCP bucket",
+                extra={
+                    "exc": exc,
+                    "project_id": self.project_id,
+                    "bucket_name": self.private_bucket_name,
+                    "storage_path": storage_path,
+                },
+            )
+            raise exc
+
+    def open_private_object(self, folder: str, object_id: str) -> typing.BinaryIO:
+        storage_path = folder + "/" + object_id
+        bucket = self.get_gcp_storage_client_bucket(self.private_bucket_name)
+        gcp_cloud_blob = bucket.blob(storage_path)
+        if not gcp_cloud_blob.exists(timeout=TIMEOUT, retry=RETRY_STRATEGY):
+            raise FileNotFoundError(storage_path)
+        # The object is downloaded by chunks, as it is read.
+        return gcp_cloud_blob.open("rb", timeout=TIMEOUT, retry=RETRY_STRATEGY)
+
+    def list_private_objects(self, folder: str) -> typing.Iterator[tuple[str, datetime.datetime]]:
+        bucket = self.get_gcp_storage_client_bucket(self.private_bucket_name)
+        prefix = folder + "/"
+        for gcp_cloud_blob in bucket.list_blobs(prefix=prefix, timeout=TIMEOUT, retry=RETRY_STRATEGY):
+            date_created = gcp_cloud_blob.time_created.astimezone(datetime.timezone.utc).replace(tzinfo=None)
+            yield gcp_cloud_blob.name.removeprefix(prefix), date_created
+
+    def delete_private_object(self, folder: str, object_id: str) -> None:
+        storage_path = folder + "/" + object_id
+        try:
+            bucket = self.get_gcp_storage_client_bucket(self.private_bucket_name)
+            gcp_cloud_blob = bucket.blob(storage_path)
+            gcp_cloud_blob.delete(timeout=TIMEOUT, retry=RETRY_STRATEGY)
+        except NotFound:
+            logger.info("File not found on deletion on GCP bucket: %s", storage_path)
+        except Exception as exc:
+            logger.exception(
+                "An error has occured while trying to delete file on GCP bucket",
+                extra={
+                    "exc": exc,
+                    "project_id": self.project_id,
+                    "bucket_name": self.private_bucket_name,
+                    "storage_path": storage_path,
+                },
+            )
+            raise exc
+
 
 class GCPAlternateBackend(GCPBackend):
     """A backend for GCP Storage that connects to an alternate bucket.
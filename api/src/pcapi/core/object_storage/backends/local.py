@@ -1,6 +1,9 @@
+import datetime
 import logging
 import os
 import pathlib
+import shutil
+import typing
 
 from pcapi import settings
 
@@ -41,3 +44,35 @@ class LocalBackend(BaseBackend):
         except OSError as exc:
             logger.exception("An error has occured while trying to delete file on local file storage: %s", exc)
             raise exc
+
+    def private_local_path(self, folder: str, object_id: str) -> pathlib.Path:
+        return settings.LOCAL_PRIVATE_STORAGE_DIR / folder / object_id
+
+    def store_private_file(self, folder: str, object_id: str, file: typing.BinaryIO, content_type: str) -> None:
+        file_local_path = self.private_local_path(folder, object_id)
+        try:
+            os.makedirs(file_local_path.parent, exist_ok=True)
+            with open(file_local_path, "wb") as new_file:
+                shutil.copyfileobj(file, new_file)
+        except Exception as exc:
+            logger.exception("An error has occured while trying to upload file on local file storage: %s", exc)
+            raise exc
+
+    def open_private_object(self, folder: str, object_id: str) -> typing.BinaryIO:
+        return open(self.private_local_path(folder, object_id), "rb")  # pylint: disable=consider-using-with
+
+    def list_private_objects(self, folder: str) -> typing.Iterator[tuple[str, datetime.datetime]]:
+        folder_path = settings.LOCAL_PRIVATE_STORAGE_DIR / folder
+        for dirpath, _dirnames, filenames in os.walk(folder_path):
+            for filename in filenames:
+                path = pathlib.Path(dirpath) / filename
+                date_created = datetime.datetime.utcfromtimestamp(path.stat().st_mtime)
+                yield str(path.relative_to(folder_path)), date_created
+
+    def delete_private_object(self, folder: str, object_id: str) -> None:
+        file_local_path = self.private_local_path(folder, object_id)
+        try:
+            os.remove(file_local_path)
+        except OSError as exc:
+            logger.exception("An error has occured while trying to delete file on local file storage: %s", exc)
+            raise exc
@@ -1,6 +1,7 @@
 import datetime
 import decimal
 import enum
+import functools
 import logging
 import typing
 
@@ -53,31 +54,28 @@ from pcapi.repository import repository
 from pcapi.repository import transaction
 from pcapi.utils import image_conversion
 import pcapi.utils.cinema_providers as cinema_providers_utils
-from pcapi.utils.custom_logic import OPERATIONS
 from pcapi.workers import push_notification_job
+from pcapi.workers import user_emails_job
 
 from . import exceptions
 from . import models
 from . import repository as offers_repository
 from . import serialize as offers_serialize
 from . import validation
+from . import validation_rules
 
 
 logger = logging.getLogger(__name__)
 
+BATCH_UPDATE_SLICE_SIZE = 1000
+WITHDRAWAL_FIELDS = {"withdrawalDetails", "withdrawalType", "withdrawalDelay"}
+
 AnyOffer = educational_models.CollectiveOffer | educational_models.CollectiveOfferTemplate | models.Offer
 
 OFFERS_RECAP_LIMIT = 501
 STOCK_LIMIT_TO_DELETE = 50
 
 
-OFFER_LIKE_MODELS = {
-    "Offer",
-    "CollectiveOffer",
-    "CollectiveOfferTemplate",
-}
-
-
 class T_UNCHANGED(enum.Enum):
     TOKEN = 0
 
@@ -440,14 +438,82 @@ def batch_update_offers(query: BaseQuery, update_fields: dict, send_email_notifi
             log_extra={"changes": set(update_fields.keys())},
         )
 
-        withdrawal_updated = {"withdrawalDetails", "withdrawalType", "withdrawalDelay"}.intersection(
-            update_fields.keys()
-        )
+        withdrawal_updated = WITHDRAWAL_FIELDS.intersection(update_fields.keys())
         if send_email_notification and withdrawal_updated:
             for offer in query_to_update.all():
                 transactional_mails.send_email_for_each_ongoing_booking(offer)
 
 
+def stream_batch_update_offers(
+    query: BaseQuery,
+    update_fields: dict,
+    send_email_notification: bool = False,
+    slice_size: int = BATCH_UPDATE_SLICE_SIZE,
+) -> int:
+    """Update offers of the query, like `batch_update_offers()`, but
+    without loading all their ids beforehand. Return the number of
+    updated offers.
+
+    Offers are updated by slices of ids (with keyset pagination), with
+    a single ``UPDATE ... RETURNING`` statement and a commit for each
+    slice. Returned ids are pushed to the indexation queue and, if
+    withdrawal information has changed, e-mails to beneficiaries are
+    sent from a separate job. Memory usage does not depend on the
+    number of offers that match the query.
+    """
+    ids_query = (
+        query.filter(models.Offer.validation == models.OfferValidationStatus.APPROVED)
+        .with_entities(models.Offer.id)
+        .order_by(None)
+        .order_by(models.Offer.id)
+    )
+    send_withdrawal_emails = send_email_notification and bool(WITHDRAWAL_FIELDS.intersection(update_fields.keys()))
+    nb_offers = 0
+    venue_ids: set[int] = set()
+    last_id = 0
+    while True:
+        slice_ids = ids_query.filter(models.Offer.id > last_id).limit(slice_size).subquery()
+        statement = (
+            sa.update(models.Offer)
+            .where(models.Offer.id.in_(sa.select(slice_ids.c.id)))
+            .values(update_fields)
+            .returning(models.Offer.id, models.Offer.venueId)
+            .execution_options(synchronize_session=False)
+        )
+        rows = db.session.execute(statement).all()
+        db.session.commit()
+        if not rows:
+            break
+
+        offer_ids = sorted(row.id for row in rows)
+        slice_venue_ids = sorted({row.venueId for row in rows})
+        last_id = offer_ids[-1]
+        nb_offers += len(offer_ids)
+        venue_ids.update(slice_venue_ids)
+
+        if "isActive" in update_fields:
+            message = "Offers has been activated" if update_fields["isActive"] else "Offers has been deactivated"
+            technical_message_id = "offers.activated" if update_fields["isActive"] else "offers.deactivated"
+            logger.info(
+                message,
+                extra={"offer_ids": offer_ids, "venue_id": slice_venue_ids},
+                technical_message_id=technical_message_id,
+            )
+        search.async_index_offer_ids(
+            offer_ids,
+            reason=search.IndexationReason.OFFER_BATCH_UPDATE,
+            log_extra={"changes": set(update_fields.keys())},
+        )
+        if send_withdrawal_emails:
+            user_emails_job.send_withdrawal_updated_emails_job.delay(offer_ids)
+
+    logger.info(
+        "Batch update of offers",
+        extra={"updated_fields": update_fields, "nb_offers": nb_offers, "venue_ids": sorted(venue_ids)},
+    )
+    return nb_offers
+
+
 def batch_update_collective_offers(query: BaseQuery, update_fields: dict) -> None:
     collective_offer_ids_tuples = query.filter(
         educational_models.CollectiveOffer.validation == models.OfferValidationStatus.APPROVED
@@ -1011,51 +1077,16 @@ def deactivate_permanently_unavailable_products(ean: str) -> bool:
     return True
 
 
-def resolve_offer_validation_sub_rule(sub_rule: models.OfferValidationSubRule, offer: AnyOffer) -> bool:
-    if sub_rule.model:
-        if sub_rule.model.value in OFFER_LIKE_MODELS and type(offer).__name__ == sub_rule.model.value:
-            object_to_compare = offer
-        elif sub_rule.model.value == "CollectiveStock" and isinstance(offer, educational_models.CollectiveOffer):
-            object_to_compare = offer.collectiveStock
-        elif sub_rule.model.value == "Venue":
-            object_to_compare = offer.venue
-        elif sub_rule.model.value == "Offerer":
-            object_to_compare = offer.venue.managingOfferer
-        else:
-            raise exceptions.UnapplicableModel()
-
-        target_attribute = getattr(object_to_compare, sub_rule.attribute.value)
-    else:
-        target_attribute = type(offer).__name__
-
-    return OPERATIONS[sub_rule.operator.value](target_attribute, sub_rule.comparated["comparated"])  # type: ignore[operator]
-
-
-def rule_flags_offer(rule: models.OfferValidationRule, offer: AnyOffer) -> bool:
-    sub_rule_flags_offer = []
-    for sub_rule in rule.subRules:
-        try:
-            sub_rule_flags_offer.append(resolve_offer_validation_sub_rule(sub_rule, offer))
-        except exceptions.UnapplicableModel:
-            sub_rule_flags_offer.append(False)
-            break
-    is_offer_flagged = all(sub_rule_flags_offer)
-    return is_offer_flagged
-
-
-def set_offer_status_based_on_fraud_criteria(offer: AnyOffer) -> models.OfferValidationStatus:
-    offer_validation_rules = models.OfferValidationRule.query.options(
-        sa.orm.joinedload(models.OfferValidationSubRule, models.OfferValidationRule.subRules)
-    ).all()
-
-    flagging_rules = []
-    for rule in offer_validation_rules:
-        if rule_flags_offer(rule, offer):
-            flagging_rules.append(rule)
-
-    if flagging_rules:
+def _set_offer_status_from_flagging_rules(
+    offer: AnyOffer, flagging_rule_ids: list[int]
+) -> models.OfferValidationStatus:
+    if flagging_rule_ids:
         status = models.OfferValidationStatus.PENDING
-        offer.flaggingValidationRules = flagging_rules
+        offer.flaggingValidationRules = (
+            models.OfferValidationRule.query.filter(models.OfferValidationRule.id.in_(flagging_rule_ids))
+            .order_by(models.OfferValidationRule.id)
+            .all()
+        )
         if isinstance(offer, models.Offer):
             compliance.update_offer_compliance_score(offer, is_primary=True)
 
@@ -1068,6 +1099,24 @@ def set_offer_status_based_on_fraud_criteria(offer: AnyOffer) -> models.OfferVal
     return status
 
 
+def set_offer_status_based_on_fraud_criteria(offer: AnyOffer) -> models.OfferValidationStatus:
+    flagging_rule_ids = validation_rules.get_flagging_rule_ids(offer)
+    return _set_offer_status_from_flagging_rules(offer, flagging_rule_ids)
+
+
+def set_offers_status_based_on_fraud_criteria(
+    offers: typing.Sequence[AnyOffer],
+) -> list[models.OfferValidationStatus]:
+    """Like `set_offer_status_based_on_fraud_criteria()`, for several
+    offers at once.
+    """
+    flagging_rule_ids_of_offers = validation_rules.get_flagging_rule_ids_of_offers(offers)
+    return [
+        _set_offer_status_from_flagging_rules(offer, flagging_rule_ids)
+        for offer, flagging_rule_ids in zip(offers, flagging_rule_ids_of_offers)
+    ]
+
+
 def _load_product_by_ean(ean: str | None) -> models.Product:
     if not ean:
         raise exceptions.MissingEAN()
@@ -1077,7 +1126,7 @@ def _load_product_by_ean(ean: str | None) -> models.Product:
     return product
 
 
-def unindex_expired_offers(process_all_expired: bool = False) -> None:
+def unindex_expired_offers(process_all_expired: bool = False, workers: int = 1) -> None:
     """Unindex offers that have expired.
 
     By default, process offers that have expired within the last 2
@@ -1087,25 +1136,36 @@ def unindex_expired_offers(process_all_expired: bool = False) -> None:
 
     If ``process_all_expired`` is true, process... well all expired
     offers.
+
+    If ``workers`` is greater than 1, batches of offers are unindexed
+    concurrently.
     """
     start_of_day = datetime.datetime.combine(datetime.date.today(), datetime.time.min)
     interval = [start_of_day - datetime.timedelta(days=2), start_of_day]
     if process_all_expired:
         interval[0] = datetime.datetime(2000, 1, 1)  # arbitrary old date
 
-    page = 0
-    limit = settings.ALGOLIA_DELETING_OFFERS_CHUNK_SIZE
-    while True:
-        offers = offers_repository.get_expired_offers(interval)
-        offers = offers.offset(page * limit).limit(limit)
-        offer_ids = [offer_id for offer_id, in offers.with_entities(models.Offer.id)]
-
-        if not offer_ids:
-            break
-
-        logger.info("[ALGOLIA] Found %d expired offers to unindex", len(offer_ids))
-        search.unindex_offer_ids(offer_ids)
-        page += 1
+    def get_ids(after_id: int, limit: int) -> list[int]:
+        offers = offers_repository.get_expired_offers(interval).filter(models.Offer.id > after_id).limit(limit)
+        return [offer_id for offer_id, in offers.with_entities(models.Offer.id)]
+
+    unindex_ids: typing.Callable[[list[int]], None] = search.unindex_offer_ids
+    after_unindex = None
+    if workers > 1:
+        # Venues are reindexed from the main thread, because it
+        # accesses the database.
+        unindex_ids = functools.partial(search.unindex_offer_ids, reindex_venues=False)
+        after_unindex = search._reindex_venues_from_offers
+
+    search.unindex_by_batches(
+        "expired_offers",
+        get_ids=get_ids,
+        unindex_ids=unindex_ids,
+        batch_size=settings.ALGOLIA_DELETING_OFFERS_CHUNK_SIZE,
+        checkpoint_tag="|".join(date.isoformat() for date in interval),
+        workers=workers,
+        after_unindex=after_unindex,
+    )
 
 
 def report_offer(
@@ -0,0 +1,52 @@
+"""Map book sections ("rayons") to their macro section.
+
+The mapping is stored in the `book_macro_section` table, which is only
+modified by migrations. It is needed to serialize each book offer when
+indexing offers, so it is loaded in each process and reloaded every
+`settings.BOOK_MACRO_SECTIONS_CACHE_TTL` seconds.
+"""
+import time
+
+from pcapi import settings
+
+from . import models
+
+
+def _load_book_macro_sections() -> dict[str, str]:
+    rows = models.BookMacroSection.query.with_entities(
+        models.BookMacroSection.section,
+        models.BookMacroSection.macroSection,
+    )
+    # Sections are compared case-insensitively (they are usually
+    # lowercase in the table, but may be capitalized by providers).
+    return {section.lower(): macro_section.strip() for section, macro_section in rows}
+
+
+class BookMacroSectionsCache:
+    """A process-wide cache of the section -> macro section mapping."""
+
+    def __init__(self) -> None:
+        self._sections: dict[str, str] | None = None
+        self._expires_at = 0.0
+
+    def get(self) -> dict[str, str]:
+        ttl = settings.BOOK_MACRO_SECTIONS_CACHE_TTL
+        if ttl <= 0:
+            return _load_book_macro_sections()
+        sections = self._sections
+        if sections is None or time.monotonic() >= self._expires_at:
+            sections = _load_book_macro_sections()
+            self._sections = sections
+            self._expires_at = time.monotonic() + ttl
+        return sections
+
+    def invalidate(self) -> None:
+        self._sections = None
+
+
+book_macro_sections_cache = BookMacroSectionsCache()
+
+
+def get_book_macro_sections() -> dict[str, str]:
+    """Return a mapping of lowercase sections to their macro section."""
+    return book_macro_sections_cache.get()
@@ -1,9 +1,18 @@
+from typing import Iterable
+
+from flask import current_app
+
 from pcapi import settings
 from pcapi.core.educational.models import CollectiveOffer
 from pcapi.core.offers.models import Offer
 from pcapi.models.feature import FeatureToggle
 
 
+OFFER_RESPONSE_CACHE_KEY_TEMPLATE = "api:native:offer:%(offer_id)s"
+OFFER_RESPONSE_CACHE_LOCK_TIMEOUT = 10  # seconds
+OFFER_RESPONSE_CACHE_INVALIDATION_CHUNK_SIZE = 1000
+
+
 def offer_app_link(offer: CollectiveOffer | Offer) -> str:
     # This link opens the mobile app if installed, the browser app otherwise
     return f"{settings.WEBAPP_V2_URL}/offre/{offer.id}"
@@ -13,3 +22,14 @@ def offer_app_redirect_link(offer: Offer) -> str:
     if FeatureToggle.ENABLE_IOS_OFFERS_LINK_WITH_REDIRECTION.is_active():
         return f"{settings.WEBAPP_V2_REDIRECT_URL}/offre/{offer.id}"
     return offer_app_link(offer)
+
+
+def invalidate_offer_response_cache(offer_ids: Iterable[int]) -> None:
+    """Remove the given offers from the cache of the native
+    `GET /offer/<id>` route.
+    """
+    if settings.NATIVE_OFFER_RESPONSE_CACHE_TTL <= 0:
+        return
+    keys = [OFFER_RESPONSE_CACHE_KEY_TEMPLATE % {"offer_id": offer_id} for offer_id in offer_ids]
+    for i in range(0, len(keys), OFFER_RESPONSE_CACHE_INVALIDATION_CHUNK_SIZE):
+        current_app.redis_client.delete(*keys[i : i + OFFER_RESPONSE_CACHE_INVALIDATION_CHUNK_SIZE])
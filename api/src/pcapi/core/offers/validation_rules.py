@@ -0,0 +1,189 @@
+"""Evaluate offer validation rules against offers.
+
+Rules (and their sub-rules) are loaded from the database and compiled
+into Python predicates, which are cached in each process for
+`settings.OFFER_VALIDATION_RULES_CACHE_TTL` seconds. When a rule is
+created, edited or deleted, `invalidate_offer_validation_rules_cache()`
+must be called: it bumps a version number stored in Redis, which each
+process checks before using its cached rules.
+"""
+import dataclasses
+import logging
+import time
+import typing
+
+import flask
+import sqlalchemy as sa
+
+from pcapi import settings
+from pcapi.core.educational import models as educational_models
+from pcapi.utils.custom_logic import compile_operation
+
+from . import exceptions
+from . import models
+
+
+logger = logging.getLogger(__name__)
+
+OFFER_LIKE_MODELS = {
+    "Offer",
+    "CollectiveOffer",
+    "CollectiveOfferTemplate",
+}
+RULES_VERSION_KEY = "pcapi:offer_validation_rules:version"
+
+AnyOffer = educational_models.CollectiveOffer | educational_models.CollectiveOfferTemplate | models.Offer
+Predicate = typing.Callable[[AnyOffer], bool]
+
+
+@dataclasses.dataclass(frozen=True)
+class CompiledRule:
+    id: int
+    name: str
+    predicates: tuple[Predicate, ...]
+
+    def flags(self, offer: AnyOffer) -> bool:
+        # The offer is flagged if all sub-rules match. A sub-rule that
+        # does not apply to this kind of offer does not match.
+        try:
+            return all(predicate(offer) for predicate in self.predicates)
+        except exceptions.UnapplicableModel:
+            return False
+
+
+def _compile_object_getter(model: models.OfferValidationModel) -> typing.Callable[[AnyOffer], typing.Any]:
+    def unapplicable(offer: AnyOffer) -> typing.Any:
+        raise exceptions.UnapplicableModel()
+
+    if model.value in OFFER_LIKE_MODELS:
+
+        def get_offer(offer: AnyOffer) -> AnyOffer:
+            if type(offer).__name__ != model.value:
+                raise exceptions.UnapplicableModel()
+            return offer
+
+        return get_offer
+    if model == models.OfferValidationModel.COLLECTIVE_STOCK:
+
+        def get_collective_stock(offer: AnyOffer) -> typing.Any:
+            if not isinstance(offer, educational_models.CollectiveOffer):
+                raise exceptions.UnapplicableModel()
+            return offer.collectiveStock
+
+        return get_collective_stock
+    if model == models.OfferValidationModel.VENUE:
+        return lambda offer: offer.venue
+    if model == models.OfferValidationModel.OFFERER:
+        return lambda offer: offer.venue.managingOfferer
+    return unapplicable
+
+
+def compile_sub_rule(sub_rule: models.OfferValidationSubRule) -> Predicate:
+    operation = compile_operation(sub_rule.operator.value, sub_rule.comparated["comparated"])
+    if not sub_rule.model:
+        return lambda offer: operation(type(offer).__name__)
+
+    get_object = _compile_object_getter(sub_rule.model)
+    attribute = sub_rule.attribute.value
+    return lambda offer: operation(getattr(get_object(offer), attribute))
+
+
+def compile_rule(rule: models.OfferValidationRule) -> CompiledRule:
+    return CompiledRule(
+        id=rule.id,
+        name=rule.name,
+        predicates=tuple(compile_sub_rule(sub_rule) for sub_rule in rule.subRules),
+    )
+
+
+def _load_and_compile_rules() -> list[CompiledRule]:
+    rules = (
+        models.OfferValidationRule.query.options(sa.orm.joinedload(models.OfferValidationRule.subRules))
+        .order_by(models.OfferValidationRule.id)
+        .all()
+    )
+    return [compile_rule(rule) for rule in rules]
+
+
+def _get_rules_version() -> str | None:
+    return flask.current_app.redis_client.get(RULES_VERSION_KEY)
+
+
+class CompiledRulesCache:
+    """A process-wide cache of compiled offer validation rules."""
+
+    def __init__(self) -> None:
+        self._rules: list[CompiledRule] | None = None
+        self._version: str | None = None
+        self._expires_at = 0.0
+
+    def get(self) -> list[CompiledRule]:
+        ttl = settings.OFFER_VALIDATION_RULES_CACHE_TTL
+        if ttl <= 0:
+            return _load_and_compile_rules()
+        try:
+            version = _get_rules_version()
+        except Exception:  # pylint: disable=broad-except
+            logger.exception("Could not get version of offer validation rules, cache will only expire after its TTL")
+            version = self._version
+        rules = self._rules
+        if rules is None or version != self._version or time.monotonic() >= self._expires_at:
+            rules = _load_and_compile_rules()
+            self._rules = rules
+            self._version = version
+            self._expires_at = time.monotonic() + ttl
+        return rules
+
+    def invalidate(self) -> None:
+        self._rules = None
+
+
+compiled_rules_cache = CompiledRulesCache()
+
+
+def invalidate_offer_validation_rules_cache() -> None:
+    """Invalidate compiled offer validation rules in all processes.
+
+    This function must be called after a rule or one of its sub-rules
+    has been created, updated or deleted (and the change committed).
+    """
+    compiled_rules_cache.invalidate()
+    try:
+        flask.current_app.redis_client.incr(RULES_VERSION_KEY)
+    except Exception:  # pylint: disable=broad-except
+        logger.exception("Could not publish invalidation of offer validation rules cache")
+
+
+def get_flagging_rule_ids(offer: AnyOffer) -> list[int]:
+    """Return ids of the validation rules that flag the offer."""
+    return [rule.id for rule in compiled_rules_cache.get() if rule.flags(offer)]
+
+
+def get_flagging_rule_ids_of_offers(offers: typing.Sequence[AnyOffer]) -> list[list[int]]:
+    """Return, for each offer, ids of the validation rules that flag it.
+
+    Rules are evaluated one after the other against all offers, and
+    the time spent on each rule is logged.
+    """
+    flagging_rule_ids: list[list[int]] = [[] for _ in offers]
+    rules_stats = []
+    for rule in compiled_rules_cache.get():
+        start = time.perf_counter()
+        flagged_count = 0
+        for offer_rule_ids, offer in zip(flagging_rule_ids, offers):
+            if rule.flags(offer):
+                offer_rule_ids.append(rule.id)
+                flagged_count += 1
+        rules_stats.append(
+            {
+                "rule_id": rule.id,
+                "rule_name": rule.name,
+                "duration": round(time.perf_counter() - start, 6),
+                "flagged_offers": flagged_count,
+            }
+        )
+    logger.info(
+        "Evaluated offer validation rules",
+        extra={"offers_count": len(offers), "rules": rules_stats},
+    )
+    return flagging_rule_ids
@@ -1,21 +1,26 @@
+import collections
 from collections.abc import Collection
+import concurrent.futures
 import dataclasses
 import datetime
 import enum
+import functools
 import logging
+import typing
+from typing import Callable
 from typing import Iterable
 
+import flask
 from flask_sqlalchemy import BaseQuery
 import sqlalchemy as sa
 
 from pcapi import settings
-from pcapi.connectors.big_query import queries as big_query_queries
-from pcapi.connectors.big_query.queries.last_30_days_booking import Last30DaysBookingsModel
 from pcapi.core.bookings import models as bookings_models
 from pcapi.core.educational import models as educational_models
 from pcapi.core.offerers import models as offerers_models
 from pcapi.core.offers import models as offers_models
 import pcapi.core.offers.repository as offers_repository
+import pcapi.core.offers.utils as offers_utils
 from pcapi.core.search.backends import base
 from pcapi.models import db
 from pcapi.models.feature import FeatureToggle
@@ -26,6 +31,8 @@ from pcapi.utils.module_loading import import_string
 
 logger = logging.getLogger(__name__)
 
+UNINDEXATION_CHECKPOINT_TIMEOUT = 3 * 24 * 60 * 60  # 3 days
+
 
 class IndexationReason(enum.Enum):
     BOOKING_CANCELLATION = "booking-cancellation"
@@ -131,6 +138,7 @@ def async_index_offer_ids(
     backend = _get_backend()
     try:
         backend.enqueue_offer_ids(offer_ids)
+        offers_utils.invalidate_offer_response_cache(offer_ids)
     except Exception:  # pylint: disable=broad-except
         if settings.IS_RUNNING_TESTS:
             raise
@@ -558,23 +566,30 @@ class BookingsCount:
     booking_count_by_ean: dict[str, int]
 
 
+def _get_first_day_of_last_bookings(days: int) -> datetime.date:
+    # Bookings are counted by day: the window covers the last `days`
+    # days, including today.
+    return (datetime.datetime.utcnow() - datetime.timedelta(days=days - 1)).date()
+
+
 def get_offers_booking_count_by_id(
     offer_ids: Iterable[int], days: int = DEFAULT_DAYS_FOR_LAST_BOOKINGS
 ) -> dict[int, int]:
     offer_booked_since_x_days = (
-        offers_models.Offer.query.join(offers_models.Offer.stocks)
-        .outerjoin(offers_models.Offer.product)
-        .join(offers_models.Stock.bookings)
+        db.session.query(
+            bookings_models.OfferDailyBookingCount.offerId,
+            sa.func.sum(bookings_models.OfferDailyBookingCount.bookingCount),
+        )
+        .join(offers_models.Offer, offers_models.Offer.id == bookings_models.OfferDailyBookingCount.offerId)
         .filter(
-            offers_models.Offer.id.in_(offer_ids),
+            bookings_models.OfferDailyBookingCount.offerId.in_(offer_ids),
+            bookings_models.OfferDailyBookingCount.day >= _get_first_day_of_last_bookings(days),
             offers_models.Offer.isActive.is_(True),
-            bookings_models.Booking.dateCreated >= datetime.datetime.utcnow() - datetime.timedelta(days=days),
-            bookings_models.Booking.status != bookings_models.BookingStatus.CANCELLED,
         )
-        .group_by(offers_models.Offer.id)
-        .with_entities(offers_models.Offer.id, sa.func.count(bookings_models.Booking.id))
+        .group_by(bookings_models.OfferDailyBookingCount.offerId)
+        .having(sa.func.sum(bookings_models.OfferDailyBookingCount.bookingCount) > 0)
     )
-    return dict(offer_booked_since_x_days)
+    return {offer_id: int(count) for offer_id, count in offer_booked_since_x_days}
 
 
 def get_last_x_days_booking_count_by_offer(offers: Iterable[offers_models.Offer]) -> dict[int, int]:
@@ -598,17 +613,13 @@ def get_last_x_days_booking_count_by_offer(offers: Iterable[offers_models.Offer]
     return default_dict
 
 
-def reindex_offer_ids(offer_ids: Iterable[int], from_error_queue: bool = False) -> None:
-    """Given a list of `Offer.id`, reindex or unindex each offer
-    (i.e. request the external indexation service an update or a
-    removal).
-
-    This function calls the external indexation service and may thus
-    be slow. It should not be called by usual code. You should rather
-    call `async_index_offer_ids()` instead to return quickly.
+def get_offers_to_index_and_unindex(
+    backend: base.SearchBackend,
+    offer_ids: Iterable[int],
+) -> tuple[list[offers_models.Offer], list[int]]:
+    """Load the given offers and split them between offers that must be
+    (re)indexed and ids of offers that must be unindexed.
     """
-    backend = _get_backend()
-
     to_add = []
     to_delete_ids = []
 
@@ -628,6 +639,22 @@ def reindex_offer_ids(offer_ids: Iterable[int], from_error_queue: bool = False)
                 extra={"source": "reindex_offer_ids", "offer": offer.id},
             )
 
+    return to_add, to_delete_ids
+
+
+def reindex_offer_ids(offer_ids: Iterable[int], from_error_queue: bool = False) -> None:
+    """Given a list of `Offer.id`, reindex or unindex each offer
+    (i.e. request the external indexation service an update or a
+    removal).
+
+    This function calls the external indexation service and may thus
+    be slow. It should not be called by usual code. You should rather
+    call `async_index_offer_ids()` instead to return quickly.
+    """
+    backend = _get_backend()
+
+    to_add, to_delete_ids = get_offers_to_index_and_unindex(backend, offer_ids)
+
     # Handle new or updated available offers
     last_x_days_bookings_count_by_offer = get_last_x_days_booking_count_by_offer(to_add)
     try:
@@ -661,7 +688,12 @@ def reindex_offer_ids(offer_ids: Iterable[int], from_error_queue: bool = False)
     _reindex_venues_from_offers(offer_ids)
 
 
-def unindex_offer_ids(offer_ids: Iterable[int]) -> None:
+def unindex_offer_ids(offer_ids: Iterable[int], reindex_venues: bool = True) -> None:
+    """Unindex the given offers.
+
+    If `reindex_venues` is False, the database is not accessed, and the
+    caller is responsible for calling `_reindex_venues_from_offers()`.
+    """
     backend = _get_backend()
     try:
         backend.unindex_offer_ids(offer_ids)
@@ -670,8 +702,99 @@ def unindex_offer_ids(offer_ids: Iterable[int]) -> None:
             raise
         logger.exception("Could not unindex offers", extra={"offers": offer_ids})
 
-    # some offers changes might make some venue ineligible for search
-    _reindex_venues_from_offers(offer_ids)
+    if reindex_venues:
+        # some offers changes might make some venue ineligible for search
+        _reindex_venues_from_offers(offer_ids)
+
+
+def _get_unindexation_checkpoint_key(name: str) -> str:
+    return f"pcapi:search:unindexation_checkpoint:{name}"
+
+
+def unindex_by_batches(
+    name: str,
+    get_ids: Callable[[int, int], list[int]],
+    unindex_ids: Callable[[list[int]], None],
+    batch_size: int,
+    checkpoint_tag: str = "",
+    workers: int = 1,
+    after_unindex: Callable[[list[int]], None] | None = None,
+) -> None:
+    """Unindex objects by batches of ids, until `get_ids` returns an
+    empty list.
+
+    `get_ids(after_id, limit)` must return up to `limit` ids, sorted,
+    that are greater than `after_id` (keyset pagination). Each batch is
+    passed to `unindex_ids`. If `workers` is greater than 1, batches
+    are unindexed from a pool of threads, each in its own application
+    context: `unindex_ids` must then not access the database.
+    `after_unindex` is called with each batch from the main thread,
+    once the batch has been unindexed.
+
+    The last unindexed id is stored in Redis, so that a job that has
+    been interrupted resumes where it stopped if it is run again with
+    the same `name` and `checkpoint_tag` (e.g. an interval of dates).
+    """
+    redis_client = flask.current_app.redis_client
+    checkpoint_key = _get_unindexation_checkpoint_key(name)
+    after_id = 0
+    checkpoint = redis_client.get(checkpoint_key)
+    if checkpoint:
+        tag, _, last_id = checkpoint.rpartition(":")
+        if tag == checkpoint_tag:
+            after_id = int(last_id)
+            logger.info("Resuming unindexation from checkpoint", extra={"name": name, "after_id": after_id})
+
+    def complete(batch_ids: list[int], future: concurrent.futures.Future) -> None:
+        future.result()
+        if after_unindex:
+            after_unindex(batch_ids)
+        redis_client.set(
+            checkpoint_key,
+            f"{checkpoint_tag}:{batch_ids[-1]}",
+            ex=UNINDEXATION_CHECKPOINT_TIMEOUT,
+        )
+
+    executor: concurrent.futures.Executor
+    if workers > 1:
+        executor = concurrent.futures.ThreadPoolExecutor(max_workers=workers)
+        # The search backend needs an application context (to get the
+        # Redis client), which is local to the main thread.
+        app = flask.current_app._get_current_object()  # type: ignore [attr-defined]
+        unindex_ids = functools.partial(_call_in_app_context, app, unindex_ids)
+    else:
+        executor = InlineExecutor()
+
+    in_flight: collections.deque[tuple[list[int], concurrent.futures.Future]] = collections.deque()
+    with executor:
+        while ids := get_ids(after_id, batch_size):
+            logger.info("[ALGOLIA] Found %d %s to unindex", len(ids), name.replace("_", " "))
+            in_flight.append((ids, executor.submit(unindex_ids, ids)))
+            after_id = ids[-1]
+            # Complete batches in order, so that the checkpoint never
+            # goes beyond a batch that has not been unindexed.
+            while in_flight and (in_flight[0][1].done() or len(in_flight) >= 2 * workers):
+                complete(*in_flight.popleft())
+        while in_flight:
+            complete(*in_flight.popleft())
+    redis_client.delete(checkpoint_key)
+
+
+def _call_in_app_context(app: flask.Flask, func: Callable, /, *args: typing.Any) -> typing.Any:
+    with app.app_context():
+        return func(*args)
+
+
+class InlineExecutor(concurrent.futures.Executor):
+    """An executor that runs functions in the calling thread."""
+
+    def submit(self, fn: Callable, /, *args: typing.Any, **kwargs: typing.Any) -> concurrent.futures.Future:
+        future: concurrent.futures.Future = concurrent.futures.Future()
+        try:
+            future.set_result(fn(*args, **kwargs))
+        except Exception as exc:  # pylint: disable=broad-except
+            future.set_exception(exc)
+        return future
 
 
 def unindex_all_offers() -> None:
@@ -791,9 +914,20 @@ def unindex_all_venues() -> None:
 
 
 def get_last_30_days_bookings_for_eans() -> dict[str, int]:
-    rows: Iterable[Last30DaysBookingsModel] = big_query_queries.Last30DaysBookings().execute()
-    ean_booking_count = {row.ean: row.booking_count for row in rows if row.ean}
-    return ean_booking_count
+    rows = (
+        db.session.query(
+            bookings_models.OfferDailyBookingCount.ean,
+            sa.func.sum(bookings_models.OfferDailyBookingCount.bookingCount),
+        )
+        .filter(
+            bookings_models.OfferDailyBookingCount.ean.isnot(None),
+            bookings_models.OfferDailyBookingCount.day
+            >= _get_first_day_of_last_bookings(DEFAULT_DAYS_FOR_LAST_BOOKINGS),
+        )
+        .group_by(bookings_models.OfferDailyBookingCount.ean)
+        .having(sa.func.sum(bookings_models.OfferDailyBookingCount.bookingCount) > 0)
+    )
+    return {ean: int(count) for ean, count in rows}
 
 
 def update_products_last_30_days_booking_count() -> None:
@@ -3,6 +3,8 @@ import contextlib
 import datetime
 import decimal
 import enum
+import hashlib
+import json
 import logging
 import re
 from typing import Iterable
@@ -12,7 +14,6 @@ import algoliasearch.http.requester
 import algoliasearch.search_client
 from flask import current_app
 import redis
-import sqlalchemy as sa
 
 from pcapi import settings
 from pcapi.core.educational.academies import get_academy_from_department
@@ -20,8 +21,9 @@ import pcapi.core.educational.api.offer as educational_api_offer
 import pcapi.core.educational.models as educational_models
 import pcapi.core.offerers.api as offerers_api
 import pcapi.core.offerers.models as offerers_models
+from pcapi.core.offers.book_macro_sections import get_book_macro_sections
 import pcapi.core.offers.models as offers_models
-from pcapi.core.providers import titelive_gtl
+from pcapi.core.providers import titelive_utils
 from pcapi.core.search.backends import base
 from pcapi.domain.music_types import MUSIC_TYPES_LABEL_BY_CODE
 from pcapi.domain.show_types import SHOW_TYPES_LABEL_BY_CODE
@@ -60,7 +62,33 @@ QUEUES = (
     REDIS_COLLECTIVE_OFFER_IDS_IN_ERROR_TO_INDEX,
     REDIS_COLLECTIVE_OFFER_TEMPLATE_IDS_IN_ERROR_TO_INDEX,
 )
+# Hashmap of indexed offers: `offer.id -> hash of the last document
+# sent to Algolia` (see `get_document_hash`).
 REDIS_HASHMAP_INDEXED_OFFERS_NAME = "indexed_offers"
+# Total number of offer documents that have been pushed to Algolia, or
+# skipped because they had not changed.
+REDIS_HASH_OFFERS_INDEXATION_COUNTERS_NAME = "search:algolia:offers-indexation:counters"
+
+# Move up to ARGV[1] items from the tail of KEYS[1] to the head of
+# KEYS[2] and return them. The result is the same as calling RPOPLPUSH
+# ARGV[1] times, but it is done in a single command. Items are pushed
+# by chunks to stay below the maximum number of arguments of `unpack`.
+MOVE_IDS_SCRIPT = """
+local items = redis.call("LRANGE", KEYS[1], -tonumber(ARGV[1]), -1)
+local count = #items
+if count == 0 then
+    return items
+end
+redis.call("LTRIM", KEYS[1], 0, -count - 1)
+for i = count, 1, -1000 do
+    local chunk = {}
+    for j = i, math.max(i - 999, 1), -1 do
+        chunk[#chunk + 1] = items[j]
+    end
+    redis.call("LPUSH", KEYS[2], unpack(chunk))
+end
+return items
+"""
 
 
 DEFAULT_LONGITUDE = 2.409289
@@ -99,6 +127,18 @@ def get_last_30_days_bookings_range(quantity: int) -> str | None:
     return Last30DaysBookingsRange.VERY_LOW.value
 
 
+def get_document_hash(document: dict) -> str:
+    """Return a compact hash of a serialized document, to detect
+    whether it has changed since it was last sent to Algolia.
+
+    Lists are hashed as they are: serializers must sort those that
+    are built from sets or relationships, so that the hash does not
+    depend on the process that computed it.
+    """
+    serialized = json.dumps(document, sort_keys=True, default=str)
+    return hashlib.blake2b(serialized.encode("utf-8"), digest_size=8).hexdigest()
+
+
 def url_path(url: str) -> str | None:
     """Return the path component of a URL.
 
@@ -295,15 +335,9 @@ class AlgoliaBackend(base.SearchBackend):
         timestamp = datetime.datetime.utcnow().timestamp()
         processing_queue = f"{queue}:processing:{timestamp}"
         try:
-            with self.redis_client.pipeline(transaction=True) as pipeline:
-                for _ in range(count):
-                    # Google Cloud has Redis 5.0. When it's migrated to 6.2 or
-                    # newer, we can use `lmove` or `smove` instead.
-                    pipeline.rpoplpush(queue, processing_queue)
-                results = pipeline.execute()
-                # `results` may contain `None` if there were less than {count} items.
-                yield {int(id_) for id_ in results if id_ is not None}  # str -> int
-                self.redis_client.delete(processing_queue)
+            results = self._move_ids(queue, processing_queue, count)
+            yield {int(id_) for id_ in results}  # str -> int
+            self.redis_client.delete(processing_queue)
         except redis.exceptions.RedisError:
             logger.exception(
                 "Could not pop object ids to index from queue",
@@ -311,6 +345,31 @@ class AlgoliaBackend(base.SearchBackend):
             )
             yield set()
 
+    def _move_ids(self, source: str, destination: str, count: int) -> list[str]:
+        """Atomically move up to `count` items from the tail of the
+        `source` list to the head of the `destination` list, and
+        return them.
+        """
+        if count <= 0:
+            return []
+        try:
+            return self.redis_client.register_script(MOVE_IDS_SCRIPT)(keys=[source, destination], args=[count])
+        except redis.exceptions.ResponseError:
+            # Scripting may be disabled on the Redis server. Fall back
+            # to one RPOPLPUSH per item (`LMOVE` would require Redis
+            # 6.2, Google Cloud has Redis 5.0).
+            logger.warning(
+                "Could not move ids with Lua script, falling back to RPOPLPUSH",
+                extra={"source": source, "destination": destination},
+                exc_info=True,
+            )
+        with self.redis_client.pipeline(transaction=True) as pipeline:
+            for _ in range(count):
+                pipeline.rpoplpush(source, destination)
+            results = pipeline.execute()
+        # `results` contains `None` if there were less than {count} items.
+        return [id_ for id_ in results if id_ is not None]
+
     def count_offers_to_index_from_queue(self, from_error_queue: bool = False) -> int:
         if from_error_queue:
             queue = REDIS_OFFER_IDS_IN_ERROR_NAME
@@ -341,28 +400,74 @@ class AlgoliaBackend(base.SearchBackend):
             # cache so that we do perform a request to Algolia.
             return True
 
-    def index_offers(self, offers: Iterable[offers_models.Offer], last_30_days_bookings: dict[int, int]) -> None:
+    def index_offers(
+        self,
+        offers: Iterable[offers_models.Offer],
+        last_30_days_bookings: dict[int, int],
+        force: bool = False,
+    ) -> None:
         if not offers:
             return
-        objects = [self.serialize_offer(offer, last_30_days_bookings.get(offer.id) or 0) for offer in offers]
-        self.algolia_offers_client.save_objects(objects)
+        book_macro_sections = get_book_macro_sections()
+        objects = [
+            self.serialize_offer(offer, last_30_days_bookings.get(offer.id) or 0, book_macro_sections)
+            for offer in offers
+        ]
+        self.index_serialized_offers(objects, force=force)
+
+    def index_serialized_offers(self, objects: list[dict], force: bool = False) -> None:
+        """Send already serialized offers (see `serialize_offer`) to
+        Algolia.
+
+        We store a hash of each document that we send. Unless `force`
+        is set, documents that have not changed since they were last
+        sent are skipped.
+
+        This does not touch the database and may thus be called from
+        another thread than the one that loaded and serialized the
+        offers.
+        """
+        if not objects:
+            return
+        hashes = {str(obj["objectID"]): get_document_hash(obj) for obj in objects}
 
+        if force:
+            objects_to_push = objects
+        else:
+            try:
+                previous_hashes = self.redis_client.hmget(REDIS_HASHMAP_INDEXED_OFFERS_NAME, list(hashes))
+            except redis.exceptions.RedisError:
+                if settings.IS_RUNNING_TESTS:
+                    raise
+                logger.exception("Could not get hashes of indexed offers", extra={"offers": list(hashes)})
+                previous_hashes = [None] * len(hashes)
+            unchanged = {
+                object_id
+                for object_id, previous_hash in zip(hashes, previous_hashes)
+                if previous_hash == hashes[object_id]
+            }
+            objects_to_push = [obj for obj in objects if str(obj["objectID"]) not in unchanged]
+
+        if objects_to_push:
+            self.algolia_offers_client.save_objects(objects_to_push)
+
+        skipped_count = len(objects) - len(objects_to_push)
+        logger.info(
+            "Sent offers to Algolia",
+            extra={"pushed": len(objects_to_push), "skipped": skipped_count, "force": force},
+        )
         try:
-            # We used to store a summary of each offer, which is why
-            # we used hashmap and not a set. But since we don't need
-            # the value anymore, we can store the lightest object
-            # possible to make Redis use less memory. In the future,
-            # we may even remove the hashmap if it's not proven useful
-            # (see log in reindex_offer_ids)
-            offer_ids = [offer.id for offer in offers]
-            pipeline = self.redis_client.pipeline(transaction=True)
-            for offer_id in offer_ids:
-                pipeline.hset(REDIS_HASHMAP_INDEXED_OFFERS_NAME, str(offer_id), "")
-            pipeline.execute()
+            with self.redis_client.pipeline(transaction=False) as pipeline:
+                if objects_to_push:
+                    pipeline.hset(
+                        REDIS_HASHMAP_INDEXED_OFFERS_NAME,
+                        mapping={str(obj["objectID"]): hashes[str(obj["objectID"])] for obj in objects_to_push},
+                    )
+                pipeline.hincrby(REDIS_HASH_OFFERS_INDEXATION_COUNTERS_NAME, "pushed", len(objects_to_push))
+                pipeline.hincrby(REDIS_HASH_OFFERS_INDEXATION_COUNTERS_NAME, "skipped", skipped_count)
+                pipeline.execute()
         except Exception:  # pylint: disable=broad-except
-            logger.exception("Could not add to list of indexed offers", extra={"offers": offer_ids})
-        finally:
-            pipeline.reset()
+            logger.exception("Could not add to list of indexed offers", extra={"offers": list(hashes)})
 
     def index_collective_offers(
         self,
@@ -451,7 +556,12 @@ class AlgoliaBackend(base.SearchBackend):
         self.algolia_collective_offers_templates_client.clear_objects()
 
     @classmethod
-    def serialize_offer(cls, offer: offers_models.Offer, last_30_days_bookings: int) -> dict:
+    def serialize_offer(
+        cls,
+        offer: offers_models.Offer,
+        last_30_days_bookings: int,
+        book_macro_sections: dict[str, str] | None = None,
+    ) -> dict:
         venue = offer.venue
         offerer = venue.managingOfferer
         prices = map(lambda stock: stock.price, offer.bookableStocks)
@@ -465,7 +575,7 @@ class AlgoliaBackend(base.SearchBackend):
             ]
         date_created = offer.dateCreated.timestamp()
         stocks_date_created = [stock.dateCreated.timestamp() for stock in offer.bookableStocks]
-        tags = [criterion.name for criterion in offer.criteria]
+        tags = sorted(criterion.name for criterion in offer.criteria)
         extra_data = offer.extraData or {}
         artist = " ".join(str(extra_data.get(key, "")) for key in ("author", "performer", "speaker", "stageDirector"))
 
@@ -493,22 +603,15 @@ class AlgoliaBackend(base.SearchBackend):
         macro_section = None
         section = (extra_data.get("rayon") or "").strip().lower()
         if section:
-            try:
-                macro_section = (
-                    offers_models.BookMacroSection.query.filter(
-                        sa.func.lower(offers_models.BookMacroSection.section) == section
-                    )
-                    .with_entities(offers_models.BookMacroSection.macroSection)
-                    .scalar()
-                ).strip()
-            except AttributeError:
-                macro_section = None
+            if book_macro_sections is None:
+                book_macro_sections = get_book_macro_sections()
+            macro_section = book_macro_sections.get(section)
 
         #  The "gtl" code has been set in July 2023 on products only. Offers that were created before do not have "gtl" in their extraData.
         #  This is why we must look at offer.product.extraData and not offer.extraData
         product_extra_data = offer.product.extraData if offer.product and offer.product.extraData else {}
         gtl_id = product_extra_data.get("gtl_id")
-        gtl = titelive_gtl.get_gtl(gtl_id) if gtl_id else None
+        gtl = titelive_utils.get_gtl(gtl_id) if gtl_id else None
 
         # If you update this dictionary, please check whether you need to
         # also update `core.offerers.api.VENUE_ALGOLIA_INDEXED_FIELDS`.
@@ -551,7 +654,7 @@ class AlgoliaBackend(base.SearchBackend):
                 "subcategoryId": offer.subcategory.id,
                 "thumbUrl": url_path(offer.thumbUrl) if offer.thumbUrl else None,
                 "tags": tags,
-                "times": list(set(times)),
+                "times": sorted(set(times)),
                 "visa": extra_data.get("visa"),
             },
             "offerer": {
@@ -594,7 +697,7 @@ class AlgoliaBackend(base.SearchBackend):
             "twitter": social_medias.get("twitter"),
             "instagram": social_medias.get("instagram"),
             "snapchat": social_medias.get("snapchat"),
-            "tags": [criterion.name for criterion in venue.criteria],
+            "tags": sorted(criterion.name for criterion in venue.criteria),
             "banner_url": venue.bannerUrl,
             "_geoloc": position(venue),
             "has_at_least_one_bookable_offer": has_at_least_one_bookable_offer,
@@ -621,7 +724,7 @@ class AlgoliaBackend(base.SearchBackend):
                 "name": collective_offer.name,
                 "students": [student.value for student in collective_offer.students],
                 "subcategoryId": collective_offer.subcategoryId,
-                "domains": [domain.id for domain in collective_offer.domains],
+                "domains": sorted(domain.id for domain in collective_offer.domains),
                 "educationalInstitutionUAICode": collective_offer.institution.institutionId
                 if collective_offer.institution
                 else "all",
@@ -669,7 +772,7 @@ class AlgoliaBackend(base.SearchBackend):
                 "name": collective_offer_template.name,
                 "students": [student.value for student in collective_offer_template.students],
                 "subcategoryId": collective_offer_template.subcategoryId,
-                "domains": [domain.id for domain in collective_offer_template.domains],
+                "domains": sorted(domain.id for domain in collective_offer_template.domains),
                 "educationalInstitutionUAICode": "all",
                 "interventionArea": collective_offer_template.interventionArea,
                 "schoolInterventionArea": collective_offer_template.interventionArea
@@ -708,30 +811,25 @@ class AlgoliaBackend(base.SearchBackend):
                 timestamp = float(processing_queue.rsplit(":")[-1])
                 if timestamp > datetime.datetime.utcnow().timestamp() - 60 * 60:
                     continue  # less than 1 hour ago, too recent, could still be processing
-                with redis_client.pipeline(transaction=True) as pipeline:
-                    try:
-                        count = redis_client.llen(processing_queue)
-                        for _i in range(count):
-                            # Google Cloud has Redis 5.0. When it's migrated to 6.2 or
-                            # newer, we can use `lmove` or `smove` instead.
-                            pipeline.rpoplpush(processing_queue, originating_queue)
-                            pipeline.execute()
-                    except Exception:  # pylint: disable=broad-exception-caught
-                        # That's not critical: the processing queue will
-                        # still be here, and can be handled in the next run
-                        # of this function. But we raise a warning because
-                        # it may denote a problem with our code or with
-                        # Redis.
-                        logger.exception(
-                            "Failed to handle indexation processing queue: %s (will try again)",
-                            processing_queue,
-                            exc_info=True,
-                        )
-                    else:
-                        logger.info(
-                            "Found old processing queue, moved back items to originating queue",
-                            extra={"queue": originating_queue, "processing_queue": processing_queue},
-                        )
+                try:
+                    count = redis_client.llen(processing_queue)
+                    self._move_ids(processing_queue, originating_queue, count)
+                except Exception:  # pylint: disable=broad-exception-caught
+                    # That's not critical: the processing queue will
+                    # still be here, and can be handled in the next run
+                    # of this function. But we raise a warning because
+                    # it may denote a problem with our code or with
+                    # Redis.
+                    logger.exception(
+                        "Failed to handle indexation processing queue: %s (will try again)",
+                        processing_queue,
+                        exc_info=True,
+                    )
+                else:
+                    logger.info(
+                        "Found old processing queue, moved back items to originating queue",
+                        extra={"queue": originating_queue, "processing_queue": processing_queue},
+                    )
 
 
 def position(venue: offerers_models.Venue) -> dict[str, float]:
@@ -52,7 +52,15 @@ class SearchBackend:
     def check_offer_is_indexed(self, offer: "offers_models.Offer") -> bool:
         raise NotImplementedError()
 
-    def index_offers(self, offers: "Iterable[offers_models.Offer]", last_30_days_bookings: dict[int, int]) -> None:
+    def index_offers(
+        self,
+        offers: "Iterable[offers_models.Offer]",
+        last_30_days_bookings: dict[int, int],
+        force: bool = False,
+    ) -> None:
+        raise NotImplementedError()
+
+    def index_serialized_offers(self, objects: list[dict], force: bool = False) -> None:
         raise NotImplementedError()
 
     def index_collective_offers(self, collective_offers: "Iterable[educational_models.CollectiveOffer]") -> None:
@@ -109,7 +117,12 @@ class SearchBackend:
         raise NotImplementedError()
 
     @classmethod
-    def serialize_offer(cls, offer: "offers_models.Offer", last_30_days_bookings: int) -> dict:
+    def serialize_offer(
+        cls,
+        offer: "offers_models.Offer",
+        last_30_days_bookings: int,
+        book_macro_sections: dict[str, str] | None = None,
+    ) -> dict:
         raise NotImplementedError()
 
     @classmethod
@@ -1,4 +1,5 @@
 import logging
+import time
 import typing
 
 import click
@@ -11,7 +12,9 @@ import pcapi.core.educational.repository as collective_offers_repository
 from pcapi.core.offerers import api as offerers_api
 import pcapi.core.offers.api as offers_api
 import pcapi.core.offers.repository as offers_repository
+from pcapi.core.search import parallel_indexation
 from pcapi.core.search import staging_indexation
+from pcapi.core.search.backends import algolia
 from pcapi.scheduled_tasks.decorators import log_cron_with_transaction
 from pcapi.utils.blueprint import Blueprint
 from pcapi.utils.chunks import get_chunks
@@ -28,6 +31,29 @@ def index_offers_in_algolia_by_offer() -> None:
     search.index_offers_in_queue()
 
 
+@blueprint.cli.command("index_offers_in_algolia_by_offer_in_parallel")
+@click.option("--processes", help="Number of worker processes", type=int, default=4)
+@click.option("--max-in-flight", help="Max number of batches being sent by each process", type=int, default=2)
+@click.option("--stop-only-when-empty", help="Process the whole queue", is_flag=True, default=False)
+@click.option("--from-error-queue", help="Process the error queue", is_flag=True, default=False)
+@log_cron_with_transaction
+def index_offers_in_algolia_by_offer_in_parallel(
+    processes: int,
+    max_in_flight: int,
+    stop_only_when_empty: bool,
+    from_error_queue: bool,
+) -> None:
+    """Pop offers from indexation queue and reindex them with several
+    worker processes.
+    """
+    parallel_indexation.index_offers_in_queue_in_parallel(
+        processes=processes,
+        max_in_flight=max_in_flight,
+        stop_only_when_empty=stop_only_when_empty,
+        from_error_queue=from_error_queue,
+    )
+
+
 @blueprint.cli.command("index_offers_in_algolia_by_venue")
 @log_cron_with_transaction
 def index_offers_in_algolia_by_venue() -> None:
@@ -50,34 +76,37 @@ def index_collective_offer_templates() -> None:
 
 
 @blueprint.cli.command("delete_expired_offers_in_algolia")
+@click.option("--workers", help="Number of batches unindexed concurrently", type=int, default=1)
 @log_cron_with_transaction
-def delete_expired_offers_in_algolia() -> None:
+def delete_expired_offers_in_algolia(workers: int) -> None:
     """Unindex offers that have expired.
 
     By default, process offers that have expired within the last 2
     days. For example, if run on Thursday (whatever the time), this
     function handles offers that have expired between Tuesday 00:00
     and Wednesday 23:59 (included)."""
-    offers_api.unindex_expired_offers()
+    offers_api.unindex_expired_offers(workers=workers)
 
 
 @blueprint.cli.command("delete_expired_collective_offers_in_algolia")
+@click.option("--workers", help="Number of batches unindexed concurrently", type=int, default=1)
 @log_cron_with_transaction
-def delete_expired_collective_offers_in_algolia() -> None:
+def delete_expired_collective_offers_in_algolia(workers: int) -> None:
     """Unindex collective offers that have expired.
 
     By default, process collective offers that have expired within the last 2
     days. For example, if run on Thursday (whatever the time), this
     function handles collective offers that have expired between Tuesday 00:00
     and Wednesday 23:59 (included)."""
-    unindex_expired_collective_offers()
+    unindex_expired_collective_offers(workers=workers)
 
 
 @blueprint.cli.command("delete_expired_collective_offers_template_in_algolia")
+@click.option("--workers", help="Number of batches unindexed concurrently", type=int, default=1)
 @log_cron_with_transaction
-def delete_expired_collective_offers_template_in_algolia() -> None:
+def delete_expired_collective_offers_template_in_algolia(workers: int) -> None:
     """Unindex collective offers template that have expired."""
-    unindex_expired_collective_offers_template()
+    unindex_expired_collective_offers_template(workers=workers)
 
 
 @blueprint.cli.command("index_offers_in_error_in_algolia_by_offer")
@@ -267,3 +296,49 @@ def index_offers_staging(
 @blueprint.cli.command("clean_indexation_processing_queues")
 def clean_indexation_processing_queues() -> None:
     search.clean_processing_queues()
+
+
+@blueprint.cli.command("benchmark_pop_ids_from_queue")
+@click.option("--count", help="Number of ids to pop at once", type=int, default=1_000)
+@click.option("--iterations", help="Number of pops to measure", type=int, default=20)
+def benchmark_pop_ids_from_queue(count: int, iterations: int) -> None:
+    """Compare the Lua script used to pop ids from indexation queues
+    with one pipelined RPOPLPUSH per id (the former implementation).
+
+    Only temporary keys are used, but do not run it on production.
+    """
+    if settings.IS_PROD:
+        raise ValueError("This benchmark must not be run on this environment")
+    backend = search._get_backend()
+    assert isinstance(backend, algolia.AlgoliaBackend)
+    redis_client = backend.redis_client
+    source = "search:benchmark:pop-ids:list"
+    destination = "search:benchmark:pop-ids:list:processing"
+
+    def pipelined_rpoplpush() -> None:
+        with redis_client.pipeline(transaction=True) as pipeline:
+            for _ in range(count):
+                pipeline.rpoplpush(source, destination)
+            pipeline.execute()
+
+    def lua_script() -> None:
+        backend._move_ids(source, destination, count)
+
+    for name, pop in (("pipelined RPOPLPUSH", pipelined_rpoplpush), ("Lua script", lua_script)):
+        durations = []
+        try:
+            for _ in range(iterations):
+                redis_client.delete(source, destination)
+                redis_client.lpush(source, *range(count))
+                start = time.perf_counter()
+                pop()
+                durations.append(time.perf_counter() - start)
+                assert redis_client.llen(destination) == count
+        finally:
+            redis_client.delete(source, destination)
+        durations.sort()
+        print(
+            f"{name}: {count} ids, {iterations} iterations: "
+            f"median = {durations[len(durations) // 2] * 1000:.2f} ms, "
+            f"max = {durations[-1] * 1000:.2f} ms"
+        )
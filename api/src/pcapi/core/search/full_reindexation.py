@@ -0,0 +1,386 @@
+"""Reindex all active offers (or collective offers) in parallel.
+
+A full reindexation goes through the whole id space of a table, which
+takes hours. This module:
+
+- splits the id space in ranges of `range_size` ids, which are
+  handled by a pool of processes. Each range is handled in batches of
+  `BATCH_SIZE` ids: offers of a batch are loaded (once), filtered and
+  sent to the search backend;
+- saves a checkpoint in Redis after each batch (the last id of the
+  range that has been handled), along with the plan of the run (its
+  bounds and the size of its ranges). An interrupted run can thus be
+  resumed with `resume=True`, which skips what has already been done;
+- retries failed ranges, from their last checkpoint, up to
+  `max_attempts` times. Ranges that still fail are logged and can be
+  retried later by resuming the run;
+- logs the overall progress, throughput and ETA after each range.
+
+As with the former scripts, offers that are not eligible for search
+are NOT unindexed: we suppose that they have already been unindexed
+by the normally-run code.
+"""
+import collections
+import concurrent.futures
+import dataclasses
+import datetime
+import logging
+import multiprocessing
+import time
+import typing
+
+import flask
+import pytz
+import sqlalchemy as sa
+
+from pcapi import settings
+from pcapi.core import search
+import pcapi.core.educational.models as educational_models
+import pcapi.core.offers.models as offers_models
+from pcapi.core.search.backends import base
+from pcapi.models import db
+
+
+logger = logging.getLogger(__name__)
+
+BATCH_SIZE = 1_000
+DEFAULT_RANGE_SIZE = 100_000
+DEFAULT_MAX_ATTEMPTS = 3
+PLAN_KEY = "pcapi:full_reindexation:{target}:plan"
+CHECKPOINTS_KEY = "pcapi:full_reindexation:{target}:checkpoints"
+
+
+def _index_offers(backend: base.SearchBackend, start: int, end: int) -> int:
+    offers = (
+        search.get_base_query_for_offer_indexation()
+        .filter(
+            offers_models.Offer.isActive.is_(True),
+            offers_models.Offer.id.between(start, end),
+        )
+        .order_by(offers_models.Offer.id)
+        .all()
+    )
+    offers = [offer for offer in offers if offer.is_eligible_for_search]
+    last_x_days_bookings_count_by_offer = search.get_last_x_days_booking_count_by_offer(offers)
+    backend.index_offers(offers, last_x_days_bookings_count_by_offer, force=True)
+    return len(offers)
+
+
+def _index_collective_offers(backend: base.SearchBackend, start: int, end: int) -> int:
+    collective_offers = (
+        search.get_base_query_for_collective_offer_indexation()
+        .filter(
+            educational_models.CollectiveOffer.isActive.is_(True),
+            educational_models.CollectiveOffer.id.between(start, end),
+        )
+        .order_by(educational_models.CollectiveOffer.id)
+        .all()
+    )
+    collective_offers = [offer for offer in collective_offers if offer.is_eligible_for_search]
+    backend.index_collective_offers(collective_offers)
+    return len(collective_offers)
+
+
+def _index_collective_offer_templates(backend: base.SearchBackend, start: int, end: int) -> int:
+    templates = (
+        search.get_base_query_for_collective_template_offer_indexation()
+        .filter(
+            educational_models.CollectiveOfferTemplate.isActive.is_(True),
+            educational_models.CollectiveOfferTemplate.id.between(start, end),
+        )
+        .order_by(educational_models.CollectiveOfferTemplate.id)
+        .all()
+    )
+    templates = [template for template in templates if template.is_eligible_for_search]
+    backend.index_collective_offer_templates(templates)
+    return len(templates)
+
+
+@dataclasses.dataclass(frozen=True)
+class Target:
+    name: str
+    model: typing.Any
+    # Index eligible objects whose id is between `start` and `end`
+    # (inclusive), and return their number.
+    index_batch: typing.Callable[[base.SearchBackend, int, int], int]
+
+
+TARGETS = {
+    target.name: target
+    for target in (
+        Target("offers", offers_models.Offer, _index_offers),
+        Target("collective_offers", educational_models.CollectiveOffer, _index_collective_offers),
+        Target(
+            "collective_offer_templates",
+            educational_models.CollectiveOfferTemplate,
+            _index_collective_offer_templates,
+        ),
+    )
+}
+
+
+@dataclasses.dataclass(frozen=True)
+class IdRange:
+    start: int
+    end: int  # inclusive
+
+    @property
+    def size(self) -> int:
+        return self.end - self.start + 1
+
+
+@dataclasses.dataclass(frozen=True)
+class Plan:
+    start: int
+    end: int
+    range_size: int
+
+    @property
+    def ranges(self) -> list[IdRange]:
+        return [
+            IdRange(start, min(start + self.range_size - 1, self.end))
+            for start in range(self.start, self.end + 1, self.range_size)
+        ]
+
+
+@dataclasses.dataclass
+class RangeResult:
+    id_range: IdRange
+    handled_ids: int
+    indexed: int
+
+
+@dataclasses.dataclass
+class ReindexationStats:
+    total_ids: int = 0
+    handled_ids: int = 0  # in this run, excluding ids handled by a previous run
+    indexed: int = 0
+    ranges: int = 0
+    completed_ranges: int = 0
+    retries: int = 0
+    failed_ranges: list[IdRange] = dataclasses.field(default_factory=list)
+    duration: float = 0.0
+
+    @property
+    def throughput(self) -> float:
+        """Number of indexed objects per second."""
+        if not self.duration:
+            return 0.0
+        return self.indexed / self.duration
+
+    @property
+    def eta(self) -> datetime.datetime | None:
+        if not self.handled_ids or not self.duration:
+            return None
+        left_seconds = (self.total_ids - self.handled_ids) * self.duration / self.handled_ids
+        return datetime.datetime.utcnow() + datetime.timedelta(seconds=left_seconds)
+
+    def as_log_extra(self) -> dict:
+        eta = self.eta
+        return {
+            "total_ids": self.total_ids,
+            "handled_ids": self.handled_ids,
+            "indexed": self.indexed,
+            "ranges": self.ranges,
+            "completed_ranges": self.completed_ranges,
+            "failed_ranges": len(self.failed_ranges),
+            "retries": self.retries,
+            "duration": round(self.duration, 3),
+            "throughput": round(self.throughput, 1),
+            "eta": _format_datetime(eta) if eta else None,
+        }
+
+
+def _format_datetime(dt: datetime.datetime) -> str:
+    dt = pytz.utc.localize(dt).astimezone(pytz.timezone("Europe/Paris"))
+    return dt.strftime("%d/%m/%Y %H:%M:%S")
+
+
+def _get_redis() -> typing.Any:
+    return flask.current_app.redis_client
+
+
+def get_id_bounds(target: Target) -> tuple[int, int] | None:
+    """Return the lowest and highest ids of active objects."""
+    min_id, max_id = (
+        db.session.query(sa.func.min(target.model.id), sa.func.max(target.model.id))
+        .filter(target.model.isActive.is_(True))
+        .one()
+    )
+    if min_id is None:
+        return None
+    return min_id, max_id
+
+
+def _save_plan(target: Target, plan: Plan) -> None:
+    redis = _get_redis()
+    redis.delete(CHECKPOINTS_KEY.format(target=target.name))
+    redis.hset(PLAN_KEY.format(target=target.name), mapping=dataclasses.asdict(plan))
+
+
+def _load_plan(target: Target) -> Plan | None:
+    raw_plan = _get_redis().hgetall(PLAN_KEY.format(target=target.name))
+    if not raw_plan:
+        return None
+    return Plan(**{field: int(value) for field, value in raw_plan.items()})
+
+
+def _get_checkpoints(target: Target) -> dict[int, int]:
+    """Return the last handled id of each started range, by range start."""
+    raw_checkpoints = _get_redis().hgetall(CHECKPOINTS_KEY.format(target=target.name))
+    return {int(range_start): int(last_id) for range_start, last_id in raw_checkpoints.items()}
+
+
+def _save_checkpoint(target: Target, id_range: IdRange, last_id: int) -> None:
+    _get_redis().hset(CHECKPOINTS_KEY.format(target=target.name), id_range.start, last_id)
+
+
+def reindex_range(target_name: str, id_range: IdRange) -> RangeResult:
+    """Reindex objects of the range, from its last checkpoint.
+
+    This function is called from a worker process (or from the main
+    process if there is only one process).
+    """
+    target = TARGETS[target_name]
+    backend = search._get_backend()
+    last_id = _get_checkpoints(target).get(id_range.start, id_range.start - 1)
+    result = RangeResult(id_range=id_range, handled_ids=0, indexed=0)
+    for batch_start in range(last_id + 1, id_range.end + 1, BATCH_SIZE):
+        batch_end = min(batch_start + BATCH_SIZE - 1, id_range.end)
+        result.indexed += target.index_batch(backend, batch_start, batch_end)
+        result.handled_ids += batch_end - batch_start + 1
+        _save_checkpoint(target, id_range, batch_end)
+    return result
+
+
+def _init_worker(app: flask.Flask) -> None:
+    # The application context is kept for the lifetime of the worker.
+    app.app_context().push()
+    # Connections of the pool have been inherited from the parent
+    # process. Forget them without closing them: they are still used
+    # by the parent.
+    db.engine.dispose(close=False)
+
+
+def _get_executor(processes: int) -> concurrent.futures.Executor:
+    if processes <= 1:
+        return search.InlineExecutor()
+    # Release our connection before forking, so that it is not shared
+    # with child processes.
+    db.session.remove()
+    app = flask.current_app._get_current_object()  # type: ignore [attr-defined]
+    return concurrent.futures.ProcessPoolExecutor(
+        max_workers=processes,
+        mp_context=multiprocessing.get_context("fork"),
+        initializer=_init_worker,
+        initargs=(app,),
+    )
+
+
+def get_plan(
+    target_name: str,
+    start: int | None = None,
+    end: int | None = None,
+    range_size: int = DEFAULT_RANGE_SIZE,
+    resume: bool = False,
+) -> Plan | None:
+    """Return the plan of the run, and save it if it is a new run.
+
+    If `resume` is set, the plan of the previous run is returned, and
+    other arguments are ignored. Otherwise, bounds default to the
+    lowest and highest ids of active objects.
+    """
+    target = TARGETS[target_name]
+    if resume:
+        plan = _load_plan(target)
+        if not plan:
+            raise ValueError(f"There is no previous full reindexation of {target_name} to resume")
+        return plan
+    if start is None or end is None:
+        bounds = get_id_bounds(target)
+        if not bounds:
+            return None
+        start = bounds[0] if start is None else start
+        end = bounds[1] if end is None else end
+    if start > end:
+        raise ValueError('"start" must be less than "end"')
+    plan = Plan(start=start, end=end, range_size=range_size)
+    _save_plan(target, plan)
+    return plan
+
+
+def reindex_all(
+    target_name: str,
+    start: int | None = None,
+    end: int | None = None,
+    processes: int = 4,
+    range_size: int = DEFAULT_RANGE_SIZE,
+    max_attempts: int = DEFAULT_MAX_ATTEMPTS,
+    resume: bool = False,
+) -> ReindexationStats:
+    """Reindex all active objects of `target_name` (see `TARGETS`)
+    whose id is between `start` and `end`, with `processes` worker
+    processes.
+    """
+    target = TARGETS[target_name]
+    stats = ReindexationStats()
+    plan = get_plan(target_name, start, end, range_size, resume)
+    if not plan:
+        logger.info("Full reindexation: nothing to reindex", extra={"target": target_name})
+        return stats
+
+    checkpoints = _get_checkpoints(target)
+    pending = []
+    for id_range in plan.ranges:
+        stats.ranges += 1
+        stats.total_ids += id_range.size
+        last_id = checkpoints.get(id_range.start, id_range.start - 1)
+        if last_id >= id_range.end:
+            stats.completed_ranges += 1
+            stats.total_ids -= id_range.size
+        else:
+            stats.total_ids -= last_id - id_range.start + 1
+            pending.append(id_range)
+
+    logger.info(
+        "Full reindexation: started",
+        extra={"target": target_name, "processes": processes} | dataclasses.asdict(plan) | stats.as_log_extra(),
+    )
+    start_time = time.perf_counter()
+    attempts: collections.Counter[IdRange] = collections.Counter()
+    with _get_executor(processes) as executor:
+        futures = {executor.submit(reindex_range, target_name, id_range): id_range for id_range in pending}
+        while futures:
+            done, _ = concurrent.futures.wait(futures, return_when=concurrent.futures.FIRST_COMPLETED)
+            for future in done:
+                id_range = futures.pop(future)
+                attempts[id_range] += 1
+                try:
+                    result = future.result()
+                except Exception as exc:  # pylint: disable=broad-except
+                    log_extra = {
+                        "target": target_name,
+                        "range_start": id_range.start,
+                        "range_end": id_range.end,
+                        "attempt": attempts[id_range],
+                        "exc": str(exc),
+                    }
+                    if attempts[id_range] < max_attempts:
+                        logger.warning("Full reindexation: range failed, will retry", extra=log_extra)
+                        stats.retries += 1
+                        futures[executor.submit(reindex_range, target_name, id_range)] = id_range
+                        continue
+                    if settings.IS_RUNNING_TESTS:
+                        raise
+                    stats.failed_ranges.append(id_range)
+                    logger.exception("Full reindexation: range failed, resume the run to retry it", extra=log_extra)
+                    continue
+                stats.completed_ranges += 1
+                stats.handled_ids += result.handled_ids
+                stats.indexed += result.indexed
+                stats.duration = time.perf_counter() - start_time
+                logger.info("Full reindexation: progress", extra={"target": target_name} | stats.as_log_extra())
+
+    stats.duration = time.perf_counter() - start_time
+    logger.info("Full reindexation: finished", extra={"target": target_name} | stats.as_log_extra())
+    return stats
@@ -0,0 +1,309 @@
+"""Drain the offer indexation queue with several workers.
+
+`search.index_offers_in_queue()` handles one batch at a time: pop ids
+from Redis, load offers, serialize them and send them to the search
+backend. This module provides a mode that is meant to be used when the
+queue is very large (e.g. during big provider synchronizations):
+
+- several processes pop batches from the same queue. Each pop is
+  atomic, so each process effectively works on its own shard of the
+  queue;
+- in each process, the HTTP request to the search backend is sent from
+  a thread pool, while the main thread loads and serializes the next
+  batches. The number of batches "in flight" is bounded.
+
+Popped ids stay in their `:processing:` queue until the batch has been
+fully handled, as with `index_offers_in_queue()`. Upon SIGTERM or
+SIGINT, workers stop popping new batches, finish the batches that are
+in flight and exit.
+"""
+import collections
+import concurrent.futures
+import contextlib
+import dataclasses
+import logging
+import multiprocessing
+import multiprocessing.synchronize
+import queue
+import signal
+import time
+import typing
+
+import flask
+
+from pcapi import settings
+from pcapi.core import search
+from pcapi.core.offers.book_macro_sections import get_book_macro_sections
+from pcapi.core.search.backends import base
+from pcapi.models import db
+
+
+logger = logging.getLogger(__name__)
+
+STAGES = ("pop", "load", "serialize", "push")
+REPORT_EVERY_N_BATCHES = 10
+
+
+@dataclasses.dataclass
+class StageStats:
+    count: int = 0
+    duration: float = 0.0
+
+    @property
+    def throughput(self) -> float:
+        """Number of items processed per second."""
+        if not self.duration:
+            return 0.0
+        return self.count / self.duration
+
+
+@dataclasses.dataclass
+class IndexationStats:
+    batches: int = 0
+    errors: int = 0
+    stages: dict[str, StageStats] = dataclasses.field(default_factory=lambda: {stage: StageStats() for stage in STAGES})
+
+    def record(self, stage: str, count: int, duration: float) -> None:
+        self.stages[stage].count += count
+        self.stages[stage].duration += duration
+
+    def merge(self, other: "IndexationStats") -> None:
+        self.batches += other.batches
+        self.errors += other.errors
+        for stage, stats in other.stages.items():
+            self.record(stage, stats.count, stats.duration)
+
+    def as_log_extra(self) -> dict:
+        extra: dict[str, typing.Any] = {"batches": self.batches, "errors": self.errors}
+        for stage, stats in self.stages.items():
+            extra[f"{stage}_count"] = stats.count
+            extra[f"{stage}_duration"] = round(stats.duration, 3)
+            extra[f"{stage}_throughput"] = round(stats.throughput, 1)
+        return extra
+
+
+@dataclasses.dataclass
+class _InFlightBatch:
+    offer_ids: set[int]
+    to_add_ids: list[int]
+    to_delete_ids: list[int]
+    future: concurrent.futures.Future
+    exit_stack: contextlib.ExitStack
+
+
+def _push(backend: base.SearchBackend, objects: list[dict], to_delete_ids: list[int]) -> float:
+    """Send serialized offers to the search backend and unindex the
+    others. Return the elapsed time.
+
+    This function is called from a thread of the pool and must not
+    access the database.
+    """
+    start = time.perf_counter()
+    backend.index_serialized_offers(objects)
+    backend.unindex_offer_ids(to_delete_ids)
+    return time.perf_counter() - start
+
+
+def _complete_batch(
+    backend: base.SearchBackend,
+    batch: _InFlightBatch,
+    stats: IndexationStats,
+    from_error_queue: bool,
+) -> None:
+    try:
+        try:
+            duration = batch.future.result()
+        except Exception as exc:  # pylint: disable=broad-except
+            if settings.IS_RUNNING_TESTS:
+                raise
+            stats.errors += 1
+            ids = batch.to_add_ids + batch.to_delete_ids
+            search._log_indexation_error("offers", ids=ids, exc=exc, from_error_queue=from_error_queue)
+            backend.enqueue_offer_ids_in_error(ids)
+        else:
+            stats.record("push", len(batch.to_add_ids) + len(batch.to_delete_ids), duration)
+        # some offers changes might make some venue ineligible for search
+        search._reindex_venues_from_offers(batch.offer_ids)
+    finally:
+        # Exiting the stack deletes the processing queue: it must be
+        # the last thing we do with this batch.
+        batch.exit_stack.close()
+    stats.batches += 1
+    if stats.batches % REPORT_EVERY_N_BATCHES == 0:
+        logger.info("Parallel offer indexation progress", extra=stats.as_log_extra())
+
+
+def run_worker(
+    stop_event: multiprocessing.synchronize.Event,
+    max_in_flight: int = 2,
+    stop_only_when_empty: bool = False,
+    from_error_queue: bool = False,
+) -> IndexationStats:
+    """Pop batches of offers from the indexation queue until it is
+    (almost) empty or until `stop_event` is set, and reindex them.
+
+    See `search.index_offers_in_queue()` for the meaning of
+    `stop_only_when_empty` and `from_error_queue`.
+    """
+    backend = search._get_backend()
+    stats = IndexationStats()
+    in_flight: collections.deque[_InFlightBatch] = collections.deque()
+
+    with concurrent.futures.ThreadPoolExecutor(max_workers=max_in_flight) as executor:
+        try:
+            while not stop_event.is_set():
+                exit_stack = contextlib.ExitStack()
+                start = time.perf_counter()
+                offer_ids = exit_stack.enter_context(
+                    backend.pop_offer_ids_from_queue(
+                        count=settings.REDIS_OFFER_IDS_CHUNK_SIZE,
+                        from_error_queue=from_error_queue,
+                    )
+                )
+                stats.record("pop", len(offer_ids), time.perf_counter() - start)
+                if not offer_ids:
+                    exit_stack.close()
+                    break
+
+                try:
+                    start = time.perf_counter()
+                    to_add, to_delete_ids = search.get_offers_to_index_and_unindex(backend, offer_ids)
+                    last_x_days_bookings_count_by_offer = search.get_last_x_days_booking_count_by_offer(to_add)
+                    stats.record("load", len(offer_ids), time.perf_counter() - start)
+
+                    start = time.perf_counter()
+                    book_macro_sections = get_book_macro_sections()
+                    objects = [
+                        backend.serialize_offer(
+                            offer,
+                            last_x_days_bookings_count_by_offer.get(offer.id) or 0,
+                            book_macro_sections,
+                        )
+                        for offer in to_add
+                    ]
+                    stats.record("serialize", len(objects), time.perf_counter() - start)
+                except Exception as exc:  # pylint: disable=broad-except
+                    exit_stack.close()
+                    if settings.IS_RUNNING_TESTS:
+                        raise
+                    stats.errors += 1
+                    logger.exception(
+                        "Exception while reindexing offers, must fix manually",
+                        extra={"exc": str(exc), "offers": offer_ids},
+                    )
+                    continue
+
+                in_flight.append(
+                    _InFlightBatch(
+                        offer_ids=offer_ids,
+                        to_add_ids=[offer.id for offer in to_add],
+                        to_delete_ids=to_delete_ids,
+                        future=executor.submit(_push, backend, objects, to_delete_ids),
+                        exit_stack=exit_stack,
+                    )
+                )
+
+                while len(in_flight) >= max_in_flight:
+                    _complete_batch(backend, in_flight.popleft(), stats, from_error_queue)
+
+                left_to_process = backend.count_offers_to_index_from_queue(from_error_queue=from_error_queue)
+                if not stop_only_when_empty and left_to_process < settings.REDIS_OFFER_IDS_CHUNK_SIZE:
+                    break
+        finally:
+            while in_flight:
+                _complete_batch(backend, in_flight.popleft(), stats, from_error_queue)
+
+    return stats
+
+
+@contextlib.contextmanager
+def _stop_on_signals(stop_event: multiprocessing.synchronize.Event) -> typing.Iterator[None]:
+    def handler(signum: int, frame: typing.Any) -> None:  # pylint: disable=unused-argument
+        logger.info("Received signal %s, stopping offer indexation workers after current batches", signum)
+        stop_event.set()
+
+    previous_handlers = {signum: signal.signal(signum, handler) for signum in (signal.SIGTERM, signal.SIGINT)}
+    try:
+        yield
+    finally:
+        for signum, previous_handler in previous_handlers.items():
+            signal.signal(signum, previous_handler)
+
+
+def _run_worker_process(
+    app: flask.Flask,
+    stop_event: multiprocessing.synchronize.Event,
+    results: multiprocessing.Queue,
+    max_in_flight: int,
+    stop_only_when_empty: bool,
+    from_error_queue: bool,
+) -> None:
+    with app.app_context():
+        # Connections of the pool have been inherited from the parent
+        # process. Forget them without closing them: they are still
+        # used by the parent.
+        db.engine.dispose(close=False)
+        with _stop_on_signals(stop_event):
+            stats = run_worker(stop_event, max_in_flight, stop_only_when_empty, from_error_queue)
+        logger.info("Offer indexation worker has finished", extra=stats.as_log_extra())
+        results.put(stats)
+
+
+def index_offers_in_queue_in_parallel(
+    processes: int = 4,
+    max_in_flight: int = 2,
+    stop_only_when_empty: bool = False,
+    from_error_queue: bool = False,
+) -> IndexationStats:
+    """Pop offers from the indexation queue and reindex them, with
+    `processes` worker processes that each have up to `max_in_flight`
+    batches being sent to the search backend at the same time.
+    """
+    stop_event = multiprocessing.get_context("fork").Event()
+    start = time.perf_counter()
+
+    if processes <= 1:
+        with _stop_on_signals(stop_event):
+            stats = run_worker(stop_event, max_in_flight, stop_only_when_empty, from_error_queue)
+    else:
+        # Release our connection before forking, so that it is not
+        # shared with child processes.
+        db.session.remove()
+        context = multiprocessing.get_context("fork")
+        results: multiprocessing.Queue = context.Queue()
+        app = flask.current_app._get_current_object()  # type: ignore [attr-defined]
+        workers = [
+            context.Process(
+                target=_run_worker_process,
+                args=(app, stop_event, results, max_in_flight, stop_only_when_empty, from_error_queue),
+                name=f"offer-indexation-worker-{i}",
+            )
+            for i in range(processes)
+        ]
+        with _stop_on_signals(stop_event):
+            for worker in workers:
+                worker.start()
+            stats = IndexationStats()
+            # Read results before joining: a process that has put data
+            # in a queue does not terminate until the data is consumed.
+            received = 0
+            while received < len(workers):
+                try:
+                    stats.merge(results.get(timeout=1))
+                    received += 1
+                except queue.Empty:
+                    if not any(worker.is_alive() for worker in workers):
+                        break  # some workers crashed, they will be logged below
+            for worker in workers:
+                worker.join()
+                if worker.exitcode != 0:
+                    logger.error(
+                        "Offer indexation worker exited with an error",
+                        extra={"worker": worker.name, "exitcode": worker.exitcode},
+                    )
+
+    logger.info(
+        "Finished parallel offer indexation",
+        extra={"processes": processes, "duration": round(time.perf_counter() - start, 3)} | stats.as_log_extra(),
+    )
+    return stats
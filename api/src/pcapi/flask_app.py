@@ -27,7 +27,7 @@ from pcapi.core.logging import get_or_set_correlation_id
 from pcapi.core.logging import install_logging
 from pcapi.models import db
 from pcapi.models import install_models
-from pcapi.scripts.install import install_commands
+from pcapi.scripts.install import install_commands_lazily
 from pcapi.utils.json_encoder import EnumJSONEncoder
 from pcapi.utils.rate_limiting import rate_limiter
 from pcapi.utils.sentry import init_sentry_sdk
@@ -141,28 +141,30 @@ class ProxyFix(werkzeug.middleware.proxy_fix.ProxyFix):
 
     The feature flag will be activated when we configure the HTTP
     traffic to go through our L7 load balancer.
+
+    The flag is read from the snapshot of the process-wide cache of
+    feature flags, so that it does not cost a database query (nor a
+    connection checkout) on each request.
     """
 
     def __call__(self, environ, start_response):  # type: ignore [no-untyped-def]
-        import sqlalchemy
-
         from pcapi.models.feature import FeatureToggle
+        from pcapi.models.feature import feature_cache
 
         # Some tests check the number of SQL requests. We don't want
         # to update these tests, since this block is temporary.
         if not settings.IS_RUNNING_TESTS:
             with app.app_context():
-                try:
-                    behind_l7 = FeatureToggle.WIP_BEHIND_L7_LOAD_BALANCER.is_active()
-                except sqlalchemy.orm.exc.NoResultFound:
-                    logger.info("Could not find 'WIP_BEHIND_L7_LOAD_BALANCER' feature flag")
-                    behind_l7 = False
-                if behind_l7:
-                    # Our L7 load balancer adds 2 IPs to the `X-Forwarded-For` HTTP header.
-                    # And there is another proxy in front of our app. Hence the 3.
-                    self.x_for = 3
-                else:
-                    self.x_for = 1
+                behind_l7 = feature_cache.get_snapshot().get(FeatureToggle.WIP_BEHIND_L7_LOAD_BALANCER.name)
+            if behind_l7 is None:
+                logger.info("Could not find 'WIP_BEHIND_L7_LOAD_BALANCER' feature flag")
+                behind_l7 = False
+            if behind_l7:
+                # Our L7 load balancer adds 2 IPs to the `X-Forwarded-For` HTTP header.
+                # And there is another proxy in front of our app. Hence the 3.
+                self.x_for = 3
+            else:
+                self.x_for = 1
 
         return super().__call__(environ, start_response)
 
@@ -188,7 +190,7 @@ install_models()
 db.init_app(app)
 orm.configure_mappers()
 login_manager.init_app(app)
-install_commands(app)
+install_commands_lazily(app)
 finance_utils.install_template_filters(app)
 
 oauth = OAuth(app)
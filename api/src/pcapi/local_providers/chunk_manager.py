@@ -1,16 +1,36 @@
+from collections import defaultdict
+from collections.abc import Iterable
+import logging
+
 import pcapi.core.offers.models as offers_models
 from pcapi.local_providers.providable_info import ProvidableInfo
 from pcapi.models import Model
+from pcapi.repository.providable_queries import UnsupportedBulkUpsert
 from pcapi.repository.providable_queries import get_existing_object
+from pcapi.repository.providable_queries import get_existing_objects
 from pcapi.repository.providable_queries import insert_chunk
 from pcapi.repository.providable_queries import update_chunk
+from pcapi.repository.providable_queries import upsert_chunk
+
+
+logger = logging.getLogger(__name__)
+
+
+def get_chunk_key(providable_info: ProvidableInfo) -> str:
+    return f"{providable_info.id_at_providers}|{providable_info.type.__name__}"
 
 
 def get_existing_pc_obj(
-    providable_info: ProvidableInfo, chunk_to_insert: dict, chunk_to_update: dict
+    providable_info: ProvidableInfo,
+    chunk_to_insert: dict,
+    chunk_to_update: dict,
+    prefetched_objects: dict | None = None,
 ) -> offers_models.Product | offers_models.Offer | offers_models.Stock | None:
     object_in_current_chunk = get_object_from_current_chunks(providable_info, chunk_to_insert, chunk_to_update)
     if object_in_current_chunk is None:
+        chunk_key = get_chunk_key(providable_info)
+        if prefetched_objects is not None and chunk_key in prefetched_objects:
+            return prefetched_objects[chunk_key]
         return get_existing_object(providable_info.type, providable_info.id_at_providers)
 
     return object_in_current_chunk
@@ -19,7 +39,7 @@ def get_existing_pc_obj(
 def get_object_from_current_chunks(
     providable_info: ProvidableInfo, chunk_to_insert: dict, chunk_to_update: dict
 ) -> offers_models.Product | offers_models.Offer | offers_models.Stock | None:
-    chunk_key = f"{providable_info.id_at_providers}|{providable_info.type.__name__}"
+    chunk_key = get_chunk_key(providable_info)
     pc_object = chunk_to_insert.get(chunk_key)
     if isinstance(pc_object, providable_info.type):
         return pc_object
@@ -29,7 +49,44 @@ def get_object_from_current_chunks(
     return None
 
 
-def save_chunks(chunk_to_insert: dict[str, Model], chunk_to_update: dict[str, Model]) -> None:
+def prefetch_existing_objects(
+    providable_infos: Iterable[ProvidableInfo],
+) -> dict[str, offers_models.Product | offers_models.Offer | offers_models.Stock | None]:
+    """Look up existing objects with one query per model type.
+
+    The returned dictionary is indexed by chunk key, see
+    `get_chunk_key()`. Objects that do not exist are mapped to `None`.
+    Objects that could not be unambiguously identified are not
+    included, so that `get_existing_pc_obj()` looks them up one by one.
+    """
+    ids_by_type: dict[type, set[str]] = defaultdict(set)
+    for providable_info in providable_infos:
+        ids_by_type[providable_info.type].add(providable_info.id_at_providers)
+
+    prefetched_objects: dict[str, offers_models.Product | offers_models.Offer | offers_models.Stock | None] = {}
+    for model_type, ids_at_providers in ids_by_type.items():
+        existing_objects = get_existing_objects(model_type, ids_at_providers)
+        for id_at_providers in ids_at_providers:
+            matching_objects = existing_objects.get(id_at_providers, [])
+            if len(matching_objects) > 1:
+                continue
+            chunk_key = f"{id_at_providers}|{model_type.__name__}"
+            prefetched_objects[chunk_key] = matching_objects[0] if matching_objects else None
+    return prefetched_objects
+
+
+def save_chunks(
+    chunk_to_insert: dict[str, Model],
+    chunk_to_update: dict[str, Model],
+    bulk_upsert: bool = False,
+) -> None:
+    if bulk_upsert and len(chunk_to_insert) + len(chunk_to_update) > 0:
+        try:
+            upsert_chunk(chunk_to_insert | chunk_to_update)
+            return
+        except UnsupportedBulkUpsert as exc:
+            logger.info("Could not upsert chunk in bulk, falling back to ORM", extra={"exc": str(exc)})
+
     if len(chunk_to_insert) > 0:
         insert_chunk(chunk_to_insert)
 
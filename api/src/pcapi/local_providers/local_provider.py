@@ -2,15 +2,20 @@ from abc import abstractmethod
 from collections.abc import Iterator
 from datetime import datetime
 import logging
+import time
 import typing
 
+from pcapi import settings
 from pcapi.connectors.thumb_storage import create_thumb
 from pcapi.core import search
 import pcapi.core.finance.api as finance_api
 import pcapi.core.offers.models as offers_models
 import pcapi.core.providers.models as providers_models
 from pcapi.core.providers.repository import get_provider_by_local_class
+from pcapi.local_providers.chunk_manager import get_chunk_key
 from pcapi.local_providers.chunk_manager import get_existing_pc_obj
+from pcapi.local_providers.chunk_manager import get_object_from_current_chunks
+from pcapi.local_providers.chunk_manager import prefetch_existing_objects
 from pcapi.local_providers.chunk_manager import save_chunks
 from pcapi.local_providers.providable_info import ProvidableInfo
 from pcapi.models import Model
@@ -19,6 +24,7 @@ from pcapi.models.api_errors import ApiErrors
 from pcapi.models.has_thumb_mixin import HasThumbMixin
 from pcapi.repository import repository
 from pcapi.repository.providable_queries import get_last_update_for_provider
+from pcapi.utils.db import count_queries
 from pcapi.validation.models import entity_validator
 
 
@@ -26,6 +32,9 @@ logger = logging.getLogger(__name__)
 
 
 CHUNK_MAX_SIZE = 1000
+# Number of upcoming providables whose existing objects are looked up
+# in bulk, see `LocalProvider.peek_upcoming_providable_infos()`.
+PREFETCH_WINDOW_SIZE = 500
 
 
 class LocalProvider(Iterator):
@@ -79,6 +88,18 @@ class LocalProvider(Iterator):
             date_modified_at_provider=date_modified_at_provider,
         )
 
+    def peek_upcoming_providable_infos(self, count: int) -> list[ProvidableInfo]:
+        """Return up to `count` providable infos that the next calls to
+        `__next__()` will return, without consuming them.
+
+        Only `type` and `id_at_providers` are used: they allow
+        `updateObjects()` to look up existing objects in bulk instead
+        of one by one. Iterators are usually stateful, so this cannot
+        be done generically: providers may override this method if
+        they can cheaply read ahead.
+        """
+        return []
+
     def get_object_thumb(self) -> bytes:
         return bytes()
 
@@ -93,6 +114,13 @@ class LocalProvider(Iterator):
     def name(self) -> str:
         pass
 
+    @property
+    def use_bulk_upsert(self) -> bool:
+        """Whether chunks are saved with bulk upserts instead of the
+        ORM. This is being rolled out provider by provider.
+        """
+        return self.__class__.__name__ in settings.PROVIDERS_WITH_BULK_UPSERT
+
     def _handle_thumb(self, pc_object: HasThumbMixin) -> None:
         if not self.shall_synchronize_thumbs():
             return
@@ -155,7 +183,7 @@ class LocalProvider(Iterator):
         db.session.add(local_provider_event)
         db.session.commit()
 
-    def _print_objects_summary(self) -> None:
+    def _print_objects_summary(self, duration: float, query_count: int) -> None:
         # FIXME (dbaty, 2020-02-05): I don't know how we could end up
         # here with no venue_provider, but there are checks elsewhere
         # so I do the same here.
@@ -176,9 +204,14 @@ class LocalProvider(Iterator):
             self.updatedThumbs,
             self.erroredThumbs,
         )
+        logger.info(
+            "Synchronization of venue=%s took %.1f seconds and %d SQL queries",
+            venue_id,
+            duration,
+            query_count,
+        )
 
     def updateObjects(self, limit: int | None = None) -> None:
-        # pylint: disable=too-many-nested-blocks
         if self.venue_provider and not self.venue_provider.isActive:
             logger.info("Venue provider %s is inactive", self.venue_provider)
             return
@@ -191,8 +224,25 @@ class LocalProvider(Iterator):
         # TODO (asaunier,2021-03-18): We may replace this log in BDD with logs in the monitoring system
         self.log_provider_event(providers_models.LocalProviderEventType.SyncStart)
 
+        start = time.perf_counter()
+        with count_queries() as query_counter:
+            self._synchronize_objects(limit)
+        self._print_objects_summary(time.perf_counter() - start, query_counter.count)
+        self.log_provider_event(providers_models.LocalProviderEventType.SyncEnd)
+
+        if self.venue_provider is not None:
+            self.venue_provider.lastSyncDate = datetime.utcnow()
+            repository.save(self.venue_provider)
+
+    def _synchronize_objects(self, limit: int | None) -> None:
+        # pylint: disable=too-many-nested-blocks
         chunk_to_insert: dict[str, Model] = {}
         chunk_to_update: dict[str, Model] = {}
+        # Existing objects that have been looked up in bulk, see
+        # `peek_upcoming_providable_infos()`. Saving chunks commits
+        # the transaction, which expires these objects (and releases
+        # locks on stocks): they must be looked up again afterwards.
+        prefetched_objects: dict[str, Model | None] = {}
 
         for providable_infos in self:
             objects_limit_reached = limit and self.checkedObjects >= limit
@@ -205,8 +255,16 @@ class LocalProvider(Iterator):
                 continue
 
             for providable_info in providable_infos:
-                chunk_key = providable_info.id_at_providers + "|" + str(providable_info.type.__name__)
-                pc_object = get_existing_pc_obj(providable_info, chunk_to_insert, chunk_to_update)
+                chunk_key = get_chunk_key(providable_info)
+                if chunk_key not in prefetched_objects and not get_object_from_current_chunks(
+                    providable_info, chunk_to_insert, chunk_to_update
+                ):
+                    prefetched_objects.update(
+                        prefetch_existing_objects(
+                            providable_infos + self.peek_upcoming_providable_infos(PREFETCH_WINDOW_SIZE)
+                        )
+                    )
+                pc_object = get_existing_pc_obj(providable_info, chunk_to_insert, chunk_to_update, prefetched_objects)
                 last_update_for_current_provider = get_last_update_for_provider(self.provider.id, pc_object)
 
                 if pc_object is None:
@@ -257,28 +315,22 @@ class LocalProvider(Iterator):
                 self.checkedObjects += 1
 
                 if len(chunk_to_insert) + len(chunk_to_update) >= CHUNK_MAX_SIZE:
-                    save_chunks(chunk_to_insert, chunk_to_update)
+                    save_chunks(chunk_to_insert, chunk_to_update, bulk_upsert=self.use_bulk_upsert)
                     _reindex_offers(
                         list(chunk_to_insert.values()) + list(chunk_to_update.values()),
                         self.venue_provider,
                     )
                     chunk_to_insert = {}
                     chunk_to_update = {}
+                    prefetched_objects = {}
 
         if len(chunk_to_insert) + len(chunk_to_update) > 0:
-            save_chunks(chunk_to_insert, chunk_to_update)
+            save_chunks(chunk_to_insert, chunk_to_update, bulk_upsert=self.use_bulk_upsert)
             _reindex_offers(
                 list(chunk_to_insert.values()) + list(chunk_to_update.values()),
                 self.venue_provider,
             )
 
-        self._print_objects_summary()
-        self.log_provider_event(providers_models.LocalProviderEventType.SyncEnd)
-
-        if self.venue_provider is not None:
-            self.venue_provider.lastSyncDate = datetime.utcnow()
-            repository.save(self.venue_provider)
-
     def postTreatment(self) -> None:
         pass
 
@@ -1,5 +1,7 @@
+import collections
 from io import BytesIO
 from io import TextIOWrapper
+import itertools
 import logging
 import re
 from typing import Iterator
@@ -223,6 +225,9 @@ class TiteLiveThings(LocalProvider):
         self.thing_files = self.get_remaining_files_to_check(ordered_thing_files)
 
         self.data_lines: Iterator[str] | None = None
+        # Lines of the current file that have been read ahead by
+        # `peek_upcoming_providable_infos()` and not processed yet.
+        self.upcoming_data_lines: collections.deque[str] = collections.deque()
         self.products_file = None
         self.product_approved_eans: list[str | None] = []
         self.product_updated_ids: list[int] = []
@@ -237,7 +242,10 @@ class TiteLiveThings(LocalProvider):
 
         assert self.data_lines is not None
         try:
-            data_lines = next(self.data_lines)
+            if self.upcoming_data_lines:
+                data_lines = self.upcoming_data_lines.popleft()
+            else:
+                data_lines = next(self.data_lines)
             elements = data_lines.split("~")
         except StopIteration:
             self.open_next_file()
@@ -304,6 +312,25 @@ class TiteLiveThings(LocalProvider):
         )
         return [providable_info]
 
+    def peek_upcoming_providable_infos(self, count: int) -> list[ProvidableInfo]:
+        if self.data_lines is None:
+            return []
+        while len(self.upcoming_data_lines) < count:
+            try:
+                self.upcoming_data_lines.append(next(self.data_lines))
+            except StopIteration:
+                break
+        providable_infos = []
+        for data_line in itertools.islice(self.upcoming_data_lines, count):
+            elements = data_line.split("~")
+            if len(elements) != NUMBER_OF_ELEMENTS_PER_LINE:
+                continue
+            ean = elements[COLUMN_INDICES["ean"]]
+            providable_infos.append(
+                ProvidableInfo(type=offers_models.Product, id_at_providers=ean, new_id_at_provider=ean)
+            )
+        return providable_infos
+
     def get_ineligibility_reason(self) -> str | None:
         gtl_id = self.product_infos[INFO_KEYS["GTL_ID"]].zfill(8)
         gtl_level_01_code = gtl_id[:2]
@@ -1,8 +1,12 @@
 import enum
 import logging
+import os
+import threading
+import time
 
 from alembic import op
 import flask
+import redis
 from sqlalchemy import Column
 from sqlalchemy import String
 from sqlalchemy import Text
@@ -23,6 +27,158 @@ class DisabledFeatureError(Exception):
     pass
 
 
+FEATURE_CACHE_INVALIDATION_CHANNEL = "pcapi:feature_flags:invalidation"
+FEATURE_CACHE_LISTENER_RETRY_DELAY = 10  # seconds
+
+
+class FeatureCache:
+    """A process-wide cache of the status of all feature flags.
+
+    The cache expires after `settings.FEATURE_FLAGS_CACHE_TTL` seconds.
+    It is also invalidated as soon as a message is published on
+    `FEATURE_CACHE_INVALIDATION_CHANNEL` (see
+    `invalidate_feature_cache()`), which a background thread of each
+    process listens to.
+
+    `get_snapshot()` is meant for code that must not wait for the
+    database: it returns the last loaded flags, which are reloaded in
+    a background thread when they have expired or been invalidated.
+
+    Processes that fork short-lived children (e.g. the RQ worker, which
+    forks a process for each job) should call
+    `disable_listener_in_forked_processes()`.
+    """
+
+    def __init__(self) -> None:
+        self._features: dict[str, bool] | None = None
+        self._snapshot: dict[str, bool] | None = None
+        self._refresh_thread: threading.Thread | None = None
+        self._expires_at = 0.0
+        self._generation = 0
+        self._listener_pid: int | None = None
+        self._listen_in_forked_processes = True
+        self._lock = threading.Lock()
+
+    def get(self) -> dict[str, bool]:
+        ttl = settings.FEATURE_FLAGS_CACHE_TTL
+        if ttl <= 0:
+            return _load_features()
+        self._ensure_listener()
+        features = self._features
+        if features is None or time.monotonic() >= self._expires_at:
+            generation = self._generation
+            features = _load_features()
+            self._snapshot = features
+            # Do not store flags that have been invalidated while we
+            # were loading them.
+            if generation == self._generation:
+                self._features = features
+                self._expires_at = time.monotonic() + ttl
+        return features
+
+    def get_snapshot(self) -> dict[str, bool]:
+        """Return the last loaded flags, even if they have expired or
+        been invalidated, in which case they are reloaded in the
+        background for the next calls. Flags are only loaded
+        synchronously on the first call in each process.
+
+        This function must be called within an application context.
+        """
+        snapshot = self._snapshot
+        if snapshot is None or settings.FEATURE_FLAGS_CACHE_TTL <= 0:
+            return self.get()
+        if self._features is None or time.monotonic() >= self._expires_at:
+            self._refresh_in_background()
+        return snapshot
+
+    def _refresh_in_background(self) -> None:
+        with self._lock:
+            # A thread that has been started by our parent process is
+            # not alive in this process.
+            if self._refresh_thread is not None and self._refresh_thread.is_alive():
+                return
+            app = flask.current_app._get_current_object()  # type: ignore [attr-defined]
+            self._refresh_thread = threading.Thread(
+                target=self._refresh, args=(app,), name="feature-cache-refresh", daemon=True
+            )
+            self._refresh_thread.start()
+
+    def _refresh(self, app: flask.Flask) -> None:
+        try:
+            with app.app_context():
+                self.get()
+        except Exception:  # pylint: disable=broad-except
+            logger.exception("Could not refresh feature flags cache")
+
+    def invalidate(self) -> None:
+        self._generation += 1
+        self._features = None
+
+    def disable_listener_in_forked_processes(self) -> None:
+        """Do not listen to invalidations in processes that are forked
+        from this one. They keep the flags that they have inherited
+        until these expire, instead of each starting a thread and a
+        Redis connection and reloading all flags.
+        """
+        self._listen_in_forked_processes = False
+
+    def _ensure_listener(self) -> None:
+        # Check the PID: the thread does not survive a fork (e.g. in
+        # Gunicorn workers).
+        if self._listener_pid == os.getpid():
+            return
+        with self._lock:
+            if self._listener_pid == os.getpid():
+                return
+            if self._listener_pid is not None and not self._listen_in_forked_processes:
+                return
+            self._features = None
+            thread = threading.Thread(target=self._listen, name="feature-cache-invalidation", daemon=True)
+            thread.start()
+            self._listener_pid = os.getpid()
+
+    def _listen(self) -> None:
+        # Flags that are loaded before we first subscribe are not
+        # invalidated (a toggle in between is only seen after the TTL),
+        # otherwise this would race with (and discard) the first load.
+        reconnecting = False
+        while True:
+            try:
+                pubsub = redis.from_url(settings.REDIS_URL).pubsub(ignore_subscribe_messages=True)
+                pubsub.subscribe(FEATURE_CACHE_INVALIDATION_CHANNEL)
+                if reconnecting:
+                    # We may have missed messages while we were not subscribed.
+                    self.invalidate()
+                for _message in pubsub.listen():
+                    self.invalidate()
+            except Exception:  # pylint: disable=broad-except
+                logger.exception("Lost connection to Redis, feature flags cache will only expire after its TTL")
+                reconnecting = True
+                time.sleep(FEATURE_CACHE_LISTENER_RETRY_DELAY)
+
+
+feature_cache = FeatureCache()
+
+
+def _load_features() -> dict[str, bool]:
+    return {f.name: f.isActive for f in db.session.query(Feature.name, Feature.isActive)}
+
+
+def invalidate_feature_cache() -> None:
+    """Invalidate the cache of feature flags in all processes.
+
+    This function must be called after a feature flag has been toggled
+    (and the change committed).
+    """
+    feature_cache.invalidate()
+    if flask.has_request_context() and hasattr(flask.request, "_cached_features"):
+        del flask.request._cached_features
+    try:
+        flask.current_app.redis_client.publish(FEATURE_CACHE_INVALIDATION_CHANNEL, "")
+    except Exception:  # pylint: disable=broad-except
+        logger.exception("Could not publish invalidation of feature flags cache")
+
+
 class FeatureToggle(enum.Enum):
     ALGOLIA_BOOKINGS_NUMBER_COMPUTATION = (
         "Active le calcul du nombre des réservations lors de l'indexation des offres sur Algolia"
@@ -124,14 +280,14 @@ class FeatureToggle(enum.Enum):
 
     def is_active(self) -> bool:
         if flask.has_request_context():
+            # Use the same flags during the whole request, even if
+            # the process-wide cache expires in the meantime.
             if not hasattr(flask.request, "_cached_features"):
-                setattr(
-                    flask.request,
-                    "_cached_features",
-                    {f.name: f.isActive for f in db.session.query(Feature.name, Feature.isActive)},
-                )
+                setattr(flask.request, "_cached_features", feature_cache.get())
             return flask.request._cached_features[self.name]  # type: ignore [attr-defined]
-        return Feature.query.filter_by(name=self.name).one().isActive
+        if settings.FEATURE_FLAGS_CACHE_TTL <= 0:
+            return Feature.query.filter_by(name=self.name).one().isActive
+        return feature_cache.get()[self.name]
 
 
 class Feature(PcObject, Base, Model, DeactivableMixin):
@@ -42,6 +42,7 @@ def clean_all_database(*args: typing.Any, **kwargs: typing.Any) -> None:
     finance_models.PricingLine.query.delete()
     finance_models.PricingLog.query.delete()
     finance_models.Pricing.query.delete()
+    finance_models.PricingPointRevenue.query.delete()
     finance_models.InvoiceLine.query.delete()
     finance_models.Invoice.query.delete()
     finance_models.FinanceEvent.query.delete()
@@ -58,6 +59,7 @@ def clean_all_database(*args: typing.Any, **kwargs: typing.Any) -> None:
     educational_models.CollectiveOfferTemplateEducationalRedactor.query.delete()
     bookings_models.ExternalBooking.query.delete()
     bookings_models.Booking.query.delete()
+    bookings_models.OfferDailyBookingCount.query.delete()
     educational_models.CollectiveStock.query.delete()
     offers_models.Stock.query.delete()
     users_models.Favorite.query.delete()
@@ -1,4 +1,11 @@
+from collections import defaultdict
+from collections.abc import Collection
 import datetime
+import typing
+
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+import sqlalchemy.orm as sa_orm
 
 import pcapi.core.offers.models as offers_models
 from pcapi.models import Base
@@ -27,6 +34,163 @@ def update_chunk(chunk_to_update: dict[str, Model]) -> None:
     db.session.commit()
 
 
+# Columns of the unique indexes that identify objects of providers,
+# in the order in which models must be upserted (stocks reference
+# offers, which reference products).
+UPSERT_CONFLICT_COLUMNS = {
+    "Product": ("idAtProviders",),
+    "Offer": ("venueId", "idAtProvider"),
+    "Stock": ("idAtProviders",),
+}
+
+
+class UnsupportedBulkUpsert(Exception):
+    pass
+
+
+def upsert_chunk(chunk: dict[str, Model]) -> None:
+    """Insert or update objects of the chunk with one
+    ``INSERT ... ON CONFLICT DO UPDATE`` statement per model, bypassing
+    the unit of work of the ORM.
+
+    Ids (and foreign keys) of inserted objects are set on them, as
+    `insert_chunk()` would do. Objects are then attached to the session
+    as persistent objects (and expired), so that they can be referenced
+    by objects of the next chunks.
+
+    Raise `UnsupportedBulkUpsert`, before any modification, if the
+    chunk cannot be upserted: e.g. if an object references another
+    object that has not been saved yet and that is not in the chunk.
+    """
+    MODELS = {mapper.class_.__name__: mapper.class_ for mapper in Base.registry.mappers}
+
+    objects_by_model: dict[str, list[Model]] = defaultdict(list)
+    for chunk_key, pc_object in chunk.items():
+        objects_by_model[_extract_model_name_from_chunk_key(chunk_key)].append(pc_object)
+    unsupported_models = set(objects_by_model) - set(UPSERT_CONFLICT_COLUMNS)
+    if unsupported_models:
+        raise UnsupportedBulkUpsert(f"Unsupported models: {', '.join(sorted(unsupported_models))}")
+
+    for model_name, pc_objects in objects_by_model.items():
+        conflict_columns = UPSERT_CONFLICT_COLUMNS[model_name]
+        for pc_object in pc_objects:
+            if any(sa_orm.attributes.instance_state(pc_object).dict.get(column) is None for column in conflict_columns):
+                raise UnsupportedBulkUpsert(f"{pc_object} has no value for {', '.join(conflict_columns)}")
+
+    chunk_object_ids = {id(pc_object) for pc_object in chunk.values()}
+    for pc_object in chunk.values():
+        for _relationship, related_object in _get_many_to_one_related_objects(pc_object):
+            if (
+                sa_orm.attributes.instance_state(related_object).identity is None
+                and id(related_object) not in chunk_object_ids
+            ):
+                raise UnsupportedBulkUpsert(f"{pc_object} references an unsaved {related_object}")
+
+    # Otherwise, objects (and those that have been cascaded into the
+    # session through backrefs) would also be flushed by the ORM.
+    for pc_object in chunk.values():
+        session = sa_orm.object_session(pc_object)
+        if session is not None:
+            session.expunge(pc_object)
+
+    for model_name, conflict_columns in UPSERT_CONFLICT_COLUMNS.items():
+        if model_name in objects_by_model:
+            _upsert_objects(MODELS[model_name], objects_by_model[model_name], conflict_columns)
+
+    # Attach objects back, as if they had been saved by the ORM. All of
+    # them must have an identity before any of them is added, since
+    # adding an object cascades to the objects it references.
+    for pc_object in chunk.values():
+        if sa_orm.attributes.instance_state(pc_object).transient:
+            sa_orm.make_transient_to_detached(pc_object)
+    for pc_object in chunk.values():
+        db.session.add(pc_object)
+        # Changes have been saved by the upsert: discard them, and
+        # reload values (e.g. defaults) from the database on access.
+        db.session.expire(pc_object)
+    db.session.commit()
+
+
+def _get_many_to_one_related_objects(
+    pc_object: Model,
+) -> typing.Iterator[tuple[sa_orm.RelationshipProperty, Model]]:
+    state = sa_orm.attributes.instance_state(pc_object)
+    for relationship in state.mapper.relationships:
+        if relationship.direction is not sa_orm.interfaces.MANYTOONE:
+            continue
+        related_object = state.dict.get(relationship.key)
+        if related_object is not None:
+            yield relationship, related_object
+
+
+def _get_row(pc_object: Model) -> dict[str, typing.Any]:
+    """Return values of columns that have been loaded or set on the
+    object, indexed by column key.
+
+    Foreign keys are taken from related objects, and set on the
+    object, as the ORM would do upon flush. Columns that have an
+    `onupdate` default are left out unless they have been modified,
+    so that the default is applied on update.
+    """
+    state = sa_orm.attributes.instance_state(pc_object)
+    mapper = state.mapper
+    row: dict[str, typing.Any] = {}
+    for column_property in mapper.column_attrs:
+        column = column_property.columns[0]
+        if not isinstance(column, sa.Column) or column.table is not mapper.local_table:
+            continue  # e.g. `query_expression()`
+        if column.onupdate is not None and not state.attrs[column_property.key].history.has_changes():
+            continue
+        if column_property.key in state.dict:
+            row[column.name] = state.dict[column_property.key]
+    for relationship, related_object in _get_many_to_one_related_objects(pc_object):
+        related_mapper = sa_orm.attributes.instance_state(related_object).mapper
+        for local_column, remote_column in relationship.local_remote_pairs:
+            value = getattr(related_object, related_mapper.get_property_by_column(remote_column).key)
+            row[local_column.name] = value
+            setattr(pc_object, mapper.get_property_by_column(local_column).key, value)
+    if row.get("id") is None:
+        row.pop("id", None)
+    return row
+
+
+def _get_onupdate_values(model: type[Model], excluded_columns: typing.Collection[str]) -> dict[str, typing.Any]:
+    values: dict[str, typing.Any] = {}
+    for column in model.__table__.columns:
+        if column.onupdate is None or column.name in excluded_columns:
+            continue
+        if column.onupdate.is_callable:
+            values[column.name] = column.onupdate.arg(None)
+        else:  # a scalar or an SQL expression
+            values[column.name] = column.onupdate.arg
+    return values
+
+
+def _upsert_objects(model: type[Model], pc_objects: list[Model], conflict_columns: tuple[str, ...]) -> None:
+    # All rows of a multi-row INSERT must have the same columns. In
+    # practice, a provider sets the same attributes on all its objects.
+    objects_by_columns: dict[tuple[str, ...], list[tuple[Model, dict]]] = defaultdict(list)
+    for pc_object in pc_objects:
+        row = _get_row(pc_object)
+        objects_by_columns[tuple(sorted(row))].append((pc_object, row))
+
+    for columns, objects_and_rows in objects_by_columns.items():
+        insert_statement = postgresql.insert(model).values([row for _pc_object, row in objects_and_rows])
+        # Always update something, so that existing rows are returned.
+        updated_columns = [column for column in columns if column != "id" and column not in conflict_columns]
+        updated_values = {column: insert_statement.excluded[column] for column in updated_columns or conflict_columns}
+        # Python-side `onupdate` defaults (e.g. `dateUpdated`) are only
+        # applied by the ORM and by UPDATE statements.
+        updated_values |= _get_onupdate_values(model, columns)
+        statement = insert_statement.on_conflict_do_update(
+            index_elements=conflict_columns,
+            set_=updated_values,
+        ).returning(model.id, *(model.__table__.c[column] for column in conflict_columns))
+        ids = {tuple(key): id_ for id_, *key in db.session.execute(statement)}
+        for pc_object, row in objects_and_rows:
+            pc_object.id = ids[tuple(row[column] for column in conflict_columns)]
+
+
 def _filter_matching_pc_object_in_chunk(
     model_in_chunk: str, chunk_to_update: dict[str, Model]
 ) -> list[tuple[str, Model]]:
@@ -57,6 +221,25 @@ def get_existing_object(
     return query.one_or_none()
 
 
+def get_existing_objects(
+    model_type: type[offers_models.Product | offers_models.Offer | offers_models.Stock],
+    ids_at_providers: Collection[str],
+) -> dict[str, list[offers_models.Product | offers_models.Offer | offers_models.Stock]]:
+    """Return existing objects that match any of the given identifiers,
+    grouped by identifier, in a single query.
+    """
+    # See `get_existing_object()` about the exception for offers.
+    column_name = "idAtProvider" if model_type == offers_models.Offer else "idAtProviders"
+    query = model_type.query.filter(getattr(model_type, column_name).in_(ids_at_providers))
+    if model_type == offers_models.Stock:
+        query = query.with_for_update()
+
+    objects: dict[str, list[offers_models.Product | offers_models.Offer | offers_models.Stock]] = defaultdict(list)
+    for obj in query:
+        objects[getattr(obj, column_name)].append(obj)
+    return objects
+
+
 def get_last_update_for_provider(
     provider_id: int,
     pc_obj: offers_models.Product | offers_models.Offer | offers_models.Stock | None,
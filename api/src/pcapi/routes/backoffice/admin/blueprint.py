@@ -116,6 +116,7 @@ def toggle_feature_flag(feature_flag_id: int, set_to_active: bool) -> utils.Back
 
     feature_flag.isActive = set_to_active
     repository.save(feature_flag)
+    feature_models.invalidate_feature_cache()
     change_feature_flip_internal_message.send(feature=feature_flag, current_user=current_user)
 
     flash(
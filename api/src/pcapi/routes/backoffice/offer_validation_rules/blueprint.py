@@ -10,6 +10,7 @@ import sqlalchemy as sa
 
 from pcapi.core.offerers import models as offerers_models
 from pcapi.core.offers import models as offers_models
+from pcapi.core.offers import validation_rules as offer_validation_rules
 from pcapi.core.permissions import models as perm_models
 from pcapi.core.users import models as users_models
 from pcapi.models import db
@@ -195,6 +196,7 @@ def create_rule() -> utils.BackofficeResponse:
             )
             db.session.add(sub_rule)
         db.session.commit()
+        offer_validation_rules.invalidate_offer_validation_rules_cache()
         flash("Règle créée avec succès", "success")
 
     except sa.exc.IntegrityError as err:
@@ -233,6 +235,7 @@ def delete_rule(rule_id: int) -> utils.BackofficeResponse:
                 db.session.delete(sub_rule)
             db.session.delete(rule_to_delete)
             db.session.commit()
+            offer_validation_rules.invalidate_offer_validation_rules_cache()
         except sa.exc.IntegrityError as exc:
             db.session.rollback()
             flash(Markup("Une erreur s'est produite : {message}").format(message=str(exc)), "warning")
@@ -348,6 +351,7 @@ def edit_rule(rule_id: int) -> utils.BackofficeResponse:
         rule_to_update.latestAuthor = current_user
         db.session.add(rule_to_update)
         db.session.commit()
+        offer_validation_rules.invalidate_offer_validation_rules_cache()
 
     except sa.exc.IntegrityError as exc:
         db.session.rollback()
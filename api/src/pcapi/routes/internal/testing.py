@@ -4,6 +4,7 @@ from pcapi import settings
 from pcapi.models import db
 from pcapi.models.api_errors import ApiErrors
 from pcapi.models.feature import Feature
+from pcapi.models.feature import invalidate_feature_cache
 from pcapi.routes import apis
 from pcapi.serialization.decorator import spectree_serialize
 
@@ -21,3 +22,4 @@ def set_features(body: serializers.FeaturesToggleRequest) -> None:
     for feature in body.features:
         Feature.query.filter_by(name=feature.name).update({"isActive": feature.isActive})
         db.session.commit()
+    invalidate_feature_cache()
@@ -60,7 +60,8 @@ def update_user_profile(
     user: users_models.User, body: serializers.UserProfileUpdateRequest
 ) -> serializers.UserProfileResponse:
     api.update_notification_subscription(user, body.subscriptions)
-    external_attributes_api.update_external_user(user)
+    # Not debounced: bulk imports in Sendinblue cannot remove a contact from the blacklist.
+    external_attributes_api.update_external_user(user, immediate=True)
     return serializers.UserProfileResponse.from_orm(user)
 
 
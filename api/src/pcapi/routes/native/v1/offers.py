@@ -1,5 +1,10 @@
+from functools import partial
+import typing
+
+import pydantic.v1 as pydantic_v1
 from sqlalchemy.orm import joinedload
 
+from pcapi import settings
 from pcapi.core.categories import subcategories_v2
 import pcapi.core.mails.transactional as transactional_mails
 from pcapi.core.offerers.models import Offerer
@@ -11,6 +16,7 @@ from pcapi.core.offers.models import PriceCategory
 from pcapi.core.offers.models import Product
 from pcapi.core.offers.models import Reason
 from pcapi.core.offers.models import Stock
+import pcapi.core.offers.utils as offers_utils
 import pcapi.core.providers.repository as providers_repository
 from pcapi.core.users.models import User
 from pcapi.models.api_errors import ApiErrors
@@ -18,6 +24,7 @@ from pcapi.models.api_errors import ResourceNotFoundError
 from pcapi.models.offer_mixin import OfferValidationStatus
 from pcapi.routes.native.security import authenticated_and_active_user_required
 from pcapi.serialization.decorator import spectree_serialize
+from pcapi.utils.cache import get_from_cache
 from pcapi.workers import push_notification_job
 
 from . import blueprint
@@ -28,7 +35,24 @@ from .serialization import subcategories_v2 as subcategories_v2_serializers
 # WebApp v2 proxy expects endpoint to be at "/offer/<int:offer_id>". This path MUST NOT be changed. Its reponse can be changed, though.
 @blueprint.native_v1.route("/offer/<int:offer_id>", methods=["GET"])
 @spectree_serialize(response_model=serializers.OfferResponse, api=blueprint.api, on_error_statuses=[404])
-def get_offer(offer_id: str) -> serializers.OfferResponse:
+def get_offer(offer_id: int) -> serializers.OfferResponse:
+    if settings.NATIVE_OFFER_RESPONSE_CACHE_TTL <= 0:
+        return _get_offer_response(offer_id)
+    # Concurrent requests on an offer that is not in the cache are
+    # coalesced: only one of them loads the offer and refreshes
+    # cinema stocks from the provider.
+    response = get_from_cache(
+        retriever=partial(_get_offer_response, offer_id),
+        key_template=offers_utils.OFFER_RESPONSE_CACHE_KEY_TEMPLATE,
+        key_args={"offer_id": offer_id},
+        expire=settings.NATIVE_OFFER_RESPONSE_CACHE_TTL,
+        return_type=pydantic_v1.BaseModel,
+        lock_timeout=offers_utils.OFFER_RESPONSE_CACHE_LOCK_TIMEOUT,
+    )
+    return typing.cast(serializers.OfferResponse, response)
+
+
+def _get_offer_response(offer_id: int) -> serializers.OfferResponse:
     offer: Offer = (
         Offer.query.options(
             joinedload(Offer.stocks).joinedload(Stock.priceCategory).joinedload(PriceCategory.priceCategoryLabel)
@@ -1,15 +1,21 @@
 from typing import cast
 
+import flask
 from flask_login import current_user
 from flask_login import login_required
 
+import pcapi.core.bookings.api as bookings_api
 from pcapi.core.bookings.models import BookingExportType
 import pcapi.core.bookings.repository as booking_repository
+from pcapi.core.bookings.utils import encode_csv_chunks
+from pcapi.models.api_errors import ResourceNotFoundError
 from pcapi.routes.serialization.bookings_recap_serialize import ListBookingsQueryModel
 from pcapi.routes.serialization.bookings_recap_serialize import ListBookingsResponseModel
+from pcapi.routes.serialization.bookings_recap_serialize import PrepareBookingsExportResponseModel
 from pcapi.routes.serialization.bookings_recap_serialize import UserHasBookingResponse
 from pcapi.routes.serialization.bookings_recap_serialize import serialize_booking_recap
 from pcapi.serialization.decorator import spectree_serialize
+from pcapi.workers.bookings_export_job import export_bookings_job
 
 from . import blueprint
 
@@ -73,8 +79,14 @@ def get_user_has_bookings() -> UserHasBookingResponse:
         "Content-Disposition": "attachment; filename=reservations_pass_culture.csv",
     },
 )
-def get_bookings_csv(query: ListBookingsQueryModel) -> bytes:
-    return _create_booking_export_file(query, BookingExportType.CSV)
+def get_bookings_csv(query: ListBookingsQueryModel) -> flask.Response:
+    # The file is streamed while bookings are fetched from the database.
+    bookings_query = booking_repository.get_export_query(
+        user=current_user._get_current_object(),  # for tests to succeed, because current_user is actually a LocalProxy
+        **_get_export_filters(query),
+    )
+    chunks = encode_csv_chunks(booking_repository.iter_csv_report(bookings_query))
+    return flask.Response(flask.stream_with_context(chunks))
 
 
 @blueprint.pro_private_api.route("/bookings/excel", methods=["GET"])
@@ -87,31 +99,58 @@ def get_bookings_csv(query: ListBookingsQueryModel) -> bytes:
     },
 )
 def get_bookings_excel(query: ListBookingsQueryModel) -> bytes:
-    return _create_booking_export_file(query, BookingExportType.EXCEL)
+    export_data = booking_repository.get_export(
+        user=current_user._get_current_object(),  # for tests to succeed, because current_user is actually a LocalProxy
+        export_type=BookingExportType.EXCEL,
+        **_get_export_filters(query),
+    )
+    return cast(bytes, export_data)
 
 
-def _create_booking_export_file(query: ListBookingsQueryModel, export_type: BookingExportType) -> bytes:
-    venue_id = query.venue_id
-    event_date = query.event_date
+@blueprint.pro_private_api.route("/bookings/export", methods=["POST"])
+@login_required
+@spectree_serialize(
+    response_model=None,
+    on_success_status=202,
+    api=blueprint.pro_private_schema,
+)
+def prepare_bookings_export(query: ListBookingsQueryModel) -> PrepareBookingsExportResponseModel:
+    # For large offerers, the export is generated in the background
+    # and its link is sent by e-mail.
+    export_bookings_job.delay(
+        current_user.id,
+        _get_export_filters(query),
+        query.export_type or BookingExportType.CSV,
+    )
+    return PrepareBookingsExportResponseModel()
+
+
+@blueprint.pro_private_api.route("/bookings/exports/<token>/<filename>", methods=["GET"])
+@login_required
+@spectree_serialize(json_format=False)
+def get_bookings_export(token: str, filename: str) -> flask.Response:
+    # This is the link that is sent by e-mail once an export of
+    # individual or collective bookings is ready.
+    try:
+        export_file, content_type = bookings_api.open_bookings_export(
+            current_user._get_current_object(), token, filename
+        )
+    except FileNotFoundError:
+        raise ResourceNotFoundError()
+    return flask.send_file(export_file, mimetype=content_type, as_attachment=True, download_name=filename)
+
+
+def _get_export_filters(query: ListBookingsQueryModel) -> dict:
     booking_period = None
     if query.booking_period_beginning_date and query.booking_period_ending_date:
         booking_period = (
             query.booking_period_beginning_date,
             query.booking_period_ending_date,
         )
-    booking_status = query.booking_status_filter
-    offer_type = query.offer_type
-
-    export_data = booking_repository.get_export(
-        user=current_user._get_current_object(),  # for tests to succeed, because current_user is actually a LocalProxy
-        booking_period=booking_period,
-        status_filter=booking_status,
-        event_date=event_date,
-        venue_id=venue_id,
-        offer_type=offer_type,
-        export_type=export_type,
-    )
-
-    if export_type == BookingExportType.CSV:
-        return cast(str, export_data).encode("utf-8-sig")
-    return cast(bytes, export_data)
+    return {
+        "booking_period": booking_period,
+        "status_filter": query.booking_status_filter,
+        "event_date": query.event_date,
+        "venue_id": query.venue_id,
+        "offer_type": query.offer_type,
+    }
@@ -4,10 +4,12 @@ import math
 from typing import cast
 
 from dateutil import parser
+import flask
 from flask_login import current_user
 from flask_login import login_required
 
 from pcapi.core.bookings.models import BookingExportType
+from pcapi.core.bookings.utils import encode_csv_chunks
 from pcapi.core.educational import exceptions as collective_exceptions
 from pcapi.core.educational import repository as collective_repository
 from pcapi.core.educational.api import booking as educational_api_booking
@@ -16,9 +18,11 @@ from pcapi.core.offerers import exceptions as offerers_exceptions
 from pcapi.models.api_errors import ApiErrors
 from pcapi.routes.apis import private_api
 from pcapi.routes.serialization import collective_bookings_serialize
+from pcapi.routes.serialization.bookings_recap_serialize import PrepareBookingsExportResponseModel
 from pcapi.routes.serialization.bookings_recap_serialize import UserHasBookingResponse
 from pcapi.serialization.decorator import spectree_serialize
 from pcapi.utils.rest import check_user_has_access_to_offerer
+from pcapi.workers.bookings_export_job import export_collective_bookings_job
 
 from . import blueprint
 from ..serialization.collective_bookings_serialize import serialize_collective_booking
@@ -91,8 +95,13 @@ def get_collective_booking_by_id(booking_id: int) -> collective_bookings_seriali
 )
 def get_collective_bookings_csv(
     query: collective_bookings_serialize.ListCollectiveBookingsQueryModel,
-) -> str | bytes:
-    return _create_collective_bookings_export_file(query, BookingExportType.CSV)
+) -> flask.Response:
+    # The file is streamed while bookings are fetched from the database.
+    chunks = educational_api_booking.stream_collective_booking_csv_report(
+        user=current_user._get_current_object(),  # for tests to succeed, because current_user is actually a LocalProxy
+        **_get_export_filters(query),
+    )
+    return flask.Response(flask.stream_with_context(encode_csv_chunks(chunks)))
 
 
 @blueprint.pro_private_api.route("/collective/bookings/excel", methods=["GET"])
@@ -106,34 +115,48 @@ def get_collective_bookings_csv(
 )
 def get_collective_bookings_excel(
     query: collective_bookings_serialize.ListCollectiveBookingsQueryModel,
-) -> str | bytes:
-    return _create_collective_bookings_export_file(query, BookingExportType.EXCEL)
+) -> bytes:
+    export_data = educational_api_booking.get_collective_booking_report(
+        user=current_user._get_current_object(),  # for tests to succeed, because current_user is actually a LocalProxy
+        export_type=BookingExportType.EXCEL,
+        **_get_export_filters(query),
+    )
+    return cast(bytes, export_data)
 
 
-def _create_collective_bookings_export_file(
-    query: collective_bookings_serialize.ListCollectiveBookingsQueryModel, export_type: BookingExportType
-) -> str | bytes:
-    venue_id = query.venue_id
-    event_date = parser.parse(query.event_date) if query.event_date else None
+@blueprint.pro_private_api.route("/collective/bookings/export", methods=["POST"])
+@login_required
+@spectree_serialize(
+    response_model=None,
+    on_success_status=202,
+    api=blueprint.pro_private_schema,
+)
+def prepare_collective_bookings_export(
+    query: collective_bookings_serialize.ListCollectiveBookingsQueryModel,
+) -> PrepareBookingsExportResponseModel:
+    # For large offerers, the export is generated in the background
+    # and its link is sent by e-mail.
+    export_collective_bookings_job.delay(
+        current_user.id,
+        _get_export_filters(query),
+        query.export_type or BookingExportType.CSV,
+    )
+    return PrepareBookingsExportResponseModel()
+
+
+def _get_export_filters(query: collective_bookings_serialize.ListCollectiveBookingsQueryModel) -> dict:
     booking_period = None
     if query.booking_period_beginning_date and query.booking_period_ending_date:
         booking_period = (
             datetime.fromisoformat(query.booking_period_beginning_date).date(),
             datetime.fromisoformat(query.booking_period_ending_date).date(),
         )
-    booking_status = query.booking_status_filter
-
-    export_data = educational_api_booking.get_collective_booking_report(
-        user=current_user._get_current_object(),  # for tests to succeed, because current_user is actually a LocalProxy
-        booking_period=booking_period,
-        status_filter=booking_status,
-        event_date=event_date,
-        venue_id=venue_id,
-        export_type=export_type,
-    )
-    if export_type == BookingExportType.CSV:
-        return cast(str, export_data).encode("utf-8-sig")
-    return cast(bytes, export_data)
+    return {
+        "booking_period": booking_period,
+        "status_filter": query.booking_status_filter,
+        "event_date": parser.parse(query.event_date) if query.event_date else None,
+        "venue_id": query.venue_id,
+    }
 
 
 @blueprint.pro_private_api.route("/collective/bookings/pro/userHasBookings", methods=["GET"])
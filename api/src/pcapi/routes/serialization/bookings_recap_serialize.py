@@ -72,6 +72,10 @@ class UserHasBookingResponse(BaseModel):
     hasBookings: bool
 
 
+class PrepareBookingsExportResponseModel(BaseModel):
+    pass
+
+
 class ListBookingsResponseModel(BaseModel):
     bookingsRecap: list[BookingRecapResponseModel]
     page: int
@@ -9,6 +9,7 @@ from flask_sqlalchemy import BaseQuery
 from pydantic.v1 import root_validator
 import xlsxwriter
 
+from pcapi.core.bookings.models import BookingExportType
 from pcapi.core.bookings.utils import convert_booking_dates_utc_to_venue_timezone
 from pcapi.core.bookings.utils import convert_real_booking_dates_utc_to_venue_timezone
 from pcapi.core.educational import models
@@ -45,6 +46,7 @@ class ListCollectiveBookingsQueryModel(BaseModel):
     booking_status_filter: models.CollectiveBookingStatusFilter | None
     booking_period_beginning_date: str | None
     booking_period_ending_date: str | None
+    export_type: BookingExportType | None
 
     class Config:
         alias_generator = to_camel
@@ -315,6 +317,7 @@ def serialize_collective_booking(collective_booking: models.CollectiveBooking) -
     )
 
 
+EXPORT_CHUNK_SIZE = 1000
 COLLECTIVE_BOOKING_EXPORT_HEADER = [
     "Lieu",
     "Nom de l'offre",
@@ -331,11 +334,14 @@ COLLECTIVE_BOOKING_EXPORT_HEADER = [
 ]
 
 
-def serialize_collective_booking_csv_report(query: BaseQuery) -> str:
+def iter_collective_booking_csv_report(query: BaseQuery) -> typing.Iterator[str]:
+    """Yield the CSV report in chunks of `EXPORT_CHUNK_SIZE` rows, so
+    that it can be streamed without being fully built in memory.
+    """
     output = StringIO()
     writer = csv.writer(output, dialect=csv.excel, delimiter=";", quoting=csv.QUOTE_NONNUMERIC)
     writer.writerow(COLLECTIVE_BOOKING_EXPORT_HEADER)
-    for collective_booking in query.yield_per(1000):
+    for index, collective_booking in enumerate(query.yield_per(EXPORT_CHUNK_SIZE), 1):
         writer.writerow(
             (
                 collective_booking.venueName,
@@ -354,13 +360,22 @@ def serialize_collective_booking_csv_report(query: BaseQuery) -> str:
                 f"{collective_booking.institutionType} {collective_booking.institutionName}",
             )
         )
+        if index % EXPORT_CHUNK_SIZE == 0:
+            yield output.getvalue()
+            output.seek(0)
+            output.truncate()
+    yield output.getvalue()
 
-    return output.getvalue()
 
+def serialize_collective_booking_csv_report(query: BaseQuery) -> str:
+    return "".join(iter_collective_booking_csv_report(query))
 
-def serialize_collective_booking_excel_report(query: BaseQuery) -> bytes:
-    output = BytesIO()
-    workbook = xlsxwriter.Workbook(output)
+
+def write_collective_booking_excel_report(query: BaseQuery, output: typing.BinaryIO) -> None:
+    """Write the Excel report to `output`, in "constant memory" mode
+    (see `bookings.repository.write_excel_report()`).
+    """
+    workbook = xlsxwriter.Workbook(output, {"constant_memory": True})
 
     bold = workbook.add_format({"bold": 1})
     currency_format = workbook.add_format({"num_format": "###0.00[$€-fr-FR]"})
@@ -373,7 +388,7 @@ def serialize_collective_booking_excel_report(query: BaseQuery) -> bytes:
         worksheet.write(row, col_num, title, bold)
         worksheet.set_column(col_num, col_num, col_width)
     row = 1
-    for collective_booking in query.yield_per(1000):
+    for collective_booking in query.yield_per(EXPORT_CHUNK_SIZE):
         worksheet.write(row, 0, collective_booking.venueName)
         worksheet.write(row, 1, collective_booking.offerName)
         worksheet.write(
@@ -406,6 +421,11 @@ def serialize_collective_booking_excel_report(query: BaseQuery) -> bytes:
         row += 1
 
     workbook.close()
+
+
+def serialize_collective_booking_excel_report(query: BaseQuery) -> bytes:
+    output = BytesIO()
+    write_collective_booking_excel_report(query, output)
     return output.getvalue()
 
 
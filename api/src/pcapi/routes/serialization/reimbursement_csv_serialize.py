@@ -233,10 +233,9 @@ class ReimbursementDetails:
 
 def generate_reimbursement_details_csv(reimbursement_details: Iterable[ReimbursementDetails]) -> str:
     output = StringIO()
-    csv_lines = [reimbursement_detail.as_csv_row() for reimbursement_detail in reimbursement_details]
     writer = csv.writer(output, dialect=csv.excel, delimiter=";", quoting=csv.QUOTE_NONNUMERIC)
     writer.writerow(ReimbursementDetails.CSV_HEADER)
-    writer.writerows(csv_lines)
+    writer.writerows(reimbursement_detail.as_csv_row() for reimbursement_detail in reimbursement_details)
     return output.getvalue()
 
 
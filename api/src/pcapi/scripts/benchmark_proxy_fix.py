@@ -0,0 +1,66 @@
+import time
+import typing
+
+import click
+import flask
+import werkzeug.middleware.proxy_fix
+import werkzeug.test
+
+from pcapi import settings
+from pcapi.models.feature import Feature
+from pcapi.models.feature import FeatureToggle
+from pcapi.utils.blueprint import Blueprint
+
+
+blueprint = Blueprint(__name__, __name__)
+
+
+@blueprint.cli.command("benchmark_proxy_fix")
+@click.option("--iterations", help="Number of requests to measure", type=int, default=1_000)
+def benchmark_proxy_fix(iterations: int) -> None:
+    """Compare the ProxyFix middleware, which reads its feature flag
+    from the snapshot of the process-wide cache, with a query of the
+    flag on each request (the former implementation).
+
+    Requests are handled by an empty WSGI application, so that only
+    the overhead of the middleware is measured.
+    """
+    if settings.IS_PROD:
+        raise ValueError("This benchmark must not be run on this environment")
+    from pcapi.flask_app import ProxyFix
+
+    app = flask.current_app._get_current_object()  # type: ignore [attr-defined]
+    environ = werkzeug.test.EnvironBuilder(path="/", headers=[("X-Forwarded-For", "1.2.3.4")]).get_environ()
+
+    def empty_app(environ: dict, start_response: typing.Callable) -> list[bytes]:
+        start_response("204 No Content", [])
+        return []
+
+    def start_response(status: str, headers: list, exc_info: typing.Any = None) -> typing.Callable[[bytes], None]:
+        return lambda data: None
+
+    class FormerProxyFix(werkzeug.middleware.proxy_fix.ProxyFix):
+        def __call__(self, environ: dict, start_response: typing.Callable) -> typing.Iterable[bytes]:
+            with app.app_context():
+                behind_l7 = Feature.query.filter_by(name=FeatureToggle.WIP_BEHIND_L7_LOAD_BALANCER.name).one().isActive
+                self.x_for = 3 if behind_l7 else 1
+            return super().__call__(environ, start_response)
+
+    middlewares = (
+        ("query on each request", FormerProxyFix(empty_app, x_for=1)),
+        ("cached flags snapshot", ProxyFix(empty_app, x_for=1)),
+    )
+    for name, middleware in middlewares:
+        middleware(environ.copy(), start_response)  # warm up (connection pool, cache)
+        durations = []
+        for _ in range(iterations):
+            start = time.perf_counter()
+            middleware(environ.copy(), start_response)
+            durations.append(time.perf_counter() - start)
+        durations.sort()
+        print(
+            f"{name}: {iterations} requests: "
+            f"median = {durations[len(durations) // 2] * 1000:.3f} ms, "
+            f"p99 = {durations[int(len(durations) * 0.99)] * 1000:.3f} ms, "
+            f"max = {durations[-1] * 1000:.3f} ms"
+        )
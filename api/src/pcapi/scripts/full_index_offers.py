@@ -1,36 +1,48 @@
-import datetime
-import logging
-import statistics
-import time
-
 import click
-import pytz
 
-from pcapi.core import search
-import pcapi.core.offers.models as offers_models
-from pcapi.core.search.backends import algolia
+from pcapi.core.search import full_reindexation
 from pcapi.utils.blueprint import Blueprint
 
 
-BATCH_SIZE = 1_000
-REPORT_EVERY = 10_000
-
-logger = logging.getLogger(__name__)
 blueprint = Blueprint(__name__, __name__)
 
 
-def _get_eta(end: int, current: int, elapsed_per_batch: list[int]) -> str:
-    left_to_do = end - current
-    eta_seconds = left_to_do / BATCH_SIZE * statistics.mean(elapsed_per_batch)
-    eta_datetime = datetime.datetime.utcnow() + datetime.timedelta(seconds=eta_seconds)
-    eta_datetime = eta_datetime.astimezone(pytz.timezone("Europe/Paris"))
-    return eta_datetime.strftime("%d/%m/%Y %H:%M:%S")
+def print_stats(stats: full_reindexation.ReindexationStats) -> None:
+    print(
+        f"Done: {stats.indexed} indexed in {stats.completed_ranges}/{stats.ranges} ranges "
+        f"({round(stats.throughput, 1)}/s, {stats.retries} retries)"
+    )
+    for id_range in stats.failed_ranges:
+        print(f"  => FAILED: {id_range.start} - {id_range.end}")
+    if stats.failed_ranges:
+        print("Run again with --resume to retry failed ranges.")
+
+
+def reindexation_options(func: click.decorators.FC) -> click.decorators.FC:
+    for option in reversed(
+        (
+            click.argument("start", type=int, required=False),
+            click.argument("end", type=int, required=False),
+            click.option("--processes", type=int, default=4, show_default=True),
+            click.option("--range-size", type=int, default=full_reindexation.DEFAULT_RANGE_SIZE, show_default=True),
+            click.option("--max-attempts", type=int, default=full_reindexation.DEFAULT_MAX_ATTEMPTS, show_default=True),
+            click.option("--resume", is_flag=True, help="Resume the previous run, with its bounds and range size."),
+        )
+    ):
+        func = option(func)
+    return func
 
 
 @blueprint.cli.command("full_index_offers")
-@click.argument("start", type=int, required=True)
-@click.argument("end", type=int, required=True)
-def full_index_offers(start: int, end: int) -> None:
+@reindexation_options
+def full_index_offers(
+    start: int | None,
+    end: int | None,
+    processes: int,
+    range_size: int,
+    max_attempts: int,
+    resume: bool,
+) -> None:
     """Reindex all bookable offers.
 
     The script iterates over all active offers. For each offer, it
@@ -38,71 +50,33 @@ def full_index_offers(start: int, end: int) -> None:
     Otherwise, the offer is NOT unindexed, as we suppose that the
     offer has already been unindexed through the normally-run
     code. That way, this script skips a lot of unnecessary
-    unindexation requests.
-
-    This script processes batches of 1.000 offers and reports back
-    every 10.000 offers.
-
-    Errors are logged and are not blocking. You MUST check the logs
-    for batches that failed and MUST re-run all these batches.
+    unindexation requests. Bookable offers are always sent, even if
+    they have not changed since they were last indexed.
 
-    Obviously, the script takes a lot of time. You should run multiple
-    instances of it at the same time. 4 concurrent instances looks
-    like a good compromise.
+    The id space (by default, from the lowest to the highest id of
+    active offers) is split in ranges that are handled by several
+    processes. Progress is saved in Redis after each batch of 1.000
+    ids, and the overall progress, throughput and ETA are logged
+    after each range. Failed ranges are automatically retried. If
+    some ranges still fail (or if the script is interrupted), run it
+    again with --resume: it only handles what is left to do.
 
     Usage:
 
-        $ flask full_index_offers.py 10_000_000 20_000_000
+        $ flask full_index_offers
+        $ flask full_index_offers 10_000_000 20_000_000 --processes 8
+        $ flask full_index_offers --resume
 
     Using "_" as thousands separator is supported (and encouraged for
     clarity).
     """
-    if start > end:
-        raise ValueError('"start" must be less than "end"')
-    backend = algolia.AlgoliaBackend()
-
-    queue: list[tuple] = []
-
-    def enqueue_or_index(
-        q: list,
-        offer: offers_models.Offer | None,
-        last_30_days_bookings: dict[int, int] | None,
-        force_index: bool = False,
-    ) -> None:
-        if offer and last_30_days_bookings is not None:
-            q.append((offer, last_30_days_bookings.get(offer.id) or 0))
-        if force_index or len(q) > BATCH_SIZE:
-            try:
-                backend.index_offers([offer for offer, _ in q], {offer.id: n_bookings for offer, n_bookings in q})
-            except Exception as exc:  # pylint: disable=broad-except
-                logger.exception(
-                    "Full offer reindexation: error while reindexing from %d to %d: %s", q[0][0].id, q[-1][0].id, exc
-                )
-            q.clear()
-
-    to_report = 0
-    elapsed_per_batch = []
-
-    while start <= end:
-        start_time = time.perf_counter()
-        offers = (
-            search.get_base_query_for_offer_indexation()
-            .filter(
-                offers_models.Offer.isActive.is_(True),
-                offers_models.Offer.id.between(start, min(start + BATCH_SIZE, end)),
-            )
-            .order_by(offers_models.Offer.id)
-        )
-        last_x_days_bookings_count_by_offer = search.get_last_x_days_booking_count_by_offer(offers)
-        for offer in offers:
-            if offer.is_eligible_for_search:
-                enqueue_or_index(queue, offer, last_x_days_bookings_count_by_offer)
-        elapsed_per_batch.append(int(time.perf_counter() - start_time))
-        start = start + BATCH_SIZE
-        eta = _get_eta(end, start, elapsed_per_batch)
-        to_report += BATCH_SIZE
-        if to_report >= REPORT_EVERY:
-            to_report = 0
-            print(f"  => OK: {start} | eta = {eta}")
-    enqueue_or_index(queue, offer=None, last_30_days_bookings=None, force_index=True)
-    print("Done")
+    stats = full_reindexation.reindex_all(
+        "offers",
+        start=start,
+        end=end,
+        processes=processes,
+        range_size=range_size,
+        max_attempts=max_attempts,
+        resume=resume,
+    )
+    print_stats(stats)
@@ -1,12 +1,18 @@
 import importlib
+import typing
 
+import click
 import flask
+import flask.cli
 
 from pcapi import settings
 
 
-def install_commands(app: flask.Flask) -> None:
+def _get_command_module_paths() -> tuple[str, ...]:
     module_paths: tuple[str, ...] = (
+        # The RQ worker is started with `flask worker`: look it up
+        # first, so that it does not import other command modules.
+        "pcapi.workers.worker",
         "pcapi.core.bookings.commands",
         "pcapi.core.educational.commands",
         "pcapi.core.external.commands",
@@ -21,6 +27,7 @@ def install_commands(app: flask.Flask) -> None:
         "pcapi.scheduled_tasks.commands",
         "pcapi.scheduled_tasks.titelive_commands",
         "pcapi.scripts.backoffice_users.add_permissions_to_staging_specific_roles",
+        "pcapi.scripts.benchmark_proxy_fix",
         "pcapi.scripts.beneficiary.import_test_users",
         "pcapi.scripts.booking.commands",
         "pcapi.scripts.check_pre_migrations",
@@ -36,12 +43,54 @@ def install_commands(app: flask.Flask) -> None:
         "pcapi.utils.db",
         "pcapi.utils.human_ids",
         "pcapi.utils.secrets",
-        "pcapi.workers.worker",
     )
 
     if settings.ENABLE_COMMAND_CLEAN_DATABASE:
         module_paths += ("pcapi.scripts.clean_database",)
 
-    for path in module_paths:
-        module = importlib.import_module(path)
-        app.register_blueprint(getattr(module, "blueprint"), cli_group=None)
+    return module_paths
+
+
+def _install_command_module(app: flask.Flask, path: str) -> None:
+    module = importlib.import_module(path)
+    app.register_blueprint(getattr(module, "blueprint"), cli_group=None)
+
+
+def install_commands(app: flask.Flask) -> None:
+    for path in _get_command_module_paths():
+        _install_command_module(app, path)
+
+
+class LazyCommandGroup(flask.cli.AppGroup):
+    """A group of commands that imports command modules only when a
+    command is looked up or listed, i.e. when the `flask` CLI is used.
+
+    Modules are imported in order until the requested command is found.
+    """
+
+    def __init__(self, app: flask.Flask, *args: typing.Any, **kwargs: typing.Any) -> None:
+        super().__init__(*args, **kwargs)
+        self._app = app
+        self._pending_module_paths = list(_get_command_module_paths())
+
+    def get_command(self, ctx: click.Context, cmd_name: str) -> click.Command | None:
+        command = super().get_command(ctx, cmd_name)
+        while command is None and self._pending_module_paths:
+            _install_command_module(self._app, self._pending_module_paths.pop(0))
+            command = super().get_command(ctx, cmd_name)
+        return command
+
+    def list_commands(self, ctx: click.Context) -> list[str]:
+        while self._pending_module_paths:
+            _install_command_module(self._app, self._pending_module_paths.pop(0))
+        return super().list_commands(ctx)
+
+
+def install_commands_lazily(app: flask.Flask) -> None:
+    """Register commands without importing their modules, which are
+    only needed by the `flask` CLI (and slow down the startup of web
+    workers).
+    """
+    cli = LazyCommandGroup(app, name=app.cli.name)
+    cli.commands.update(app.cli.commands)
+    app.cli = cli
@@ -79,6 +79,19 @@ SESSION_COOKIE_SAMESITE = os.environ.get("SESSION_COOKIE_SAMESITE", "Lax")
 NATIVE_APP_MINIMAL_CLIENT_VERSION = semver.VersionInfo.parse(
     os.environ.get("NATIVE_APP_MINIMAL_CLIENT_VERSION", "1.132.1")
 )
+# Number of seconds during which the response of `GET /native/v1/offer/<id>`
+# is cached (the cache is cleared when the offer is reindexed). 0 disables the cache.
+NATIVE_OFFER_RESPONSE_CACHE_TTL = int(os.environ.get("NATIVE_OFFER_RESPONSE_CACHE_TTL", 10))
+# Number of seconds during which compiled offer validation rules are cached in
+# each process (they are also invalidated through Redis when edited). 0 disables the cache.
+OFFER_VALIDATION_RULES_CACHE_TTL = int(os.environ.get("OFFER_VALIDATION_RULES_CACHE_TTL", 600))
+# Number of seconds after which the in-memory directory of active educational
+# institutions is reloaded in each process (it is also invalidated through Redis
+# when institutions are imported). 0 disables the directory.
+EDUCATIONAL_INSTITUTIONS_DIRECTORY_TTL = int(os.environ.get("EDUCATIONAL_INSTITUTIONS_DIRECTORY_TTL", 3600))
+# Number of seconds during which the mapping of book sections to macro sections
+# (used to index book offers) is cached in each process. 0 disables the cache.
+BOOK_MACRO_SECTIONS_CACHE_TTL = int(os.environ.get("BOOK_MACRO_SECTIONS_CACHE_TTL", 3600))
 
 
 # REDIS
@@ -92,6 +105,12 @@ REDIS_VENUE_IDS_FOR_OFFERS_CHUNK_SIZE = int(os.environ.get("REDIS_VENUE_IDS_FOR_
 REDIS_VENUE_IDS_CHUNK_SIZE = int(os.environ.get("REDIS_VENUE_IDS_CHUNK_SIZE", 1000))
 
 
+# FEATURE FLAGS
+# Number of seconds during which feature flags are cached in each process
+# (flags are also invalidated through Redis when toggled). 0 disables the cache.
+FEATURE_FLAGS_CACHE_TTL = int(os.environ.get("FEATURE_FLAGS_CACHE_TTL", 60))
+
+
 # SENTRY
 SENTRY_DSN = secrets_utils.get("SENTRY_DSN", "")
 SENTRY_SAMPLE_RATE = float(os.environ.get("SENTRY_SAMPLE_RATE", 0))
@@ -161,6 +180,12 @@ BATCH_MAX_USERS_PER_TRANSACTIONAL_NOTIFICATION = int(
 BEAMER_API_KEY = secrets_utils.get("BEAMER_API_KEY", "")
 BEAMER_BACKEND = os.environ.get("BEAMER_BACKEND")
 
+# EXTERNAL ATTRIBUTES (Batch, Beamer and Sendinblue)
+# When set, updates of external attributes are debounced: they are sent by the
+# `flush_external_attributes_updates` command once a user (or pro email) has not
+# been updated for this number of seconds. Debouncing is disabled if 0.
+EXTERNAL_ATTRIBUTES_UPDATE_DELAY = int(os.environ.get("EXTERNAL_ATTRIBUTES_UPDATE_DELAY", 0))
+
 # SENDINBLUE
 SENDINBLUE_API_KEY = secrets_utils.get("SENDINBLUE_API_KEY", "")
 SENDINBLUE_PRO_CONTACT_LIST_ID = int(os.environ.get("SENDINBLUE_PRO_CONTACT_LIST_ID", 12))
@@ -252,6 +277,8 @@ EMS_API_BOOKING_URL = secrets_utils.get("EMS_API_BOOKING_URL", "")
 EMS_API_BOOKING_SECRET_KEY = secrets_utils.get("EMS_API_BOOKING_SECRET_KEY", "")
 EMS_API_BOOKING_HEADER = secrets_utils.get("EMS_API_BOOKING_HEADER", "")
 EMS_SITES_API_URL = secrets_utils.get("EMS_SITES_API_URL")
+# Local provider classes (e.g. "TiteLiveThings") whose chunks are saved with bulk upserts
+PROVIDERS_WITH_BULK_UPSERT = utils.parse_str_to_list(os.environ.get("PROVIDERS_WITH_BULK_UPSERT"))
 
 # DEMARCHES SIMPLIFIEES
 DMS_VENUE_PROCEDURE_ID_V2 = os.environ.get("DEMARCHES_SIMPLIFIEES_RIB_VENUE_PROCEDURE_ID_V2")
@@ -280,6 +307,9 @@ DS_BANK_ACCOUNT_PROCEDURE_ID = os.environ.get("DEMARCHES_SIMPLIFIEES_BANK_ACCOUN
 OBJECT_STORAGE_URL = os.environ.get("OBJECT_STORAGE_URL", "")
 OBJECT_STORAGE_PROVIDER = os.environ.get("OBJECT_STORAGE_PROVIDER")
 LOCAL_STORAGE_DIR = Path(os.path.dirname(os.path.realpath(__file__))) / "static" / "object_store_data"
+# Private objects must not be served by the `/storage` route of local
+# development, hence outside of `static`.
+LOCAL_PRIVATE_STORAGE_DIR = Path(os.path.dirname(os.path.realpath(__file__))) / "private_object_store_data"
 
 # THUMBS
 THUMBS_FOLDER_NAME = os.environ.get("THUMBS_FOLDER_NAME", "thumbs")
@@ -288,6 +318,7 @@ THUMBS_FOLDER_NAME = os.environ.get("THUMBS_FOLDER_NAME", "thumbs")
 GCP_BUCKET_CREDENTIALS = json.loads(base64.b64decode(secrets_utils.get("GCP_BUCKET_CREDENTIALS", "")) or "{}")
 GCP_BUCKET_NAME = os.environ.get("GCP_BUCKET_NAME", "")
 GCP_ALTERNATE_BUCKET_NAME = os.environ.get("GCP_ALTERNATE_BUCKET_NAME", "")
+GCP_PRIVATE_BUCKET_NAME = os.environ.get("GCP_PRIVATE_BUCKET_NAME", "")
 GCP_DATA_BUCKET_NAME = secrets_utils.get("GCP_DATA_BUCKET_NAME", "")
 GCP_DATA_PROJECT_ID = secrets_utils.get("GCP_DATA_PROJECT_ID", "")
 GCP_COMPLIANCE_API_PRIMARY_QUEUE_NAME = os.environ.get("GCP_COMPLIANCE_API_PRIMARY_QUEUE_NAME")
@@ -2,6 +2,7 @@ from functools import partial
 from functools import wraps
 from hashlib import sha256
 import json
+import time
 from typing import Any
 from typing import Callable
 from typing import Iterable
@@ -9,6 +10,10 @@ from typing import cast
 
 from flask import current_app
 import pydantic.v1 as pydantic_v1
+import redis
+
+
+LOCK_POLL_INTERVAL = 0.05  # seconds
 
 
 class _CacheProxy:
@@ -32,6 +37,7 @@ def get_from_cache(
     expire: int | None = 60 * 60 * 24,  # 24h
     return_type: type = str,
     force_update: bool = False,
+    lock_timeout: int | None = None,
 ) -> pydantic_v1.BaseModel | str:
     """
     Retrieve data from cache if available else use the retriever callable to retrieve data and store it in cache.
@@ -46,6 +52,8 @@ def get_from_cache(
     :param return_type: Type awaited for return value. This is meant to fool mypy and spectree_serialize and keep
         compatibility. It can be either `BaseModel` or `str`.
     :param force_update: If True force the update of the field cache.
+    :param lock_timeout: If set, concurrent calls that miss the cache are coalesced: only one of them calls the
+        retriever while the others wait (up to `lock_timeout` seconds) for the data to be stored in the cache.
     """
     redis_client = current_app.redis_client
     if key_args:
@@ -57,10 +65,21 @@ def get_from_cache(
     miss = data is None
 
     if miss or force_update:
-        data = retriever()
-        if isinstance(data, pydantic_v1.BaseModel):
-            data = data.json(exclude_none=False, by_alias=True)
-        redis_client.set(key, data.encode("utf-8"), ex=expire)
+        lock_key = f"{key}:lock"
+        has_lock = False
+        if lock_timeout and not force_update:
+            has_lock = bool(redis_client.set(lock_key, "1", nx=True, ex=lock_timeout))
+            if not has_lock:
+                data = _wait_for_cached_data(redis_client, key, lock_key, lock_timeout)
+        if data is None or force_update:
+            try:
+                data = retriever()
+                if isinstance(data, pydantic_v1.BaseModel):
+                    data = data.json(exclude_none=False, by_alias=True)
+                redis_client.set(key, data.encode("utf-8"), ex=expire)
+            finally:
+                if has_lock:
+                    redis_client.delete(lock_key)
 
     assert isinstance(data, str)  # help mypy
 
@@ -70,6 +89,22 @@ def get_from_cache(
     return cast(pydantic_v1.BaseModel, _CacheProxy(data=data))
 
 
+def _wait_for_cached_data(redis_client: redis.Redis, key: str, lock_key: str, timeout: int) -> str | None:
+    """Wait until another process has stored data in the cache, and
+    return it. Return None if the other process has failed (and
+    released its lock) or if it takes too long.
+    """
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        time.sleep(LOCK_POLL_INTERVAL)
+        data = redis_client.get(key)
+        if data is not None:
+            return data
+        if not redis_client.exists(lock_key):
+            return redis_client.get(key)
+    return None
+
+
 def cached_view(
     *,
     prefix: str = "default",
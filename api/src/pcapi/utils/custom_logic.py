@@ -92,3 +92,48 @@ OPERATIONS = {
     "intersects": intersects,
     "not intersects": lambda a, b: not intersects(a, b),
 }
+
+
+def compile_operation(operator: str, b: typing.Any) -> typing.Callable[[typing.Any], bool]:
+    """Return a function of `a` that is equivalent to
+    `OPERATIONS[operator](a, b)`, where `b` has been sanitized once and
+    for all.
+    """
+    if isinstance(b, list):
+        sanitized_b = sanitize_list(b)
+
+        def _contains(a: typing.Any) -> bool:
+            if not a:
+                return False
+            sanitized_a = sanitize_str(a)
+            return any(element in sanitized_a for element in sanitized_b)
+
+        def _contains_exact(a: typing.Any) -> bool:
+            if not a:
+                return False
+            split_a = sanitize_list(a.split())
+            return any(element in split_a for element in sanitized_b)
+
+        def _intersects(a: typing.Any) -> bool:
+            if not a or not sanitized_b:
+                return False
+            return not sanitized_b_set.isdisjoint(sanitize_list(a))
+
+        match operator:
+            case "in":
+                return lambda a: sanitize_str(a) in sanitized_b
+            case "not in":
+                return lambda a: sanitize_str(a) not in sanitized_b
+            case "contains":
+                return _contains
+            case "contains-exact":
+                return _contains_exact
+            case "intersects":
+                sanitized_b_set = set(sanitized_b)
+                return _intersects
+            case "not intersects":
+                sanitized_b_set = set(sanitized_b)
+                return lambda a: not _intersects(a)
+
+    operation = OPERATIONS[operator]
+    return lambda a: operation(a, b)  # type: ignore[operator]
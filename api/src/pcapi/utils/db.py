@@ -1,3 +1,4 @@
+import contextlib
 import datetime
 import enum
 import hashlib
@@ -9,6 +10,7 @@ import psycopg2.extras
 import pytz
 import sqlalchemy as sqla
 import sqlalchemy.engine as sqla_engine
+import sqlalchemy.event as sqla_event
 import sqlalchemy.types as sqla_types
 
 from pcapi.core.logging import log_elapsed
@@ -211,6 +213,34 @@ def acquire_lock(name: str) -> None:
         db.session.execute(sqla.select([sqla.func.pg_advisory_xact_lock(lock_id)]))
 
 
+class QueryCounter:
+    """Count SQL queries, see `count_queries()`."""
+
+    def __init__(self) -> None:
+        self.count = 0
+
+    def __call__(self, *args: typing.Any, **kwargs: typing.Any) -> None:
+        self.count += 1
+
+
+@contextlib.contextmanager
+def count_queries() -> typing.Iterator[QueryCounter]:
+    """Count SQL queries that are executed within the context.
+
+    Usage:
+
+        with count_queries() as counter:
+            do_something()
+        logger.info("Ran %d queries", counter.count)
+    """
+    counter = QueryCounter()
+    sqla_event.listen(db.engine, "after_cursor_execute", counter)
+    try:
+        yield counter
+    finally:
+        sqla_event.remove(db.engine, "after_cursor_execute", counter)
+
+
 @blueprint.cli.command("detect_invalid_indexes")
 @cron_decorators.log_cron_with_transaction
 def detect_invalid_indexes() -> None:
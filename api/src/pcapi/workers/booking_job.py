@@ -0,0 +1,85 @@
+import logging
+
+import sqlalchemy.orm as sa_orm
+
+import pcapi.core.bookings.api as bookings_api
+from pcapi.core.bookings.models import Booking
+from pcapi.core.offerers.models import Venue
+from pcapi.core.offers.models import Offer
+from pcapi.core.offers.models import Stock
+from pcapi.workers import worker
+from pcapi.workers.decorators import job
+
+
+logger = logging.getLogger(__name__)
+
+BOOK_OFFER_SIDE_EFFECTS_MAX_ATTEMPTS = 3
+
+
+@job(worker.default_queue)
+def run_book_offer_side_effects_job(
+    booking_id: int,
+    side_effects: list[str],
+    first_venue_booking: bool,
+) -> None:
+    """Run side effects of a new booking (e-mails, analytics, external
+    attributes, etc.) once it has been committed.
+
+    Side effects that fail are retried in a job of the low queue (see
+    `retry_book_offer_side_effects_job`), so that retries do not hold
+    workers of the default queue while an external service is down.
+    Those that succeeded are not run again.
+
+    There is one job per booking: side effects that would benefit from
+    batching only enqueue work here. Indexation adds the offer to the
+    Redis queue that is indexed by batches, and external attributes are
+    coalesced by `pcapi.core.external.debounce` (when
+    `EXTERNAL_ATTRIBUTES_UPDATE_DELAY` is set).
+    """
+    _run_book_offer_side_effects(booking_id, side_effects, first_venue_booking, attempt=1)
+
+
+@job(worker.low_queue)
+def retry_book_offer_side_effects_job(
+    booking_id: int,
+    side_effects: list[str],
+    first_venue_booking: bool,
+    attempt: int,
+) -> None:
+    """Retry side effects of a new booking that failed, up to
+    `BOOK_OFFER_SIDE_EFFECTS_MAX_ATTEMPTS` attempts in total.
+    """
+    _run_book_offer_side_effects(booking_id, side_effects, first_venue_booking, attempt=attempt)
+
+
+def _run_book_offer_side_effects(
+    booking_id: int,
+    side_effects: list[str],
+    first_venue_booking: bool,
+    attempt: int,
+) -> None:
+    booking = (
+        Booking.query.filter_by(id=booking_id)
+        .options(
+            sa_orm.joinedload(Booking.user),
+            sa_orm.joinedload(Booking.stock)
+            .joinedload(Stock.offer)
+            .joinedload(Offer.venue)
+            .joinedload(Venue.managingOfferer),
+        )
+        .one_or_none()
+    )
+    if not booking:
+        logger.error("Booking with id:%s not found", booking_id)
+        return
+
+    failed = bookings_api.run_book_offer_side_effects(booking, side_effects, first_venue_booking)
+    if not failed:
+        return
+    if attempt < BOOK_OFFER_SIDE_EFFECTS_MAX_ATTEMPTS:
+        retry_book_offer_side_effects_job.delay(booking_id, failed, first_venue_booking, attempt=attempt + 1)
+    else:
+        logger.error(
+            "Giving up side effects of new booking",
+            extra={"booking": booking_id, "side_effects": failed, "attempts": attempt},
+        )
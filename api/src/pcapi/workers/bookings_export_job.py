@@ -0,0 +1,18 @@
+import pcapi.core.bookings.api as bookings_api
+from pcapi.core.bookings.models import BookingExportType
+from pcapi.core.educational.api import booking as educational_api_booking
+from pcapi.core.users.models import User
+from pcapi.workers import worker
+from pcapi.workers.decorators import job
+
+
+@job(worker.low_queue)
+def export_bookings_job(user_id: int, filters: dict, export_type: BookingExportType) -> None:
+    user = User.query.get(user_id)
+    bookings_api.export_bookings(user, filters, export_type)
+
+
+@job(worker.low_queue)
+def export_collective_bookings_job(user_id: int, filters: dict, export_type: BookingExportType) -> None:
+    user = User.query.get(user_id)
+    educational_api_booking.export_collective_bookings(user, filters, export_type)
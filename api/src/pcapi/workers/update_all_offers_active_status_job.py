@@ -19,7 +19,7 @@ def update_all_offers_active_status_job(filters: dict, is_active: bool) -> None:
         period_ending_date=filters["period_ending_date"],
     )
     individual_offer_query = offers_repository.exclude_offers_from_inactive_venue_provider(individual_offer_query)
-    offers_api.batch_update_offers(individual_offer_query, {"isActive": is_active})
+    offers_api.stream_batch_update_offers(individual_offer_query, {"isActive": is_active})
 
 
 @job(worker.low_queue)
@@ -56,4 +56,4 @@ def update_venue_synchronized_offers_active_status_job(venue_id: int, provider_i
         venue_id, provider_id
     )
 
-    offers_api.batch_update_offers(venue_synchronized_offers_query, {"isActive": is_active})
+    offers_api.stream_batch_update_offers(venue_synchronized_offers_query, {"isActive": is_active})
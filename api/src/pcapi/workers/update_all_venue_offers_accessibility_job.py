@@ -13,6 +13,6 @@ def update_all_venue_offers_accessibility_job(venue: Venue, accessibility: dict[
     collective_offer_query = CollectiveOffer.query.filter(CollectiveOffer.venueId == venue.id)
     collective_offer_template_query = CollectiveOfferTemplate.query.filter(CollectiveOfferTemplate.venueId == venue.id)
 
-    offers_api.batch_update_offers(offer_query, accessibility)
+    offers_api.stream_batch_update_offers(offer_query, accessibility)
     offers_api.batch_update_collective_offers(collective_offer_query, accessibility)
     offers_api.batch_update_collective_offers_template(collective_offer_template_query, accessibility)
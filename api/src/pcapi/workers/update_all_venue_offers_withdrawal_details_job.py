@@ -11,6 +11,6 @@ def update_all_venue_offers_withdrawal_details_job(
 ) -> None:
     query = offers_models.Offer.query.filter(offers_models.Offer.venueId == venue.id)
 
-    offers_api.batch_update_offers(
+    offers_api.stream_batch_update_offers(
         query, {"withdrawalDetails": withdrawal_details}, send_email_notification=send_email_notification
     )
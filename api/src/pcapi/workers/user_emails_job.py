@@ -1,7 +1,10 @@
 import logging
 
+import sqlalchemy.orm as sa_orm
+
 from pcapi.core.bookings.models import Booking
 import pcapi.core.mails.transactional as transactional_mails
+from pcapi.core.offers.models import Offer
 from pcapi.workers import worker
 from pcapi.workers.decorators import job
 
@@ -22,3 +25,10 @@ def send_booking_cancellation_emails_to_user_and_offerer_job(booking_id: int) ->
             "Could not send booking cancellation emails",
             extra={"booking": booking.id},
         )
+
+
+@job(worker.low_queue)
+def send_withdrawal_updated_emails_job(offer_ids: list[int]) -> None:
+    offers = Offer.query.filter(Offer.id.in_(offer_ids)).options(sa_orm.joinedload(Offer.venue))
+    for offer in offers:
+        transactional_mails.send_email_for_each_ongoing_booking(offer)
@@ -13,6 +13,7 @@ import sentry_sdk
 
 from pcapi import settings
 from pcapi.models import db
+from pcapi.models.feature import feature_cache
 from pcapi.utils.blueprint import Blueprint
 from pcapi.utils.health_checker import check_database_connection
 from pcapi.workers.logger import job_extra_description
@@ -43,6 +44,23 @@ def log_worker_error(job: Job, exception_type: type, exception_value: Exception,
     )
 
 
+class FeatureCacheWorker(Worker):
+    """A worker that loads feature flags before forking the process of
+    each job, so that jobs inherit them instead of querying them.
+    """
+
+    def execute_job(self, job: Job, queue: Queue) -> None:
+        try:
+            feature_cache.get()
+        except Exception:  # pylint: disable=broad-except
+            # The job process will load them itself.
+            logger.exception("Could not load feature flags before running job")
+        # Do not share the database connection with the job process.
+        db.session.remove()
+        db.engine.dispose()
+        super().execute_job(job, queue)
+
+
 def log_redis_connection_status() -> None:
     try:
         conn.ping()
@@ -73,6 +91,7 @@ def run_worker(queues: Iterable = ()) -> None:
     log_redis_connection_status()
     with app.app_context():
         log_database_connection_status()
+    feature_cache.disable_listener_in_forked_processes()
 
     while True:
         try:
@@ -85,7 +104,7 @@ def run_worker(queues: Iterable = ()) -> None:
                 db.session.close()
                 db.engine.dispose()
             with Connection(conn):
-                worker = Worker(list(map(Queue, queues)), exception_handlers=[log_worker_error])
+                worker = FeatureCacheWorker(list(map(Queue, queues)), exception_handlers=[log_worker_error])
                 worker.work()
 
         except redis.ConnectionError:
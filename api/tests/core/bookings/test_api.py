@@ -2,6 +2,7 @@ import dataclasses
 from datetime import datetime
 from datetime import timedelta
 import logging
+import os
 import re
 from unittest import mock
 from unittest.mock import patch
@@ -48,6 +49,7 @@ from pcapi.core.providers.repository import get_provider_by_local_class
 from pcapi.core.testing import assert_no_duplicated_queries
 from pcapi.core.testing import assert_num_queries
 from pcapi.core.testing import override_features
+from pcapi.core.testing import override_settings
 import pcapi.core.users.factories as users_factories
 from pcapi.models import api_errors
 from pcapi.models import db
@@ -1777,6 +1779,88 @@ class ArchiveOldBookingsTest:
         assert old_booking.displayAsEnded
 
 
+@pytest.mark.usefixtures("db_session")
+class OfferDailyBookingCountTest:
+    def _get_counts(self):
+        return {
+            (count.offerId, count.ean, count.day): count.bookingCount
+            for count in models.OfferDailyBookingCount.query.all()
+        }
+
+    def test_book_and_cancel(self):
+        beneficiary = users_factories.BeneficiaryGrant18Factory()
+        stock = offers_factories.StockFactory(offer__extraData={"ean": "1234567890123"})
+        today = datetime.utcnow().date()
+
+        booking = api.book_offer(beneficiary=beneficiary, stock_id=stock.id, quantity=1)
+        assert self._get_counts() == {(stock.offerId, "1234567890123", today): 1}
+
+        api.cancel_booking_by_beneficiary(beneficiary, booking)
+        assert self._get_counts() == {(stock.offerId, "1234567890123", today): 0}
+
+        api.mark_as_used_with_uncancelling(booking)
+        assert self._get_counts() == {(stock.offerId, "1234567890123", today): 1}
+
+    def test_count_by_day(self):
+        offer = offers_factories.OfferFactory()
+        today = datetime.utcnow().date()
+        bookings_factories.BookingFactory.create_batch(2, stock__offer=offer)
+        bookings_factories.UsedBookingFactory(stock__offer=offer, dateCreated=datetime.utcnow() - timedelta(days=2))
+        bookings_factories.CancelledBookingFactory(stock__offer=offer)
+        # too old to be counted
+        bookings_factories.BookingFactory(stock__offer=offer, dateCreated=datetime.utcnow() - timedelta(days=40))
+
+        assert self._get_counts() == {
+            (offer.id, None, today): 2,
+            (offer.id, None, today - timedelta(days=2)): 1,
+        }
+
+    def test_expire_bookings(self):
+        booking = bookings_factories.BookingFactory()
+        models.Booking.query.filter_by(id=booking.id).update({"status": BookingStatus.CANCELLED})
+
+        assert self._get_counts() == {(booking.stock.offerId, None, booking.dateCreated.date()): 0}
+
+    def test_recompute(self):
+        booking = bookings_factories.BookingFactory()
+        bookings_factories.CancelledBookingFactory(stock=booking.stock)
+        models.OfferDailyBookingCount.query.delete()
+
+        api.recompute_offer_daily_booking_counts()
+
+        assert self._get_counts() == {(booking.stock.offerId, None, booking.dateCreated.date()): 1}
+
+    def test_delete_old_counts(self):
+        offer = offers_factories.OfferFactory()
+        today = datetime.utcnow().date()
+        bookings_factories.BookingFactory(stock__offer=offer)
+        old_day = today - timedelta(days=40)
+        db.session.add(models.OfferDailyBookingCount(offerId=offer.id, day=old_day, bookingCount=1))
+        db.session.commit()
+
+        api.delete_old_offer_daily_booking_counts()
+
+        assert self._get_counts() == {(offer.id, None, today): 1}
+
+
+class DeleteExpiredBookingsExportsTest:
+    def test_basics(self, tmp_path):
+        exports_dir = tmp_path / "bookings_exports"
+        old_export = exports_dir / "1" / "old" / "reservations_pass_culture.csv"
+        recent_export = exports_dir / "1" / "recent" / "reservations_pass_culture.csv"
+        for path in (old_export, recent_export):
+            path.parent.mkdir(parents=True)
+            path.write_bytes(b"")
+        old_timestamp = (datetime.utcnow() - timedelta(days=8)).timestamp()
+        os.utime(old_export, (old_timestamp, old_timestamp))
+
+        with override_settings(OBJECT_STORAGE_PROVIDER="local", LOCAL_PRIVATE_STORAGE_DIR=tmp_path):
+            api.delete_expired_bookings_exports()
+
+        assert not old_export.exists()
+        assert recent_export.exists()
+
+
 @pytest.mark.usefixtures("db_session")
 class PopBarcodesFromQueueAndCancelWastedExternalBookingTest:
     def test_should_not_pop_and_not_try_to_cancel_external_booking_if_minimum_age_not_reached(self, app):
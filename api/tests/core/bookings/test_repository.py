@@ -1767,6 +1767,26 @@ class GetCsvReportTest:
             pos_cm = headers.index("Statut de la contremarque")
             assert sorted([line[pos_cm] for line in data]) == ["annulé", "confirmé", "remboursé", "validé"]
 
+    def test_iter_csv_report_yields_chunks(self, monkeypatch):
+        pro = users_factories.ProFactory()
+        offerer = offerers_factories.OffererFactory()
+        offerers_factories.UserOffererFactory(user=pro, offerer=offerer)
+        stock = offers_factories.ThingStockFactory(offer__venue__managingOfferer=offerer)
+        booking_date = datetime(2020, 1, 1, 10, 0, 0)
+        bookings_factories.BookingFactory.create_batch(3, stock=stock, dateCreated=booking_date)
+        booking_period = (booking_date - timedelta(days=1), booking_date + timedelta(days=1))
+        monkeypatch.setattr(booking_repository, "EXPORT_CHUNK_SIZE", 2)
+
+        query = booking_repository.get_export_query(user=pro, booking_period=booking_period)
+        chunks = list(booking_repository.iter_csv_report(query))
+
+        # header and 2 bookings, then the last booking
+        assert len(chunks) == 2
+        csv_report = booking_repository.get_export(user=pro, booking_period=booking_period)
+        assert sorted("".join(chunks).splitlines()) == sorted(csv_report.splitlines())
+        headers, *data = csv.reader(StringIO("".join(chunks)), delimiter=";")
+        assert len(data) == 3
+
 
 class GetExcelReportTest:
     def test_should_return_excel_export_according_to_booking_attributes(self):
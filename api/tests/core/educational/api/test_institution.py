@@ -3,8 +3,12 @@ from datetime import datetime
 from freezegun import freeze_time
 import pytest
 
+from pcapi.core.educational.adage_backends.serialize import AdageEducationalInstitution
 import pcapi.core.educational.api.institution as api
 import pcapi.core.educational.factories as educational_factories
+from pcapi.core.educational.institution_directory import institution_directory
+from pcapi.core.testing import assert_num_queries
+from pcapi.core.testing import override_settings
 
 
 pytestmark = pytest.mark.usefixtures("db_session")
@@ -56,3 +60,89 @@ class GetEducationalInstitutionRemainingCreditTest:
         institution = current_year_deposit.educationalInstitution
         res = api.get_current_year_remaining_credit(institution)
         assert res == current_year_deposit.amount
+
+
+class GetAllEducationalInstitutionsTest:
+    def setup_method(self):
+        institution_directory.invalidate()
+
+    def teardown_method(self):
+        institution_directory.invalidate()
+
+    def test_pagination(self):
+        educational_factories.EducationalInstitutionFactory(name="B")
+        educational_factories.EducationalInstitutionFactory(name="A")
+        educational_factories.EducationalInstitutionFactory(name="C")
+        educational_factories.EducationalInstitutionFactory(name="D", isActive=False)
+
+        institutions, total = api.get_all_educational_institutions(page=2, per_page_limit=2)
+
+        assert total == 3
+        assert [institution.name for institution in institutions] == ["C"]
+
+    @override_settings(EDUCATIONAL_INSTITUTIONS_DIRECTORY_TTL=600)
+    def test_directory_is_kept_in_memory(self):
+        educational_factories.EducationalInstitutionFactory(name="A")
+        api.get_all_educational_institutions(page=1, per_page_limit=10)
+
+        with assert_num_queries(0):
+            institutions, total = api.get_all_educational_institutions(page=1, per_page_limit=10)
+
+        assert total == 1
+        assert institutions[0].name == "A"
+
+    @override_settings(EDUCATIONAL_INSTITUTIONS_DIRECTORY_TTL=600)
+    def test_directory_is_invalidated_on_creation(self):
+        educational_factories.EducationalInstitutionFactory(name="A")
+        api.get_all_educational_institutions(page=1, per_page_limit=10)
+
+        adage_institution = AdageEducationalInstitution(
+            uai="0470010E",
+            sigle="COLLEGE",
+            libelle="B",
+            communeLibelle="PARIS",
+            courriel="contact@example.com",
+            telephone="0600000000",
+            codePostal="75000",
+        )
+        api.create_educational_institution_from_adage(adage_institution)
+
+        institutions, total = api.get_all_educational_institutions(page=1, per_page_limit=10)
+        assert total == 2
+        assert [institution.name for institution in institutions] == ["A", "B"]
+
+
+class SearchEducationalInstitutionTest:
+    def test_rank_by_name_similarity(self):
+        educational_factories.EducationalInstitutionFactory(name="Collège Jean Moulin de la ville")
+        best_match = educational_factories.EducationalInstitutionFactory(name="Jean Moulin")
+        educational_factories.EducationalInstitutionFactory(name="Lycée Victor Hugo")
+
+        institutions = api.search_educational_institution(
+            educational_institution_id=None,
+            name="jean moulin",
+            institution_type=None,
+            city=None,
+            postal_code=None,
+            limit=10,
+            uai=None,
+        )
+
+        assert len(institutions) == 2
+        assert institutions[0] == best_match
+
+    def test_ignore_accents(self):
+        institution = educational_factories.EducationalInstitutionFactory(name="Lycée Hélène Boucher", city="Évry")
+        educational_factories.EducationalInstitutionFactory(name="Lycée Victor Hugo")
+
+        institutions = api.search_educational_institution(
+            educational_institution_id=None,
+            name="helene",
+            institution_type="lycee",
+            city="evry",
+            postal_code=None,
+            limit=10,
+            uai=None,
+        )
+
+        assert institutions == [institution]
@@ -140,6 +140,23 @@ class UnindexExpiredOffersTest:
             mock.call([collective_stock.collectiveOfferId]),
         ]
 
+    @override_settings(ALGOLIA_DELETING_COLLECTIVE_OFFERS_CHUNK_SIZE=1)
+    @mock.patch("pcapi.core.search.unindex_collective_offer_ids")
+    def test_run_with_workers(self, mock_unindex_collective_offer_ids) -> None:
+        collective_stock1 = educational_factories.CollectiveStockFactory(
+            bookingLimitDatetime=datetime.datetime(2020, 1, 3, 12, 0)
+        )
+        collective_stock2 = educational_factories.CollectiveStockFactory(
+            bookingLimitDatetime=datetime.datetime(2020, 1, 4, 12, 0)
+        )
+
+        unindex_expired_collective_offers(workers=2)
+
+        assert mock_unindex_collective_offer_ids.mock_calls == [
+            mock.call([collective_stock1.collectiveOfferId]),
+            mock.call([collective_stock2.collectiveOfferId]),
+        ]
+
     @override_settings(ALGOLIA_DELETING_COLLECTIVE_OFFERS_CHUNK_SIZE=2)
     @mock.patch("pcapi.core.search.unindex_collective_offer_template_ids")
     def test_default_run_template(self, mock_unindex_collective_offer_template_ids) -> None:
@@ -0,0 +1,103 @@
+from unittest import mock
+
+import pytest
+
+from pcapi.core.bookings.factories import BookingFactory
+from pcapi.core.external.attributes import debounce
+from pcapi.core.external.attributes.api import update_external_pro
+from pcapi.core.external.attributes.api import update_external_user
+from pcapi.core.testing import override_settings
+from pcapi.core.users import testing as sendinblue_testing
+from pcapi.core.users.factories import BeneficiaryGrant18Factory
+from pcapi.core.users.factories import ProFactory
+from pcapi.notifications.push import testing as batch_testing
+
+
+pytestmark = pytest.mark.usefixtures("db_session")
+
+
+@override_settings(EXTERNAL_ATTRIBUTES_UPDATE_DELAY=60)
+@mock.patch("pcapi.core.external.sendinblue.import_contacts_in_sendinblue")
+class DebounceTest:
+    def test_coalesce_updates_of_user(self, mocked_import):
+        user = BeneficiaryGrant18Factory(
+            notificationSubscriptions={"marketing_push": True, "marketing_email": True},
+        )
+        BookingFactory(user=user)
+
+        update_external_user(user)
+        update_external_user(user)
+        update_external_user(user, skip_batch=True)
+
+        assert batch_testing.requests == []
+        assert sendinblue_testing.sendinblue_requests == []
+
+        stats = debounce.flush_pending_updates(delay=0)
+
+        assert stats.requested_updates == 3
+        assert stats.users == 1
+        assert stats.coalescing_ratio == 3
+        assert len(batch_testing.requests) == 1
+        assert [user_data.user_id for user_data in batch_testing.requests[0]] == [str(user.id)]
+        mocked_import.assert_called_once()
+        users_data = mocked_import.call_args.args[0]
+        assert [user_data.email for user_data in users_data] == [user.email]
+        assert mocked_import.call_args.kwargs["email_blacklist"] is False
+
+    def test_do_not_flush_recent_updates(self, mocked_import):
+        user = BeneficiaryGrant18Factory()
+        update_external_user(user)
+
+        stats = debounce.flush_pending_updates()
+        assert stats.users == 0
+        mocked_import.assert_not_called()
+
+        stats = debounce.flush_pending_updates(delay=0)
+        assert stats.users == 1
+
+    def test_coalesce_updates_of_pro(self, mocked_import):
+        pro = ProFactory()
+
+        update_external_user(pro)
+        update_external_pro(pro.email)
+
+        assert sendinblue_testing.sendinblue_requests == []
+
+        stats = debounce.flush_pending_updates(delay=0)
+
+        assert stats.requested_updates == 2
+        assert stats.pros == 1
+        mocked_import.assert_called_once()
+        assert [user_data.email for user_data in mocked_import.call_args.args[0]] == [pro.email]
+
+    def test_immediate_update(self, mocked_import):
+        user = BeneficiaryGrant18Factory()
+
+        update_external_user(user, immediate=True)
+
+        assert len(sendinblue_testing.sendinblue_requests) == 1
+        stats = debounce.flush_pending_updates(delay=0)
+        assert stats.users == 0
+
+    def test_requeue_sendinblue_updates_on_error(self, mocked_import, app):
+        user = BeneficiaryGrant18Factory()
+        pro = ProFactory()
+        update_external_user(user, skip_batch=True)
+        update_external_pro(pro.email)
+        mocked_import.side_effect = ValueError("Sendinblue is down")
+
+        with override_settings(IS_RUNNING_TESTS=False):  # as on prod: don't catch errors
+            stats = debounce.flush_pending_updates(delay=0)
+
+        assert stats.errors == 2
+        assert app.redis_client.zrange(debounce.PENDING_SENDINBLUE_USERS_KEY, 0, -1) == [str(user.id)]
+        assert app.redis_client.zrange(debounce.PENDING_PROS_KEY, 0, -1) == [pro.email]
+
+        mocked_import.side_effect = None
+        stats = debounce.flush_pending_updates(delay=0)
+
+        assert stats.errors == 0
+        assert stats.users == 1
+        assert stats.pros == 1
+        assert app.redis_client.zcard(debounce.PENDING_SENDINBLUE_USERS_KEY) == 0
+        assert app.redis_client.zcard(debounce.PENDING_PROS_KEY) == 0
@@ -1,6 +1,7 @@
 import csv
 import datetime
 from decimal import Decimal
+import gzip
 import io
 import logging
 import pathlib
@@ -319,6 +320,34 @@ class PriceEventTest:
         assert pricing2.revenue == 3000
         assert pricing3.revenue == 3000  # collective bookings are not included in revenue
 
+    def test_maintain_revenue_accumulator(self):
+        event1 = self._make_individual_event(price=10)
+        venue = event1.booking.venue
+        event2 = self._make_individual_event(venue=venue, price=20)
+        api.price_event(event1)
+        api.price_event(event2)
+
+        accumulator = models.PricingPointRevenue.query.one()
+        assert accumulator.pricingPointId == venue.id
+        assert accumulator.year == datetime.date.today().year
+        assert accumulator.revenue == 3000
+
+        bookings_api.mark_as_unused(event2.booking)
+        db.session.refresh(accumulator)
+        assert accumulator.revenue == 1000
+
+    def test_initialize_revenue_accumulator_from_existing_pricings(self):
+        event1 = self._make_individual_event(price=10)
+        venue = event1.booking.venue
+        event2 = self._make_individual_event(venue=venue, price=20)
+        api.price_event(event1)
+        models.PricingPointRevenue.query.delete()
+
+        pricing2 = api.price_event(event2)
+
+        assert pricing2.revenue == 3000
+        assert models.PricingPointRevenue.query.one().revenue == 3000
+
     def test_price_with_dependent_event(self):
         event1 = self._make_individual_event()
         api.price_event(event1)
@@ -361,10 +390,12 @@ class PriceEventTest:
         queries += 1  # fetch event again with multiple joinedload
         queries += 1  # select existing Pricing (if any)
         queries += 1  # select dependent pricings
-        queries += 1  # calculate revenue
+        queries += 1  # select revenue accumulator
+        queries += 1  # calculate revenue (to initialize accumulator)
         queries += 1  # select all CustomReimbursementRule
         queries += 1  # update status of FinanceEvent
         queries += 1  # insert 1 Pricing
+        queries += 1  # insert revenue accumulator
         queries += 1  # insert 2 PricingLine
         queries += 1  # commit
         with assert_num_queries(queries):
@@ -408,6 +439,42 @@ class PriceEventsTest:
         with assert_num_queries(n_queries):
             api.price_events(min_date=self.few_minutes_ago)
 
+    def test_price_events_of_some_pricing_points(self):
+        event1 = factories.UsedBookingFinanceEventFactory(
+            booking__dateUsed=self.few_minutes_ago,
+            booking__stock__offer__venue__pricing_point="self",
+        )
+        event2 = factories.UsedBookingFinanceEventFactory(
+            booking__dateUsed=self.few_minutes_ago,
+            booking__stock__offer__venue__pricing_point="self",
+        )
+        window = (self.few_minutes_ago, datetime.datetime.utcnow())
+
+        api._price_events(window, batch_size=10, pricing_point_ids=[event1.pricingPointId])
+
+        assert event1.status == models.FinanceEventStatus.PRICED
+        assert event2.status == models.FinanceEventStatus.READY
+        assert event2.pricings == []
+
+    def test_partition_pricing_points(self):
+        venue1 = offerers_factories.VenueFactory(pricing_point="self")
+        venue2 = offerers_factories.VenueFactory(pricing_point="self")
+        venue3 = offerers_factories.VenueFactory(pricing_point="self")
+        for venue, count in ((venue1, 3), (venue2, 1), (venue3, 1)):
+            factories.UsedBookingFinanceEventFactory.create_batch(
+                count,
+                booking__dateUsed=self.few_minutes_ago,
+                booking__stock__offer__venue=venue,
+            )
+        window = (self.few_minutes_ago, datetime.datetime.utcnow())
+
+        partitions = api._partition_pricing_points(window, 2)
+
+        assert partitions[0] == [venue1.id]
+        assert sorted(partitions[1]) == sorted([venue2.id, venue3.id])
+        partitions = api._partition_pricing_points(window, 5)
+        assert sorted(partitions) == sorted([[venue1.id], [venue2.id], [venue3.id]])
+
 
 class AddEventTest:
     def test_used(self):
@@ -560,6 +627,27 @@ class CancelLatestEventTest:
         assert event2.status == models.FinanceEventStatus.READY
         assert not event2.pricings
 
+    def test_update_revenue_accumulator(self):
+        event1 = factories.UsedBookingFinanceEventFactory(
+            booking__amount=10,
+            booking__stock__offer__venue__pricing_point="self",
+        )
+        event2 = factories.UsedBookingFinanceEventFactory(
+            booking__amount=20,
+            booking__stock__offer__venue__pricing_point=event1.pricingPoint,
+        )
+        api.price_event(event1)
+        api.price_event(event2)
+        accumulator = models.PricingPointRevenue.query.one()
+        assert accumulator.revenue == 3000
+
+        api.cancel_latest_event(event1.booking)
+
+        db.session.refresh(accumulator)
+        # Both pricings have been removed from the revenue: the
+        # pricing of `event2` has been deleted, as a dependent pricing.
+        assert accumulator.revenue == 0
+
     def test_cannot_delete_dependent_pricings_that_are_not_deletable(self):
         event1 = factories.UsedBookingFinanceEventFactory(
             booking__stock__offer__venue__pricing_point="self",
@@ -826,6 +914,35 @@ class GetRevenuePeriodTest:
         assert period == (start, end)
 
 
+class CheckPricingPointRevenuesTest:
+    def test_basics(self):
+        event = factories.UsedBookingFinanceEventFactory(
+            booking__amount=10,
+            booking__stock__offer__venue__pricing_point="self",
+        )
+        api.price_event(event)
+        accumulator = models.PricingPointRevenue.query.one()
+        other_accumulator = models.PricingPointRevenue(
+            pricingPointId=event.pricingPointId,
+            year=accumulator.year - 1,
+            revenue=0,
+        )
+        db.session.add(other_accumulator)
+        accumulator.revenue = 12345
+        db.session.commit()
+
+        inconsistent = api.check_pricing_point_revenues()
+        assert inconsistent == [accumulator]
+        assert accumulator.revenue == 12345
+
+        inconsistent = api.check_pricing_point_revenues(fix=True)
+        assert inconsistent == [accumulator]
+        assert accumulator.revenue == 1000
+        assert other_accumulator.revenue == 0
+
+        assert api.check_pricing_point_revenues() == []
+
+
 def test_get_next_cashflow_batch_label():
     label = api._get_next_cashflow_batch_label()
     assert label == "VIR1"
@@ -1187,6 +1304,18 @@ def test_generate_reimbursement_points_file():
     }
 
 
+@clean_temporary_files
+def test_write_csv_with_gzip():
+    rows = ((i, f"row {i}") for i in range(3))
+
+    path = api._write_csv("test", ["id", "label"], rows, row_formatter=lambda row: (row[0] * 10, row[1]), use_gzip=True)
+
+    assert path.name.endswith(".csv.gz")
+    with gzip.open(path, "rt", encoding="utf-8") as fp:
+        reader = csv.reader(fp, quoting=csv.QUOTE_NONNUMERIC)
+        assert list(reader) == [["id", "label"], [0, "row 0"], [10, "row 1"], [20, "row 2"]]
+
+
 @clean_temporary_files
 def test_generate_payments_file():
     used_date = datetime.datetime(2020, 1, 2)
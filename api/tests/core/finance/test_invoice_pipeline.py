@@ -0,0 +1,95 @@
+from unittest import mock
+
+import pytest
+
+from pcapi.core.finance import factories
+from pcapi.core.finance import invoice_pipeline
+from pcapi.core.finance import models
+from pcapi.core.mails import testing as mails_testing
+import pcapi.core.offerers.factories as offerers_factories
+from pcapi.core.testing import override_settings
+
+
+pytestmark = pytest.mark.usefixtures("db_session")
+
+
+def make_batch(n_reimbursement_points):
+    batch = factories.CashflowBatchFactory()
+    for _ in range(n_reimbursement_points):
+        reimbursement_point = offerers_factories.VenueFactory()
+        factories.BankInformationFactory(venue=reimbursement_point)
+        factories.CashflowFactory(
+            batch=batch,
+            reimbursementPoint=reimbursement_point,
+            status=models.CashflowStatus.UNDER_REVIEW,
+        )
+    return batch
+
+
+@mock.patch("pcapi.core.finance.invoice_pipeline._render_pdf", lambda html: (b"PDF", 0.1))
+@mock.patch("pcapi.core.finance.invoice_pipeline.store_public_object")
+class GenerateAndStoreInvoicesTest:
+    def test_basics(self, mocked_store):
+        batch = make_batch(3)
+
+        stats = invoice_pipeline.generate_and_store_invoices(batch, pdf_workers=1, upload_workers=2, max_in_flight=1)
+
+        invoices = models.Invoice.query.all()
+        assert len(invoices) == 3
+        assert {call.kwargs["object_id"] for call in mocked_store.call_args_list} == {
+            invoice.storage_object_id for invoice in invoices
+        }
+        assert len(mails_testing.outbox) == 3
+        assert stats.total == stats.done == 3
+        assert stats.errors == 0
+        assert stats.stages["pdf"].count == 3
+        assert stats.stages["upload"].count == 3
+        assert invoice_pipeline.get_pending_invoice_ids(batch) == set()
+
+    @mock.patch("time.sleep")
+    def test_retry_upload(self, _mocked_sleep, mocked_store):
+        batch = make_batch(1)
+        mocked_store.side_effect = [ConnectionError(), None]
+
+        stats = invoice_pipeline.generate_and_store_invoices(batch, pdf_workers=1)
+
+        assert mocked_store.call_count == 2
+        assert stats.upload_retries == 1
+        assert len(mails_testing.outbox) == 1
+
+    @mock.patch("time.sleep")
+    def test_upload_error(self, _mocked_sleep, mocked_store):
+        batch = make_batch(2)
+        mocked_store.side_effect = ConnectionError()
+
+        with override_settings(IS_RUNNING_TESTS=False):  # as on prod: don't catch errors
+            stats = invoice_pipeline.generate_and_store_invoices(batch, pdf_workers=1, upload_max_attempts=2)
+
+        assert mocked_store.call_count == 4
+        assert stats.errors == 2
+        assert stats.done == 2
+        # Invoices have been committed, but not sent.
+        invoices = models.Invoice.query.all()
+        assert len(invoices) == 2
+        assert mails_testing.outbox == []
+        assert invoice_pipeline.get_pending_invoice_ids(batch) == {invoice.id for invoice in invoices}
+
+    @mock.patch("time.sleep")
+    def test_resume_pending_invoices(self, _mocked_sleep, mocked_store):
+        batch = make_batch(2)
+        mocked_store.side_effect = [ConnectionError(), None]
+        with override_settings(IS_RUNNING_TESTS=False):  # as on prod: don't catch errors
+            invoice_pipeline.generate_and_store_invoices(batch, pdf_workers=1, upload_workers=1, upload_max_attempts=1)
+        assert len(mails_testing.outbox) == 1
+        failed_invoice_ids = invoice_pipeline.get_pending_invoice_ids(batch)
+        assert len(failed_invoice_ids) == 1
+        mocked_store.reset_mock(side_effect=True)
+
+        stats = invoice_pipeline.generate_and_store_invoices(batch, pdf_workers=1)
+
+        failed_invoice = models.Invoice.query.get(failed_invoice_ids.pop())
+        assert models.Invoice.query.count() == 2
+        assert [call.kwargs["object_id"] for call in mocked_store.call_args_list] == [failed_invoice.storage_object_id]
+        assert len(mails_testing.outbox) == 2
+        assert stats.total == stats.done == 1
+        assert invoice_pipeline.get_pending_invoice_ids(batch) == set()
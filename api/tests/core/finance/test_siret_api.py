@@ -6,6 +6,7 @@ from pcapi.core.finance import models
 from pcapi.core.finance import siret_api
 import pcapi.core.offerers.factories as offerers_factories
 import pcapi.core.users.factories as users_factories
+from pcapi.models import db
 
 from tests.conftest import clean_database
 
@@ -22,6 +23,8 @@ class DeleteSiretTest:
                 booking=finance_event.booking, pricingPoint=venue, status=status, event=finance_event
             )
         assert models.Pricing.query.count() == 5
+        db.session.add(models.PricingPointRevenue(pricingPointId=venue.id, year=2023, revenue=1000))
+        db.session.commit()
 
         siret_api.remove_siret(venue, comment="no SIRET because reasons", apply_changes=True)
 
@@ -30,6 +33,7 @@ class DeleteSiretTest:
         assert venue.current_pricing_point_id is None
         assert dependent_venue.current_pricing_point_id is None
         assert models.Pricing.query.count() == 4
+        assert models.PricingPointRevenue.query.count() == 0
         left_statuses = {status for status, in models.Pricing.query.with_entities(models.Pricing.status)}
         assert left_statuses == initial_statuses - {models.PricingStatus.VALIDATED}
 
@@ -99,3 +103,24 @@ class DeleteSiretTest:
         with pytest.raises(siret_api.CheckError) as err:
             siret_api.remove_siret(venue, comment="xxx", new_pricing_point_id=new_pricing_point.id, apply_changes=True)
         assert str(err.value) == "Le nouveau point de valorisation doit être un lieu avec SIRET sur la même structure"
+
+
+class MoveSiretTest:
+    @clean_database
+    def test_delete_revenues_of_pricing_points(self):
+        offerer = offerers_factories.OffererFactory()
+        siret = offerer.siren + "00001"
+        source = offerers_factories.VenueFactory(siret=siret, managingOfferer=offerer, pricing_point="self")
+        target = offerers_factories.VenueWithoutSiretFactory(managingOfferer=offerer)
+        other_venue = offerers_factories.VenueFactory(pricing_point="self")
+        factories.PricingFactory(pricingPoint=source)
+        for venue in (source, target, other_venue):
+            db.session.add(models.PricingPointRevenue(pricingPointId=venue.id, year=2023, revenue=1000))
+        db.session.commit()
+
+        siret_api.move_siret(source, target, siret, comment="xxx", apply_changes=True)
+
+        assert target.siret == siret
+        assert models.Pricing.query.one().pricingPointId == target.id
+        revenue = models.PricingPointRevenue.query.one()
+        assert revenue.pricingPointId == other_venue.id
@@ -1,3 +1,5 @@
+import datetime
+import io
 from unittest.mock import MagicMock
 from unittest.mock import patch
 
@@ -7,7 +9,11 @@ import pytest
 from pcapi.core.object_storage import BACKENDS_MAPPING
 from pcapi.core.object_storage import _check_backend_setting
 from pcapi.core.object_storage import _check_backends_module_paths
+from pcapi.core.object_storage import delete_private_object
 from pcapi.core.object_storage import delete_public_object
+from pcapi.core.object_storage import list_private_objects
+from pcapi.core.object_storage import open_private_object
+from pcapi.core.object_storage import store_private_file
 from pcapi.core.object_storage import store_public_object
 import pcapi.core.offerers.factories as offerers_factories
 import pcapi.core.offers.factories as offers_factories
@@ -36,6 +42,35 @@ class StorePublicObjectTest:
         mock_gcp_store_public_object.assert_called_once_with("bucket", "object_id", b"mouette", "image/jpeg")
 
 
+class PrivateObjectsTest:
+    @override_settings(OBJECT_STORAGE_PROVIDER="local")
+    def test_local_backend(self, tmp_path):
+        with override_settings(LOCAL_PRIVATE_STORAGE_DIR=tmp_path):
+            store_private_file("bucket", "folder/object_id", io.BytesIO(b"mouette"), "text/csv")
+
+            with open_private_object("bucket", "folder/object_id") as file:
+                assert file.read() == b"mouette"
+            [(object_id, date_created)] = list_private_objects("bucket")
+            assert object_id == "folder/object_id"
+            assert date_created <= datetime.datetime.utcnow()
+
+            delete_private_object("bucket", "folder/object_id")
+            assert list(list_private_objects("bucket")) == []
+            with pytest.raises(FileNotFoundError):
+                open_private_object("bucket", "folder/object_id")
+
+    @override_settings(OBJECT_STORAGE_PROVIDER="GCP,GCP_ALTERNATE")
+    @patch("pcapi.core.object_storage.backends.gcp.GCPAlternateBackend.store_private_file")
+    @patch("pcapi.core.object_storage.backends.gcp.GCPBackend.store_private_file")
+    def test_single_gcp_backend_call(self, mock_gcp_store_private_file, mock_gcp_alternate_store_private_file):
+        file = io.BytesIO(b"mouette")
+
+        store_private_file("bucket", "object_id", file, "text/csv")
+
+        mock_gcp_store_private_file.assert_called_once_with("bucket", "object_id", file, "text/csv")
+        mock_gcp_alternate_store_private_file.assert_not_called()
+
+
 class CheckBackendSettingTest:
     @override_settings(OBJECT_STORAGE_PROVIDER="")
     def test_empty_setting(self):
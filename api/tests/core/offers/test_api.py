@@ -36,6 +36,7 @@ from pcapi.core.offers.exceptions import NotUpdateProductOrOffers
 from pcapi.core.offers.exceptions import ProductNotFound
 import pcapi.core.providers.factories as providers_factories
 import pcapi.core.providers.repository as providers_repository
+import pcapi.core.search.testing as search_testing
 from pcapi.core.testing import override_features
 from pcapi.core.testing import override_settings
 import pcapi.core.users.factories as users_factories
@@ -1138,6 +1139,70 @@ class BatchUpdateOffersTest:
         assert second_record.extra["venue_id"] == [offer1.venueId, offer2.venueId]
 
 
+@pytest.mark.usefixtures("db_session")
+class StreamBatchUpdateOffersTest:
+    @mock.patch("pcapi.core.search.async_index_offer_ids")
+    def test_activate_by_slices(self, mocked_async_index_offer_ids, caplog):
+        offer1 = factories.OfferFactory(isActive=False)
+        offer2 = factories.OfferFactory(isActive=False)
+        offer3 = factories.OfferFactory(isActive=False)
+        other_offer = factories.OfferFactory(isActive=False)
+        rejected_offer = factories.OfferFactory(isActive=False, validation=models.OfferValidationStatus.REJECTED)
+
+        query = models.Offer.query.filter(
+            models.Offer.id.in_({offer1.id, offer2.id, offer3.id, rejected_offer.id})
+        ).order_by(models.Offer.id.desc())
+        with caplog.at_level(logging.INFO):
+            nb_offers = api.stream_batch_update_offers(query, {"isActive": True}, slice_size=2)
+
+        assert nb_offers == 3
+        assert models.Offer.query.get(offer1.id).isActive
+        assert models.Offer.query.get(offer2.id).isActive
+        assert models.Offer.query.get(offer3.id).isActive
+        assert not models.Offer.query.get(other_offer.id).isActive
+        assert not models.Offer.query.get(rejected_offer.id).isActive
+        assert [call.args[0] for call in mocked_async_index_offer_ids.call_args_list] == [
+            [offer1.id, offer2.id],
+            [offer3.id],
+        ]
+
+        activation_records = [record for record in caplog.records if record.message == "Offers has been activated"]
+        assert [record.extra["offer_ids"] for record in activation_records] == [[offer1.id, offer2.id], [offer3.id]]
+        assert caplog.records[-1].message == "Batch update of offers"
+        assert caplog.records[-1].extra == {
+            "nb_offers": 3,
+            "updated_fields": {"isActive": True},
+            "venue_ids": sorted({offer1.venueId, offer2.venueId, offer3.venueId}),
+        }
+
+    @mock.patch("pcapi.core.search.async_index_offer_ids")
+    def test_no_matching_offer(self, mocked_async_index_offer_ids):
+        factories.OfferFactory(validation=models.OfferValidationStatus.PENDING)
+
+        nb_offers = api.stream_batch_update_offers(models.Offer.query, {"isActive": False})
+
+        assert nb_offers == 0
+        assert models.Offer.query.one().isActive
+        mocked_async_index_offer_ids.assert_not_called()
+
+    @mock.patch("pcapi.workers.user_emails_job.send_withdrawal_updated_emails_job.delay")
+    def test_send_withdrawal_emails_by_slices(self, mocked_send_emails_job):
+        offer1 = factories.OfferFactory()
+        offer2 = factories.OfferFactory(venue=offer1.venue)
+        offer3 = factories.OfferFactory(venue=offer1.venue)
+
+        query = models.Offer.query.filter_by(venueId=offer1.venueId)
+        api.stream_batch_update_offers(
+            query, {"withdrawalDetails": "Au guichet"}, send_email_notification=True, slice_size=2
+        )
+
+        assert mocked_send_emails_job.mock_calls == [
+            mock.call([offer1.id, offer2.id]),
+            mock.call([offer3.id]),
+        ]
+        assert {offer.withdrawalDetails for offer in models.Offer.query} == {"Au guichet"}
+
+
 @pytest.mark.usefixtures("db_session")
 class OfferExpenseDomainsTest:
     def test_offer_expense_domains(self):
@@ -1836,6 +1901,27 @@ class ResolveOfferValidationRuleTest:
 
         assert api.set_offer_status_based_on_fraud_criteria(collective_offer) == expected_status
 
+    def test_validate_several_offers(self):
+        offer_to_approve = factories.OfferFactory(name="offer with a nice name")
+        offer_to_flag = factories.OfferFactory(name="offer with a verboten name")
+        collective_offer_to_flag = educational_factories.CollectiveOfferFactory(name="verboten")
+        offer_rule = factories.OfferValidationSubRuleFactory().validationRule
+        collective_offer_rule = factories.OfferValidationSubRuleFactory(
+            model=models.OfferValidationModel.COLLECTIVE_OFFER
+        ).validationRule
+
+        statuses = api.set_offers_status_based_on_fraud_criteria(
+            [offer_to_approve, offer_to_flag, collective_offer_to_flag]
+        )
+
+        assert statuses == [
+            models.OfferValidationStatus.APPROVED,
+            models.OfferValidationStatus.PENDING,
+            models.OfferValidationStatus.PENDING,
+        ]
+        assert offer_to_flag.flaggingValidationRules == [offer_rule]
+        assert collective_offer_to_flag.flaggingValidationRules == [collective_offer_rule]
+
 
 @pytest.mark.usefixtures("db_session")
 class LoadProductByEan:
@@ -1902,6 +1988,59 @@ class UnindexExpiredOffersTest:
             mock.call([stock1.offerId]),
         ]
 
+    @override_settings(ALGOLIA_DELETING_OFFERS_CHUNK_SIZE=1)
+    @mock.patch("pcapi.core.search.unindex_offer_ids")
+    def test_run_with_workers(self, mock_unindex_offer_ids):
+        stock1 = factories.StockFactory(bookingLimitDatetime=datetime(2020, 1, 3, 12, 0))
+        stock2 = factories.StockFactory(bookingLimitDatetime=datetime(2020, 1, 3, 12, 0))
+        stock3 = factories.StockFactory(bookingLimitDatetime=datetime(2020, 1, 4, 12, 0))
+
+        api.unindex_expired_offers(workers=2)
+
+        assert mock_unindex_offer_ids.mock_calls == [
+            mock.call([stock1.offerId], reindex_venues=False),
+            mock.call([stock2.offerId], reindex_venues=False),
+            mock.call([stock3.offerId], reindex_venues=False),
+        ]
+
+    @override_settings(ALGOLIA_DELETING_OFFERS_CHUNK_SIZE=1)
+    def test_run_with_workers_and_search_backend(self):
+        stocks = [factories.StockFactory(bookingLimitDatetime=datetime(2020, 1, 3, 12, 0)) for _ in range(3)]
+        for stock in stocks:
+            search_testing.search_store["offers"][stock.offerId] = {"objectID": stock.offerId}
+
+        api.unindex_expired_offers(workers=2)
+
+        assert search_testing.search_store["offers"] == {}
+
+    @override_settings(ALGOLIA_DELETING_OFFERS_CHUNK_SIZE=1)
+    @mock.patch("pcapi.core.search.unindex_offer_ids")
+    def test_resume_from_checkpoint(self, mock_unindex_offer_ids, app):
+        stock1 = factories.StockFactory(bookingLimitDatetime=datetime(2020, 1, 3, 12, 0))
+        stock2 = factories.StockFactory(bookingLimitDatetime=datetime(2020, 1, 4, 12, 0))
+        checkpoint_key = search._get_unindexation_checkpoint_key("expired_offers")
+        app.redis_client.set(checkpoint_key, f"2020-01-03T00:00:00|2020-01-05T00:00:00:{stock1.offerId}")
+
+        api.unindex_expired_offers()
+
+        assert mock_unindex_offer_ids.mock_calls == [mock.call([stock2.offerId])]
+        assert not app.redis_client.exists(checkpoint_key)
+
+    @override_settings(ALGOLIA_DELETING_OFFERS_CHUNK_SIZE=1)
+    @mock.patch("pcapi.core.search.unindex_offer_ids")
+    def test_ignore_checkpoint_of_another_interval(self, mock_unindex_offer_ids, app):
+        stock1 = factories.StockFactory(bookingLimitDatetime=datetime(2020, 1, 3, 12, 0))
+        stock2 = factories.StockFactory(bookingLimitDatetime=datetime(2020, 1, 4, 12, 0))
+        checkpoint_key = search._get_unindexation_checkpoint_key("expired_offers")
+        app.redis_client.set(checkpoint_key, f"2020-01-02T00:00:00|2020-01-04T00:00:00:{stock1.offerId}")
+
+        api.unindex_expired_offers()
+
+        assert mock_unindex_offer_ids.mock_calls == [
+            mock.call([stock1.offerId]),
+            mock.call([stock2.offerId]),
+        ]
+
 
 @pytest.mark.usefixtures("db_session")
 class WhitelistExistingProductTest:
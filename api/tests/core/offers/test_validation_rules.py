@@ -0,0 +1,100 @@
+import logging
+
+from flask import current_app
+import pytest
+
+import pcapi.core.educational.factories as educational_factories
+from pcapi.core.offers import factories
+from pcapi.core.offers import models
+from pcapi.core.offers import validation_rules
+from pcapi.core.testing import assert_num_queries
+from pcapi.core.testing import override_settings
+from pcapi.models import db
+
+
+pytestmark = pytest.mark.usefixtures("db_session")
+
+
+@pytest.fixture(name="empty_cache", autouse=True)
+def empty_cache_fixture():
+    validation_rules.compiled_rules_cache.invalidate()
+    yield
+    validation_rules.compiled_rules_cache.invalidate()
+
+
+def _update_comparated(sub_rule, comparated):
+    sub_rule.comparated = {"comparated": comparated}
+    db.session.commit()
+
+
+class GetFlaggingRuleIdsTest:
+    def test_evaluate_sub_rules(self):
+        offer = factories.OfferFactory(name="Une offre verboten", venue__name="Lieu suspect")
+        rule = factories.OfferValidationRuleFactory()
+        factories.OfferValidationSubRuleFactory(validationRule=rule)  # name contains "verboten"
+        factories.OfferValidationSubRuleFactory(
+            validationRule=rule,
+            model=models.OfferValidationModel.VENUE,
+            attribute=models.OfferValidationAttribute.NAME,
+            operator=models.OfferValidationRuleOperator.CONTAINS,
+            comparated={"comparated": ["suspect"]},
+        )
+        factories.OfferValidationSubRuleFactory(
+            model=models.OfferValidationModel.VENUE,
+            attribute=models.OfferValidationAttribute.NAME,
+            operator=models.OfferValidationRuleOperator.CONTAINS,
+            comparated={"comparated": ["zzz-autre-lieu"]},
+        )
+        collective_rule = factories.OfferValidationSubRuleFactory(
+            model=models.OfferValidationModel.COLLECTIVE_OFFER
+        ).validationRule
+
+        assert validation_rules.get_flagging_rule_ids(offer) == [rule.id]
+        collective_offer = educational_factories.CollectiveOfferFactory(name="verboten")
+        assert validation_rules.get_flagging_rule_ids(collective_offer) == [collective_rule.id]
+
+    @override_settings(OFFER_VALIDATION_RULES_CACHE_TTL=600)
+    def test_cache_and_invalidate(self):
+        offer = factories.OfferFactory(name="Une offre verboten")
+        sub_rule = factories.OfferValidationSubRuleFactory()
+        rule_id = sub_rule.validationRuleId
+
+        assert validation_rules.get_flagging_rule_ids(offer) == [rule_id]
+        _update_comparated(sub_rule, ["interdit"])
+        with assert_num_queries(0):
+            assert validation_rules.get_flagging_rule_ids(offer) == [rule_id]
+
+        validation_rules.invalidate_offer_validation_rules_cache()
+        assert validation_rules.get_flagging_rule_ids(offer) == []
+
+    @override_settings(OFFER_VALIDATION_RULES_CACHE_TTL=600)
+    def test_invalidated_from_another_process(self):
+        offer = factories.OfferFactory(name="Une offre verboten")
+        sub_rule = factories.OfferValidationSubRuleFactory()
+
+        assert validation_rules.get_flagging_rule_ids(offer) == [sub_rule.validationRuleId]
+        _update_comparated(sub_rule, ["interdit"])
+        # Another process has edited the rule.
+        current_app.redis_client.incr(validation_rules.RULES_VERSION_KEY)
+
+        assert validation_rules.get_flagging_rule_ids(offer) == []
+
+
+class GetFlaggingRuleIdsOfOffersTest:
+    def test_evaluate_batch(self, caplog):
+        offer1 = factories.OfferFactory(name="Une offre verboten")
+        offer2 = factories.OfferFactory(name="Une offre tout à fait correcte")
+        offer3 = factories.OfferFactory(name="Une offre suspicious")
+        sub_rule = factories.OfferValidationSubRuleFactory()
+        rule_id = sub_rule.validationRuleId
+
+        with caplog.at_level(logging.INFO):
+            result = validation_rules.get_flagging_rule_ids_of_offers([offer1, offer2, offer3])
+
+        assert result == [[rule_id], [], [rule_id]]
+        assert caplog.records[-1].message == "Evaluated offer validation rules"
+        assert caplog.records[-1].extra["offers_count"] == 3
+        [rule_stats] = caplog.records[-1].extra["rules"]
+        assert rule_stats["rule_id"] == rule_id
+        assert rule_stats["flagged_offers"] == 2
+        assert rule_stats["duration"] >= 0
@@ -1,5 +1,6 @@
 import pytest
 
+from pcapi.core.providers import titelive_gtl
 from pcapi.core.providers.titelive_gtl import get_gtl
 
 
@@ -56,3 +57,44 @@ def test_get_gtl_not_found():
     non_existing_gtl_id = "03040202"
     gtl = get_gtl(non_existing_gtl_id)
     assert gtl is None
+
+
+def test_get_gtl_with_invalid_id():
+    assert get_gtl("é") is None
+    assert get_gtl("99999999") is None
+
+
+def test_write_and_read_gtl_table(tmp_path):
+    gtls = {
+        "13010000": {
+            "label": "Dictionnaires de français",
+            "level_01_code": "13",
+            "level_01_label": "Dictionnaires / Encyclopédies / Documentation",
+            "level_02_code": "01",
+            "level_02_label": "Dictionnaires de français",
+            "level_03_code": "00",
+            "level_03_label": None,
+            "level_04_code": "00",
+            "level_04_label": None,
+        },
+        "13000000": {
+            "label": "Dictionnaires / Encyclopédies / Documentation",
+            "level_01_code": "13",
+            "level_01_label": "Dictionnaires / Encyclopédies / Documentation",
+            "level_02_code": "00",
+            "level_02_label": None,
+            "level_03_code": "00",
+            "level_03_label": None,
+            "level_04_code": "00",
+            "level_04_label": None,
+        },
+    }
+    path = tmp_path / "gtl.bin"
+
+    titelive_gtl.write_gtl_table(gtls, path)
+    table = titelive_gtl.GtlTable(path)
+
+    assert list(table) == ["13000000", "13010000"]
+    assert len(table) == 2
+    assert dict(table) == gtls
+    assert table.get("13020000") is None
@@ -31,8 +31,8 @@ def make_booked_offer() -> offers_models.Offer:
     offer = make_bookable_offer()
     offers_factories.StockFactory(offer=offer)
     now = datetime.datetime.utcnow()
-    ago_30_days = now - datetime.timedelta(days=30, hours=-1)
-    ago_31_days = now - datetime.timedelta(days=30, hours=1)
+    ago_30_days = now - datetime.timedelta(days=29)
+    ago_31_days = now - datetime.timedelta(days=31)
     bookings = []
     for stock, (status, date) in zip(
         itertools.cycle(offer.stocks),
@@ -333,6 +333,22 @@ class UpdateProductBookingCountTest:
         with assert_no_duplicated_queries():
             search.update_products_last_30_days_booking_count()
 
+    def test_count_bookings_of_all_offers_of_ean(self):
+        product = offers_factories.ProductFactory(extraData={"ean": "1234567890987"})
+        offer1 = offers_factories.OfferFactory(product=product)
+        offer2 = offers_factories.OfferFactory(product=product)
+        bookings_factories.BookingFactory.create_batch(2, stock__offer=offer1)
+        bookings_factories.BookingFactory(stock__offer=offer2)
+        bookings_factories.CancelledBookingFactory(stock__offer=offer2)
+        bookings_factories.BookingFactory(
+            stock__offer=offer2, dateCreated=datetime.datetime.utcnow() - datetime.timedelta(days=31)
+        )
+
+        updated_eans = search.update_product_last_30_days_bookings()
+
+        assert updated_eans == ["1234567890987"]
+        assert product.last_30_days_booking == 3
+
 
 class ReadProductBookingCountTest:
     def test_is_reindexed(self):
@@ -1,8 +1,11 @@
 import dataclasses
 import datetime
+import decimal
+from unittest.mock import patch
 
 import freezegun
 import pytest
+import redis
 import requests_mock
 
 import pcapi.core.educational.factories as educational_factories
@@ -117,6 +120,45 @@ def test_pop_functions(pop_function_name, from_error_queue, queue):
     assert backend.redis_client.llen(queue) == 0
 
 
+def test_pop_many_ids_from_queue():
+    backend = get_backend()
+    queue = algolia.REDIS_OFFER_IDS_NAME
+    backend.redis_client.lpush(queue, *range(2500))
+
+    with backend.pop_offer_ids_from_queue(count=2100) as ids:
+        assert ids == set(range(2100))
+
+    assert backend.redis_client.lrange(queue, 0, -1) == [str(i) for i in range(2499, 2099, -1)]
+
+
+def test_move_ids_keeps_rpoplpush_order():
+    backend = get_backend()
+    backend.redis_client.lpush("source", 1, 2, 3, 4)
+    backend.redis_client.lpush("destination", 10)
+
+    moved = backend._move_ids("source", "destination", 3)
+
+    assert moved == ["3", "2", "1"]
+    assert backend.redis_client.lrange("source", 0, -1) == ["4"]
+    assert backend.redis_client.lrange("destination", 0, -1) == ["3", "2", "1", "10"]
+
+
+def test_pop_ids_from_queue_without_lua_scripting():
+    backend = get_backend()
+    queue = algolia.REDIS_OFFER_IDS_NAME
+    backend.redis_client.lpush(queue, 1, 2, 3)
+
+    with patch.object(
+        backend.redis_client,
+        "register_script",
+        side_effect=redis.exceptions.ResponseError("unknown command 'evalsha'"),
+    ):
+        with backend.pop_offer_ids_from_queue(count=2) as ids:
+            assert ids == {1, 2}
+
+    assert backend.redis_client.lrange(queue, 0, -1) == ["3"]
+
+
 def test_count_offers_to_index_from_queue(app):
     backend = get_backend()
     assert backend.count_offers_to_index_from_queue() == 0
@@ -153,6 +195,45 @@ def test_index_offers(app):
     assert backend.check_offer_is_indexed(offer)
 
 
+def test_index_offers_skips_unchanged_documents(app):
+    backend = get_backend()
+    offer = offers_factories.StockFactory().offer
+    other_offer = offers_factories.StockFactory().offer
+    with requests_mock.Mocker() as mock:
+        posted = mock.post("https://dummy-app-id.algolia.net/1/indexes/offers/batch", json={})
+        backend.index_offers([offer, other_offer], {})
+        assert posted.call_count == 1
+
+        # Nothing has changed: nothing is sent.
+        backend.index_offers([offer, other_offer], {})
+        assert posted.call_count == 1
+
+        # Only the updated offer is sent.
+        offer.name = "New name"
+        backend.index_offers([offer, other_offer], {})
+        assert posted.call_count == 2
+        posted_json = posted.last_request.json()
+        assert [request["body"]["objectID"] for request in posted_json["requests"]] == [offer.id]
+
+        # Unless we force it.
+        backend.index_offers([offer, other_offer], {}, force=True)
+        assert posted.call_count == 3
+        assert len(posted.last_request.json()["requests"]) == 2
+
+    counters = app.redis_client.hgetall(algolia.REDIS_HASH_OFFERS_INDEXATION_COUNTERS_NAME)
+    assert counters == {"pushed": "5", "skipped": "3"}
+
+
+def test_get_document_hash():
+    document = {"objectID": 1, "offer": {"name": "Livre", "prices": [decimal.Decimal("10.10")]}}
+    same_document = {"offer": {"prices": [decimal.Decimal("10.10")], "name": "Livre"}, "objectID": 1}
+    other_document = {"objectID": 1, "offer": {"name": "Livre", "prices": [decimal.Decimal("10.20")]}}
+
+    assert algolia.get_document_hash(document) == algolia.get_document_hash(same_document)
+    assert algolia.get_document_hash(document) != algolia.get_document_hash(other_document)
+    assert len(algolia.get_document_hash(document)) == 16
+
+
 def test_unindex_offer_ids(app):
     backend = get_backend()
     app.redis_client.hset("indexed_offers", "1", "")
@@ -0,0 +1,116 @@
+from unittest import mock
+
+import pytest
+
+import pcapi.core.educational.factories as educational_factories
+import pcapi.core.offers.factories as offers_factories
+from pcapi.core.search import full_reindexation
+import pcapi.core.search.testing as search_testing
+from pcapi.core.testing import override_settings
+
+
+pytestmark = pytest.mark.usefixtures("db_session")
+
+
+def test_plan_ranges():
+    plan = full_reindexation.Plan(start=10, end=34, range_size=10)
+
+    assert plan.ranges == [
+        full_reindexation.IdRange(10, 19),
+        full_reindexation.IdRange(20, 29),
+        full_reindexation.IdRange(30, 34),
+    ]
+
+
+class ReindexAllTest:
+    def test_reindex_offers(self, app):
+        bookable_offers = [offers_factories.StockFactory().offer for _ in range(3)]
+        unbookable_offer = offers_factories.OfferFactory()
+        inactive_offer = offers_factories.StockFactory(offer__isActive=False).offer
+
+        stats = full_reindexation.reindex_all("offers", processes=1, range_size=2)
+
+        assert set(search_testing.search_store["offers"]) == {offer.id for offer in bookable_offers}
+        assert unbookable_offer.id not in search_testing.search_store["offers"]
+        assert inactive_offer.id not in search_testing.search_store["offers"]
+        assert stats.indexed == 3
+        assert stats.completed_ranges == stats.ranges
+        assert stats.handled_ids == stats.total_ids
+        assert stats.failed_ranges == []
+        checkpoints = app.redis_client.hgetall("pcapi:full_reindexation:offers:checkpoints")
+        assert len(checkpoints) == stats.ranges
+
+    def test_reindex_collective_offers(self):
+        collective_offer = educational_factories.CollectiveStockFactory().collectiveOffer
+        template = educational_factories.CollectiveOfferTemplateFactory()
+
+        full_reindexation.reindex_all("collective_offers", processes=1)
+        full_reindexation.reindex_all("collective_offer_templates", processes=1)
+
+        assert set(search_testing.search_store["collective-offers"]) == {collective_offer.id}
+        assert set(search_testing.search_store["collective-offers-templates"]) == {template.id}
+
+    def test_nothing_to_reindex(self):
+        stats = full_reindexation.reindex_all("offers", processes=1)
+
+        assert stats.ranges == 0
+
+    def test_resume(self):
+        offers = [offers_factories.StockFactory().offer for _ in range(2)]
+        full_reindexation.reindex_all("offers", processes=1, range_size=1)
+        search_testing.reset_search_store()
+        new_offer = offers_factories.StockFactory().offer
+
+        # The previous run is complete: nothing is left to do, and
+        # its bounds are kept (the new offer is not in them).
+        stats = full_reindexation.reindex_all("offers", processes=1, resume=True)
+
+        assert search_testing.search_store["offers"] == {}
+        assert stats.ranges == offers[1].id - offers[0].id + 1
+        assert stats.completed_ranges == stats.ranges
+        assert stats.total_ids == 0
+        assert new_offer.id > offers[1].id
+
+    def test_resume_without_previous_run(self):
+        with pytest.raises(ValueError):
+            full_reindexation.reindex_all("offers", processes=1, resume=True)
+
+    def test_retry_failed_range_from_checkpoint(self):
+        offers = [offers_factories.StockFactory().offer for _ in range(2)]
+        index_batch = full_reindexation.TARGETS["offers"].index_batch
+        calls = []
+
+        def fail_on_second_batch(backend, start, end):
+            calls.append((start, end))
+            if len(calls) == 2:
+                raise ValueError("It does not work")
+            return index_batch(backend, start, end)
+
+        target = full_reindexation.Target("offers", full_reindexation.TARGETS["offers"].model, fail_on_second_batch)
+        with mock.patch.dict(full_reindexation.TARGETS, {"offers": target}):
+            with mock.patch.object(full_reindexation, "BATCH_SIZE", 1):
+                stats = full_reindexation.reindex_all("offers", processes=1, max_attempts=2)
+
+        assert set(search_testing.search_store["offers"]) == {offer.id for offer in offers}
+        # The first batch has been checkpointed: it is not handled again.
+        assert calls[0] != calls[2]
+        assert calls[1] == calls[2]
+        assert stats.retries == 1
+        # The first offer has been indexed by the failed attempt, which is
+        # not counted.
+        assert stats.indexed == 1
+        assert stats.failed_ranges == []
+
+    def test_give_up_after_max_attempts(self):
+        offer = offers_factories.StockFactory().offer
+        index_batch = mock.Mock(side_effect=ValueError("It does not work"))
+        target = full_reindexation.Target("offers", full_reindexation.TARGETS["offers"].model, index_batch)
+
+        with mock.patch.dict(full_reindexation.TARGETS, {"offers": target}):
+            with override_settings(IS_RUNNING_TESTS=False):  # as on prod: don't catch errors
+                stats = full_reindexation.reindex_all("offers", processes=1, max_attempts=3)
+
+        assert index_batch.call_count == 3
+        assert stats.retries == 2
+        assert stats.failed_ranges == [full_reindexation.IdRange(offer.id, offer.id)]
+        assert search_testing.search_store["offers"] == {}
@@ -0,0 +1,92 @@
+import multiprocessing
+from unittest import mock
+
+import pytest
+
+import pcapi.core.offers.factories as offers_factories
+from pcapi.core.search import parallel_indexation
+from pcapi.core.search.backends import algolia
+import pcapi.core.search.testing as search_testing
+from pcapi.core.testing import override_settings
+
+
+pytestmark = pytest.mark.usefixtures("db_session")
+
+
+def fail(*args, **kwargs):
+    raise ValueError("It does not work")
+
+
+class RunWorkerTest:
+    @override_settings(REDIS_OFFER_IDS_CHUNK_SIZE=2)
+    def test_index_whole_queue(self, app):
+        bookable_offers = [offers_factories.StockFactory().offer for _ in range(3)]
+        unbookable_offer = offers_factories.OfferFactory()
+        queue = algolia.REDIS_OFFER_IDS_NAME
+        app.redis_client.lpush(queue, unbookable_offer.id, *[offer.id for offer in bookable_offers])
+
+        stats = parallel_indexation.run_worker(
+            multiprocessing.Event(),
+            max_in_flight=2,
+            stop_only_when_empty=True,
+        )
+
+        assert set(search_testing.search_store["offers"]) == {offer.id for offer in bookable_offers}
+        assert app.redis_client.keys(f"{queue}*") == []
+        assert stats.batches == 2
+        assert stats.stages["pop"].count == 4
+        assert stats.stages["serialize"].count == 3
+        assert stats.stages["push"].count == 3
+        assert stats.errors == 0
+
+    @override_settings(REDIS_OFFER_IDS_CHUNK_SIZE=1)
+    def test_stop_when_asked(self, app):
+        offers = [offers_factories.StockFactory().offer for _ in range(3)]
+        queue = algolia.REDIS_OFFER_IDS_NAME
+        app.redis_client.lpush(queue, *[offer.id for offer in offers])
+        stop_event = multiprocessing.Event()
+        stop_event.set()
+
+        stats = parallel_indexation.run_worker(stop_event, stop_only_when_empty=True)
+
+        assert stats.batches == 0
+        assert app.redis_client.llen(queue) == 3
+
+    @mock.patch("pcapi.core.search.backends.testing.FakeClient.save_objects", fail)
+    def test_handle_indexation_error(self, app):
+        offer = offers_factories.StockFactory().offer
+        app.redis_client.lpush(algolia.REDIS_OFFER_IDS_NAME, offer.id)
+
+        with override_settings(IS_RUNNING_TESTS=False):  # as on prod: don't catch errors
+            stats = parallel_indexation.run_worker(multiprocessing.Event(), stop_only_when_empty=True)
+
+        assert stats.errors == 1
+        assert search_testing.search_store["offers"] == {}
+        error_queue = algolia.REDIS_OFFER_IDS_IN_ERROR_NAME
+        assert app.redis_client.lrange(error_queue, 0, -1) == [str(offer.id)]
+        assert app.redis_client.keys(f"{algolia.REDIS_OFFER_IDS_NAME}*") == []
+
+
+def test_index_offers_in_queue_in_parallel_with_one_process(app):
+    offer = offers_factories.StockFactory().offer
+    app.redis_client.lpush(algolia.REDIS_OFFER_IDS_NAME, offer.id)
+
+    stats = parallel_indexation.index_offers_in_queue_in_parallel(processes=1, stop_only_when_empty=True)
+
+    assert offer.id in search_testing.search_store["offers"]
+    assert stats.batches == 1
+
+
+def test_stats_merge():
+    stats = parallel_indexation.IndexationStats(batches=1)
+    stats.record("push", 10, 2.0)
+    other = parallel_indexation.IndexationStats(batches=2, errors=1)
+    other.record("push", 30, 2.0)
+
+    stats.merge(other)
+
+    assert stats.batches == 3
+    assert stats.errors == 1
+    assert stats.stages["push"].count == 40
+    assert stats.stages["push"].throughput == 10.0
+    assert stats.as_log_extra()["push_throughput"] == 10.0
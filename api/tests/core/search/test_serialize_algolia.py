@@ -9,9 +9,11 @@ import pcapi.core.educational.factories as educational_factories
 from pcapi.core.educational.models import StudentLevels
 import pcapi.core.offerers.factories as offerers_factories
 import pcapi.core.offerers.models as offerers_models
+from pcapi.core.offers.book_macro_sections import book_macro_sections_cache
 import pcapi.core.offers.factories as offers_factories
 import pcapi.core.offers.models as offers_models
 from pcapi.core.search.backends import algolia
+from pcapi.core.testing import assert_num_queries
 from pcapi.core.testing import override_settings
 from pcapi.routes.adage_iframe.serialization.offers import OfferAddressType
 from pcapi.utils.human_ids import humanize
@@ -147,6 +149,31 @@ def test_serialize_offer_extra_data(
     assert serialized["offer"]["bookMacroSection"] == expected_macro_section
 
 
+@override_settings(BOOK_MACRO_SECTIONS_CACHE_TTL=600)
+def test_serialize_batch_of_book_offers_does_not_query_macro_sections():
+    book_macro_sections_cache.invalidate()
+    offers = offers_factories.OfferFactory.create_batch(3, extraData={"rayon": "Policier / Thriller format poche"})
+    backend = algolia.AlgoliaBackend()
+    for offer in offers:  # load attributes of offers, and macro sections
+        backend.serialize_offer(offer, 0)
+
+    try:
+        with assert_num_queries(0):
+            serialized = [backend.serialize_offer(offer, 0) for offer in offers]
+    finally:
+        book_macro_sections_cache.invalidate()
+
+    assert {item["offer"]["bookMacroSection"] for item in serialized} == {"Policier"}
+
+
+def test_serialize_offer_with_given_book_macro_sections():
+    offer = offers_factories.OfferFactory(extraData={"rayon": "Rayon Inconnu "})
+
+    serialized = algolia.AlgoliaBackend().serialize_offer(offer, 0, {"rayon inconnu": "Macro"})
+
+    assert serialized["offer"]["bookMacroSection"] == "Macro"
+
+
 @override_settings(ALGOLIA_LAST_30_DAYS_BOOKINGS_RANGE_THRESHOLDS=[1, 2, 3, 4])
 @pytest.mark.parametrize(
     "bookings_count, expected_range",
@@ -178,9 +205,9 @@ def test_serialize_offer_event():
     dt2 = datetime.datetime(2032, 1, 1, 16, 30)
     offers_factories.EventStockFactory(offer=offer, beginningDatetime=dt2)
     serialized = algolia.AlgoliaBackend().serialize_offer(offer, 0)
-    # Dates are ordered, but times are not. I don't know why we order dates.
     assert serialized["offer"]["dates"] == [dt2.timestamp(), dt1.timestamp()]
-    assert set(serialized["offer"]["times"]) == {12 * 60 * 60 + 15 * 60, 16 * 60 * 60 + 30 * 60}
+    # Times are ordered too, so that the document hash is stable.
+    assert serialized["offer"]["times"] == [12 * 60 * 60 + 15 * 60, 16 * 60 * 60 + 30 * 60]
 
 
 @pytest.mark.parametrize(
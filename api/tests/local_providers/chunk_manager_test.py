@@ -3,8 +3,11 @@ import pytest
 import pcapi.core.offerers.factories as offerers_factories
 import pcapi.core.offers.factories as offers_factories
 from pcapi.core.offers.models import Offer
+from pcapi.core.offers.models import Product
 from pcapi.core.offers.models import Stock
+from pcapi.local_providers.chunk_manager import prefetch_existing_objects
 from pcapi.local_providers.chunk_manager import save_chunks
+from pcapi.local_providers.providable_info import ProvidableInfo
 from pcapi.models import db
 
 
@@ -98,3 +101,91 @@ def test_save_chunks_update_2_offers_and_1_stock_in_chunk():
     assert all(offer.isDuo for offer in offers)
     stock = Stock.query.one()
     assert stock.quantity == 2
+
+
+def test_prefetch_existing_objects():
+    product = offers_factories.ProductFactory(idAtProviders="1")
+    offers_factories.OfferFactory(idAtProvider="1")
+    offers_factories.OfferFactory(idAtProvider="1")
+    stock = offers_factories.StockFactory(idAtProviders="1")
+    providable_infos = [
+        ProvidableInfo(type=Product, id_at_providers="1"),
+        ProvidableInfo(type=Product, id_at_providers="2"),
+        ProvidableInfo(type=Offer, id_at_providers="1"),
+        ProvidableInfo(type=Stock, id_at_providers="1"),
+    ]
+
+    prefetched_objects = prefetch_existing_objects(providable_infos)
+
+    # Offers with the same `idAtProvider` are ambiguous: they are left
+    # out and will be looked up one by one.
+    assert prefetched_objects == {
+        "1|Product": product,
+        "2|Product": None,
+        "1|Stock": stock,
+    }
+
+
+def test_save_chunks_with_bulk_upsert():
+    existing_product = offers_factories.ProductFactory(idAtProviders="1", name="Old name")
+    venue = offerers_factories.VenueFactory()
+    db.session.refresh(existing_product)
+    existing_product.name = "New name"
+    new_product = Product(idAtProviders="2", name="New product", subcategoryId=existing_product.subcategoryId)
+    offer = Offer(
+        idAtProvider="2",
+        name="New product",
+        product=new_product,
+        venue=venue,
+        venueId=venue.id,
+        subcategoryId=existing_product.subcategoryId,
+    )
+    stock = Stock(idAtProviders="2", offer=offer, price=10)
+
+    save_chunks(
+        chunk_to_insert={"2|Product": new_product, "2|Offer": offer, "2|Stock": stock},
+        chunk_to_update={"1|Product": existing_product},
+        bulk_upsert=True,
+    )
+
+    assert Product.query.get(existing_product.id).name == "New name"
+    assert Product.query.get(new_product.id).name == "New product"
+    assert Offer.query.get(offer.id).productId == new_product.id
+    assert stock.offerId == offer.id
+    assert Stock.query.get(stock.id).price == 10
+
+
+def test_save_chunks_with_bulk_upsert_falls_back_on_orm():
+    venue = offerers_factories.VenueFactory()
+    product = offers_factories.ProductFactory()
+    # The product is not saved and not in the chunk: the offer cannot
+    # be upserted without it.
+    offer = Offer(
+        idAtProvider="1",
+        name="New offer",
+        product=Product(name="Unsaved product", subcategoryId=product.subcategoryId),
+        venueId=venue.id,
+        subcategoryId=product.subcategoryId,
+    )
+
+    save_chunks(chunk_to_insert={"1|Offer": offer}, chunk_to_update={}, bulk_upsert=True)
+
+    assert Offer.query.one().product.name == "Unsaved product"
+
+
+def test_save_chunks_with_bulk_upsert_references_object_of_previous_chunk():
+    venue = offerers_factories.VenueFactory()
+    product = offers_factories.ProductFactory()
+    # Providers keep the last offer to attach stocks of the next chunk.
+    offer = Offer(idAtProvider="1", name="New offer", venue=venue, subcategoryId=product.subcategoryId)
+    save_chunks(chunk_to_insert={"1|Offer": offer}, chunk_to_update={}, bulk_upsert=True)
+    date_updated = offer.dateUpdated
+    offer.name = "Updated offer"
+    stock = Stock(idAtProviders="1", offer=offer, price=10)
+
+    save_chunks(chunk_to_insert={"1|Stock": stock}, chunk_to_update={"1|Offer": offer}, bulk_upsert=True)
+
+    saved_offer = Offer.query.one()
+    assert saved_offer.name == "Updated offer"
+    assert saved_offer.dateUpdated > date_updated
+    assert Stock.query.one().offerId == saved_offer.id
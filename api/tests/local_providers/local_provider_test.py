@@ -8,6 +8,7 @@ import pcapi.core.offers.factories as offers_factories
 import pcapi.core.offers.models as offers_models
 import pcapi.core.providers.factories as providers_factories
 import pcapi.core.providers.models as providers_models
+from pcapi.core.testing import override_settings
 from pcapi.local_providers.local_provider import _upload_thumb
 from pcapi.local_providers.providable_info import ProvidableInfo
 from pcapi.models.api_errors import ApiErrors
@@ -171,6 +172,55 @@ class UpdateObjectsTest:
         assert new_product.name == "New Product"
         assert new_product.subcategoryId == subcategories.LIVRE_PAPIER.id
 
+    @patch("pcapi.local_providers.chunk_manager.get_existing_object")
+    @patch("tests.local_providers.provider_test_utils.TestLocalProvider.peek_upcoming_providable_infos")
+    @patch("tests.local_providers.provider_test_utils.TestLocalProvider.__next__")
+    def test_looks_up_upcoming_objects_in_bulk(self, next_function, peek_function, get_existing_object):
+        # Given
+        provider = providers_factories.AllocineProviderFactory(localClass="TestLocalProvider")
+        providable_infos = [
+            ProvidableInfo(id_at_providers=str(i), date_modified_at_provider=datetime(2018, 1, 1)) for i in range(3)
+        ]
+        offers_factories.ThingProductFactory(
+            dateModifiedAtLastProvider=datetime(2000, 1, 1),
+            lastProvider=provider,
+            idAtProviders="1",
+            name="Old product name",
+        )
+        local_provider = provider_test_utils.TestLocalProvider()
+        next_function.side_effect = [[providable_info] for providable_info in providable_infos]
+        peek_function.side_effect = [providable_infos[1:], [], []]
+
+        # When
+        local_provider.updateObjects()
+
+        # Then
+        get_existing_object.assert_not_called()
+        assert peek_function.call_count == 1
+        products = offers_models.Product.query.order_by(offers_models.Product.idAtProviders).all()
+        assert [product.idAtProviders for product in products] == ["0", "1", "2"]
+        assert {product.name for product in products} == {"New Product"}
+        assert local_provider.createdObjects == 2
+        assert local_provider.updatedObjects == 1
+
+    @override_settings(PROVIDERS_WITH_BULK_UPSERT=["TestLocalProvider"])
+    @patch("pcapi.local_providers.chunk_manager.insert_chunk")
+    @patch("tests.local_providers.provider_test_utils.TestLocalProvider.__next__")
+    def test_saves_objects_with_bulk_upsert(self, next_function, insert_chunk):
+        # Given
+        providers_factories.AllocineProviderFactory(localClass="TestLocalProvider")
+        local_provider = provider_test_utils.TestLocalProvider()
+        next_function.side_effect = [[ProvidableInfo(id_at_providers="1")], [ProvidableInfo(id_at_providers="2")]]
+
+        # When
+        local_provider.updateObjects()
+
+        # Then
+        insert_chunk.assert_not_called()
+        products = offers_models.Product.query.order_by(offers_models.Product.idAtProviders).all()
+        assert [product.idAtProviders for product in products] == ["1", "2"]
+        assert {product.lastProviderId for product in products} == {local_provider.provider.id}
+
 
 @pytest.mark.usefixtures("db_session")
 class CreateObjectTest:
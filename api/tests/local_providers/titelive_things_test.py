@@ -143,6 +143,27 @@ class TiteliveThingsTest:
         assert product.extraData.get("rayon") == closest_csr.get("label")
         assert product.extraData.get("code_clil") == CODE_CLIL_TEST
 
+    @pytest.mark.usefixtures("db_session")
+    @patch("pcapi.local_providers.chunk_manager.get_existing_object")
+    @patch("pcapi.local_providers.titelive_things.titelive_things.get_files_to_process_from_titelive_ftp")
+    @patch("pcapi.local_providers.titelive_things.titelive_things.get_lines_from_thing_file")
+    def test_look_up_existing_products_in_bulk(
+        self, get_lines_from_thing_file, get_files_to_process_from_titelive_ftp, get_existing_object, app
+    ):
+        get_files_to_process_from_titelive_ftp.return_value = ["Quotidien30.tit"]
+        eans = ["9782809455069", "9782809455070", "9782809455071"]
+        data_lines = ["~".join([ean] + BASE_DATA_LINE_PARTS[1:]) for ean in eans]
+        get_lines_from_thing_file.return_value = iter(data_lines)
+        ThingProductFactory(idAtProviders=eans[1], name="Old name")
+        providers_factories.TiteLiveThingsProviderFactory()
+
+        run_titelive_things()
+
+        get_existing_object.assert_not_called()
+        products = offers_models.Product.query.order_by(offers_models.Product.idAtProviders).all()
+        assert [product.idAtProviders for product in products] == eans
+        assert {product.name for product in products} == {EAN_TEST_TITLE}
+
     @pytest.mark.usefixtures("db_session")
     @patch("pcapi.local_providers.titelive_things.titelive_things.get_files_to_process_from_titelive_ftp")
     @patch("pcapi.local_providers.titelive_things.titelive_things.get_lines_from_thing_file")
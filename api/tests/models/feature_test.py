@@ -1,15 +1,22 @@
 import enum
+import os
+import threading
 from unittest.mock import patch
 
 import flask
+import freezegun
 import pytest
 
 from pcapi.core.testing import assert_num_queries
+from pcapi.core.testing import override_settings
 from pcapi.models import db
 from pcapi.models.feature import FEATURES_DISABLED_BY_DEFAULT
+from pcapi.models.feature import FEATURE_CACHE_INVALIDATION_CHANNEL
 from pcapi.models.feature import Feature
+from pcapi.models.feature import FeatureCache
 from pcapi.models.feature import FeatureToggle
 from pcapi.models.feature import install_feature_flags
+from pcapi.models.feature import invalidate_feature_cache
 from pcapi.repository import repository
 
 
@@ -57,7 +64,7 @@ class FeatureToggleTest:
         repository.save(feature)
         context = flask._request_ctx_stack.pop()
 
-        # we don't cache yet outside the scope of a request so it'll be 3 DB queries
+        # the process-wide cache is disabled in tests so it'll be 3 DB queries
         try:
             with assert_num_queries(3):
                 FeatureToggle.SYNCHRONIZE_ALLOCINE.is_active()
@@ -74,6 +81,107 @@ class FeatureToggleTest:
             FeatureToggle.ALGOLIA_BOOKINGS_NUMBER_COMPUTATION.is_active()
 
 
+@pytest.mark.usefixtures("db_session")
+@override_settings(FEATURE_FLAGS_CACHE_TTL=60)
+@patch("pcapi.models.feature.FeatureCache._ensure_listener")
+class FeatureCacheTest:
+    def test_cache_expires(self, _mocked_ensure_listener):
+        cache = FeatureCache()
+
+        with freezegun.freeze_time() as frozen_time:
+            with assert_num_queries(1):
+                assert cache.get()["SYNCHRONIZE_ALLOCINE"]
+                cache.get()
+            frozen_time.tick(59)
+            with assert_num_queries(0):
+                cache.get()
+            frozen_time.tick(2)
+            with assert_num_queries(1):
+                cache.get()
+
+    def test_invalidate(self, _mocked_ensure_listener):
+        cache = FeatureCache()
+        cache.get()
+
+        cache.invalidate()
+
+        with assert_num_queries(1):
+            cache.get()
+
+    def test_get_snapshot(self, _mocked_ensure_listener):
+        cache = FeatureCache()
+        with assert_num_queries(1):
+            assert cache.get_snapshot()["SYNCHRONIZE_ALLOCINE"]
+
+        cache.invalidate()
+
+        with patch.object(cache, "_refresh_in_background") as mocked_refresh:
+            with assert_num_queries(0):
+                assert cache.get_snapshot()["SYNCHRONIZE_ALLOCINE"]
+        mocked_refresh.assert_called_once()
+
+    def test_get_snapshot_starts_one_refresh_at_a_time(self, _mocked_ensure_listener):
+        cache = FeatureCache()
+        cache.get_snapshot()
+        cache.invalidate()
+        refresh_can_finish = threading.Event()
+
+        with patch.object(cache, "_refresh", side_effect=lambda app: refresh_can_finish.wait(5)) as mocked_refresh:
+            cache.get_snapshot()
+            cache.get_snapshot()
+            refresh_can_finish.set()
+            cache._refresh_thread.join()
+
+        mocked_refresh.assert_called_once()
+
+    def test_is_active_outside_request_context(self, _mocked_ensure_listener, app):
+        context = flask._request_ctx_stack.pop()
+        try:
+            with patch("pcapi.models.feature.feature_cache", FeatureCache()):
+                with assert_num_queries(1):
+                    FeatureToggle.SYNCHRONIZE_ALLOCINE.is_active()
+                    FeatureToggle.SYNCHRONIZE_ALLOCINE.is_active()
+                    FeatureToggle.DISABLE_CGR_EXTERNAL_BOOKINGS.is_active()
+        finally:
+            flask._request_ctx_stack.push(context)
+
+    def test_publish_invalidation(self, _mocked_ensure_listener, app):
+        pubsub = app.redis_client.pubsub(ignore_subscribe_messages=True)
+        pubsub.subscribe(FEATURE_CACHE_INVALIDATION_CHANNEL)
+        pubsub.get_message(timeout=1)  # subscription confirmation
+
+        invalidate_feature_cache()
+
+        assert pubsub.get_message(timeout=1)["channel"] == FEATURE_CACHE_INVALIDATION_CHANNEL
+        pubsub.close()
+
+
+@pytest.mark.usefixtures("db_session")
+@override_settings(FEATURE_FLAGS_CACHE_TTL=60)
+@patch("pcapi.models.feature.threading.Thread")
+class FeatureCacheListenerTest:
+    def test_restart_listener_in_forked_processes(self, mocked_thread):
+        cache = FeatureCache()
+        cache.get()
+
+        with patch("pcapi.models.feature.os.getpid", return_value=os.getpid() + 1):
+            with assert_num_queries(1):
+                cache.get()
+
+        assert mocked_thread.call_count == 2
+
+    def test_keep_inherited_flags_in_forked_processes(self, mocked_thread):
+        cache = FeatureCache()
+        cache.disable_listener_in_forked_processes()
+        cache.get()
+
+        with patch("pcapi.models.feature.os.getpid", return_value=os.getpid() + 1):
+            with assert_num_queries(0):
+                assert cache.get()["SYNCHRONIZE_ALLOCINE"]
+
+        mocked_thread.assert_called_once()
+
+
 @pytest.mark.usefixtures("db_session")
 class FeatureTest:
     def test_features_installation(self):
@@ -7,19 +7,23 @@ from freezegun import freeze_time
 import pytest
 
 from pcapi import settings
+from pcapi.core import search
 from pcapi.core.bookings.factories import BookingFactory
 from pcapi.core.categories import subcategories_v2 as subcategories
 import pcapi.core.mails.testing as mails_testing
 import pcapi.core.offers.factories as offers_factories
+from pcapi.core.offers.models import Offer
 from pcapi.core.offers.models import OfferReport
 import pcapi.core.providers.factories as providers_factories
 from pcapi.core.providers.repository import get_provider_by_local_class
 from pcapi.core.testing import assert_no_duplicated_queries
 from pcapi.core.testing import assert_num_queries
 from pcapi.core.testing import override_features
+from pcapi.core.testing import override_settings
 from pcapi.core.users import factories as users_factories
 from pcapi.core.users.factories import UserFactory
 import pcapi.local_providers.cinema_providers.constants as cinema_providers_constants
+from pcapi.models import db
 from pcapi.models.offer_mixin import OfferValidationStatus
 import pcapi.notifications.push.testing as notifications_testing
 
@@ -241,6 +245,24 @@ class OffersTest:
         assert response.status_code == 200
         assert response.json["stocks"][0]["remainingQuantity"] is None
 
+    @override_settings(NATIVE_OFFER_RESPONSE_CACHE_TTL=10)
+    def test_get_offer_from_cache(self, client):
+        offer = offers_factories.ThingStockFactory(offer__name="Old name").offer
+        offer_id = offer.id
+
+        response = client.get(f"/native/v1/offer/{offer_id}")
+        assert response.json["name"] == "Old name"
+
+        Offer.query.filter_by(id=offer_id).update({"name": "New name"})
+        db.session.commit()
+        response = client.get(f"/native/v1/offer/{offer_id}")
+        assert response.status_code == 200
+        assert response.json["name"] == "Old name"
+
+        search.async_index_offer_ids([offer_id], reason=search.IndexationReason.OFFER_UPDATE)
+        response = client.get(f"/native/v1/offer/{offer_id}")
+        assert response.json["name"] == "New name"
+
     def test_get_thing_offer(self, client):
         product = offers_factories.ProductFactory(thumbCount=1, subcategoryId=subcategories.CARTE_MUSEE.id)
         offer = offers_factories.OfferFactory(
@@ -360,6 +382,37 @@ class OffersTest:
         assert stock.remainingQuantity == 0
         assert response.json["stocks"][0]["isSoldOut"]
 
+    @override_settings(NATIVE_OFFER_RESPONSE_CACHE_TTL=10)
+    @override_features(ENABLE_CDS_IMPLEMENTATION=True)
+    @patch("pcapi.core.offers.api.external_bookings_api.get_shows_stock")
+    def test_get_cds_sync_offer_from_cache(self, mocked_get_shows_stock, client):
+        mocked_get_shows_stock.return_value = {5008: 10}
+        cds_provider = get_provider_by_local_class("CDSStocks")
+        venue_provider = providers_factories.VenueProviderFactory(provider=cds_provider)
+        cinema_provider_pivot = providers_factories.CinemaProviderPivotFactory(
+            venue=venue_provider.venue,
+            provider=venue_provider.provider,
+            idAtProvider=venue_provider.venueIdAtOfferProvider,
+        )
+        providers_factories.CDSCinemaDetailsFactory(cinemaProviderPivot=cinema_provider_pivot)
+        offer_id_at_provider = f"54%{venue_provider.venue.siret}"
+        offer = offers_factories.OfferFactory(
+            subcategoryId=subcategories.SEANCE_CINE.id,
+            idAtProvider=offer_id_at_provider,
+            lastProviderId=venue_provider.providerId,
+            venue=venue_provider.venue,
+        )
+        offers_factories.EventStockFactory(offer=offer, idAtProviders=f"{offer_id_at_provider}#5008/2022-12-03")
+        offer_id = offer.id
+
+        client.get(f"/native/v1/offer/{offer_id}")
+        response = client.get(f"/native/v1/offer/{offer_id}")
+
+        assert response.status_code == 200
+        # The second response comes from the cache: the cinema provider
+        # has been called only once.
+        assert mocked_get_shows_stock.call_count == 1
+
     @freeze_time("2023-01-01")
     @override_features(ENABLE_BOOST_API_INTEGRATION=True)
     @patch("pcapi.connectors.boost.requests.get")
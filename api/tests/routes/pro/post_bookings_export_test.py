@@ -0,0 +1,134 @@
+import csv
+from datetime import datetime
+from io import BytesIO
+from io import StringIO
+import re
+
+import openpyxl
+import pytest
+
+from pcapi import settings
+import pcapi.core.bookings.factories as bookings_factories
+from pcapi.core.educational import factories as educational_factories
+from pcapi.core.mails import testing as mails_testing
+import pcapi.core.offerers.factories as offerers_factories
+from pcapi.core.testing import override_settings
+
+
+pytestmark = pytest.mark.usefixtures("db_session")
+
+BOOKING_PERIOD_PARAMS = "bookingPeriodBeginningDate=2020-08-10&bookingPeriodEndingDate=2020-08-12"
+
+
+@pytest.fixture(name="exports_dir", autouse=True)
+def exports_dir_fixture(tmp_path):
+    with override_settings(LOCAL_PRIVATE_STORAGE_DIR=tmp_path):
+        yield tmp_path / "bookings_exports"
+
+
+def _get_export_path():
+    html_content = mails_testing.outbox[-1].sent_data["html_content"]
+    return re.search(rf'href="{re.escape(settings.API_URL)}(/bookings/exports/[^"]+)"', html_content).group(1)
+
+
+class PrepareBookingsExportTest:
+    def test_csv_export(self, client, exports_dir):
+        booking = bookings_factories.BookingFactory(dateCreated=datetime(2020, 8, 11, 12, 0, 0))
+        pro = offerers_factories.UserOffererFactory(offerer=booking.offerer).user
+        client = client.with_session_auth(pro.email)
+
+        response = client.post(f"/bookings/export?{BOOKING_PERIOD_PARAMS}")
+
+        assert response.status_code == 202
+        # Exports are not stored in the public object storage.
+        [stored_path] = [path for path in exports_dir.rglob("*") if path.is_file()]
+        assert stored_path.relative_to(exports_dir).parts[0] == str(pro.id)
+        assert len(mails_testing.outbox) == 1
+        assert mails_testing.outbox[0].sent_data["To"] == pro.email
+
+        export_path = _get_export_path()
+        assert export_path.endswith("/reservations_pass_culture.csv")
+        response = client.get(export_path)
+        assert response.status_code == 200
+        assert response.headers["Content-Type"] == "text/csv; charset=utf-8"
+        assert "attachment; filename=reservations_pass_culture.csv" in response.headers["Content-Disposition"]
+        headers, *rows = csv.reader(StringIO(response.data.decode("utf-8-sig")), delimiter=";")
+        assert len(rows) == 1
+        assert rows[0][headers.index("Contremarque")] == booking.token
+
+    def test_excel_export(self, client):
+        booking = bookings_factories.BookingFactory(dateCreated=datetime(2020, 8, 11, 12, 0, 0))
+        pro = offerers_factories.UserOffererFactory(offerer=booking.offerer).user
+        client = client.with_session_auth(pro.email)
+
+        response = client.post(f"/bookings/export?{BOOKING_PERIOD_PARAMS}&exportType=excel")
+
+        assert response.status_code == 202
+        export_path = _get_export_path()
+        assert export_path.endswith("/reservations_pass_culture.xlsx")
+        response = client.get(export_path)
+        assert response.headers["Content-Type"] == ("application/vnd.openxmlformats-officedocument.spreadsheetml.sheet")
+        sheet = openpyxl.load_workbook(BytesIO(response.data)).active
+        assert sheet.cell(row=2, column=10).value == booking.token
+        assert sheet.cell(row=3, column=1).value is None
+
+    def test_collective_csv_export(self, client):
+        booking = educational_factories.CollectiveBookingFactory(dateCreated=datetime(2020, 8, 11, 12, 0, 0))
+        pro = offerers_factories.UserOffererFactory(offerer=booking.offerer).user
+        client = client.with_session_auth(pro.email)
+
+        response = client.post(f"/collective/bookings/export?{BOOKING_PERIOD_PARAMS}")
+
+        assert response.status_code == 202
+        assert len(mails_testing.outbox) == 1
+        assert mails_testing.outbox[0].sent_data["To"] == pro.email
+        export_path = _get_export_path()
+        assert export_path.endswith("/reservations_eac_pass_culture.csv")
+        response = client.get(export_path)
+        reader = csv.DictReader(StringIO(response.data.decode("utf-8-sig")), delimiter=";")
+        assert [row["Lieu"] for row in reader] == [booking.venue.name]
+
+    def test_no_access_to_other_offerers_bookings(self, client):
+        bookings_factories.BookingFactory(dateCreated=datetime(2020, 8, 11, 12, 0, 0))
+        pro = offerers_factories.UserOffererFactory().user
+        client = client.with_session_auth(pro.email)
+
+        response = client.post(f"/bookings/export?{BOOKING_PERIOD_PARAMS}")
+
+        assert response.status_code == 202
+        response = client.get(_get_export_path())
+        headers, *rows = csv.reader(StringIO(response.data.decode("utf-8-sig")), delimiter=";")
+        assert rows == []
+
+
+class GetBookingsExportTest:
+    def test_only_owner_can_download_export(self, client):
+        booking = bookings_factories.BookingFactory(dateCreated=datetime(2020, 8, 11, 12, 0, 0))
+        pro = offerers_factories.UserOffererFactory(offerer=booking.offerer).user
+        other_pro = offerers_factories.UserOffererFactory(offerer=booking.offerer).user
+        client.with_session_auth(pro.email).post(f"/bookings/export?{BOOKING_PERIOD_PARAMS}")
+        export_path = _get_export_path()
+
+        response = client.with_session_auth(other_pro.email).get(export_path)
+
+        assert response.status_code == 404
+
+    def test_anonymous(self, client):
+        response = client.get("/bookings/exports/token/reservations_pass_culture.csv")
+
+        assert response.status_code == 401
+
+    @pytest.mark.parametrize(
+        "path",
+        [
+            "/bookings/exports/unknown/reservations_pass_culture.csv",
+            "/bookings/exports/unknown/reservations_pass_culture.exe",
+            "/bookings/exports/..token/reservations_pass_culture.csv",
+        ],
+    )
+    def test_not_found(self, client, path):
+        pro = offerers_factories.UserOffererFactory().user
+
+        response = client.with_session_auth(pro.email).get(path)
+
+        assert response.status_code == 404
@@ -1,6 +1,11 @@
+import collections
+import importlib
+
 import flask
 
+from pcapi.scripts.install import _get_command_module_paths
 from pcapi.scripts.install import install_commands
+from pcapi.scripts.install import install_commands_lazily
 
 
 def test_install():
@@ -10,3 +15,26 @@ def test_install():
     # function does not fail and that at least one blueprint is
     # registered.
     assert "pcapi_utils_human_ids" in app.blueprints
+
+
+def test_install_lazily():
+    app = flask.Flask(__name__)
+    install_commands_lazily(app)
+    assert "pcapi_utils_human_ids" not in app.blueprints
+
+    assert app.cli.get_command(None, "worker").name == "worker"
+    assert set(app.blueprints) == {"pcapi_workers_worker"}
+
+    assert "humanize" in app.cli.list_commands(None)
+    assert "pcapi_utils_human_ids" in app.blueprints
+
+
+def test_command_names_are_unique():
+    # Commands are looked up module after module: a command that is
+    # defined in two modules would depend on the order of modules.
+    modules_by_command = collections.defaultdict(list)
+    for path in _get_command_module_paths():
+        for name in importlib.import_module(path).blueprint.cli.commands:
+            modules_by_command[name].append(path)
+
+    assert {name: paths for name, paths in modules_by_command.items() if len(paths) > 1} == {}
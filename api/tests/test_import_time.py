@@ -0,0 +1,71 @@
+import json
+import subprocess
+import sys
+
+import pytest
+
+
+# Each entry point is imported in a new process, with the code below.
+ENTRY_POINTS = {
+    "api": "import pcapi.app",
+    "backoffice": "import pcapi.backoffice_app",
+    # `flask worker` looks up the command in the application of `.flaskenv`.
+    "worker": "from pcapi.flask_app import app; app.cli.get_command(None, 'worker')",
+}
+
+# These budgets (in seconds) are meant to catch big regressions (e.g.
+# a large module that is imported on startup), not small variations.
+IMPORT_TIME_BUDGETS = {
+    "api": 15,
+    "backoffice": 15,
+    "worker": 10,
+}
+
+# Modules that are only needed by some CLI commands (or on first use)
+# and must not be imported on startup.
+MODULES_NOT_IMPORTED_ON_STARTUP = (
+    "pcapi.core.finance.commands",
+    "pcapi.core.providers.titelive_gtl",
+    "pcapi.scripts.sandbox",
+)
+
+# Modules that are imported on first use (e.g. by RQ jobs run by
+# `flask worker`), once commands are installed lazily: they must not
+# depend on the order in which modules have been imported on startup.
+MODULES_IMPORTED_ON_FIRST_USE = (
+    "pcapi.core.external.attributes.api",
+    "pcapi.core.external.sendinblue",
+    "pcapi.core.finance.api",
+    "pcapi.core.mails.transactional",
+    "pcapi.core.offerers.api",
+    "pcapi.core.search.backends.algolia",
+    "pcapi.tasks.mails_tasks",
+    "pcapi.tasks.sendinblue_tasks",
+)
+
+
+def _import_entry_point(code):
+    script = "\n".join(
+        (
+            "import json, sys, time",
+            "start = time.perf_counter()",
+            code,
+            "duration = time.perf_counter() - start",
+            "print(json.dumps({'duration': duration, 'modules': sorted(sys.modules)}))",
+        )
+    )
+    result = subprocess.run([sys.executable, "-c", script], capture_output=True, check=True, text=True)
+    return json.loads(result.stdout.splitlines()[-1])
+
+
+@pytest.mark.parametrize("entry_point", ENTRY_POINTS)
+def test_import_time(entry_point):
+    result = _import_entry_point(ENTRY_POINTS[entry_point])
+
+    assert result["duration"] < IMPORT_TIME_BUDGETS[entry_point]
+    assert not set(MODULES_NOT_IMPORTED_ON_STARTUP) & set(result["modules"])
+
+
+@pytest.mark.parametrize("module", MODULES_IMPORTED_ON_FIRST_USE)
+def test_import_on_first_use(module):
+    _import_entry_point(f"from pcapi.flask_app import app; import {module}")
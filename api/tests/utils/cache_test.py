@@ -1,4 +1,7 @@
 from unittest.mock import MagicMock
+from unittest.mock import patch
+
+from flask import current_app
 
 from pcapi.routes.serialization import BaseModel
 from pcapi.utils.cache import _CacheProxy
@@ -172,3 +175,37 @@ class GetFromCacheTest:
         assert result1 != result2
         assert result2 == "pouet2"
         retriever.assert_called_once()
+
+    def test_wait_for_concurrent_call(self):
+        redis_client = current_app.redis_client
+        redis_client.set("test_wait_for_concurrent_call:lock", "1")
+        retriever = MagicMock(return_value="pouet2")
+
+        # Simulate another process that stores data while we wait.
+        with patch("time.sleep", lambda _: redis_client.set("test_wait_for_concurrent_call", "pouet")):
+            result = get_from_cache(key_template="test_wait_for_concurrent_call", retriever=retriever, lock_timeout=5)
+
+        assert result == "pouet"
+        retriever.assert_not_called()
+
+    def test_retrieve_if_concurrent_call_failed(self):
+        redis_client = current_app.redis_client
+        redis_client.set("test_retrieve_if_concurrent_call_failed:lock", "1")
+        retriever = MagicMock(return_value="pouet")
+
+        # Simulate another process that fails and releases its lock.
+        with patch("time.sleep", lambda _: redis_client.delete("test_retrieve_if_concurrent_call_failed:lock")):
+            result = get_from_cache(
+                key_template="test_retrieve_if_concurrent_call_failed", retriever=retriever, lock_timeout=5
+            )
+
+        assert result == "pouet"
+        retriever.assert_called_once()
+
+    def test_release_lock(self):
+        retriever = MagicMock(return_value="pouet")
+
+        result = get_from_cache(key_template="test_release_lock", retriever=retriever, lock_timeout=5)
+
+        assert result == "pouet"
+        assert not current_app.redis_client.exists("test_release_lock:lock")
@@ -1,6 +1,7 @@
 import pytest
 
 from pcapi.utils.custom_logic import OPERATIONS
+from pcapi.utils.custom_logic import compile_operation
 
 
 def test_soft_equal_return_true():
@@ -234,3 +235,24 @@ def test_not_in_with_none_as_argument_return_false():
     b = ["le", "dérèglement", "climatique", None]
     result = OPERATIONS["not in"](a, b)
     assert not result
+
+
+@pytest.mark.parametrize(
+    "operator,a,b",
+    [
+        ("==", "Été", "ete"),
+        (">", 12, 10),
+        ("in", "Théâtre", ["theatre", "cinema"]),
+        ("in", "musique", ["theatre", "cinema"]),
+        ("not in", "Théâtre", ["theatre", "cinema"]),
+        ("contains", "Une offre INTERDITE", ["interdit"]),
+        ("contains", None, ["interdit"]),
+        ("contains-exact", "Une offre interdite", ["interdit"]),
+        ("contains-exact", "Une offre interdit", ["interdit"]),
+        ("intersects", ["Théâtre", "danse"], ["theatre"]),
+        ("intersects", ["Théâtre"], []),
+        ("not intersects", ["danse"], ["theatre"]),
+    ],
+)
+def test_compile_operation(operator, a, b):
+    assert compile_operation(operator, b)(a) is OPERATIONS[operator](a, b)
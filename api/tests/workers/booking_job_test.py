@@ -0,0 +1,55 @@
+import logging
+from unittest import mock
+
+import pytest
+
+from pcapi.core.bookings import api as bookings_api
+import pcapi.core.bookings.factories as bookings_factories
+import pcapi.core.mails.testing as mails_testing
+from pcapi.workers.booking_job import run_book_offer_side_effects_job
+
+
+pytestmark = pytest.mark.usefixtures("db_session")
+
+
+def test_run_all_side_effects():
+    booking = bookings_factories.BookingFactory(stock__offer__bookingEmail="offerer@example.com")
+
+    run_book_offer_side_effects_job(booking.id, bookings_api.BOOK_OFFER_SIDE_EFFECTS, False)
+
+    assert {mail.sent_data["To"] for mail in mails_testing.outbox} == {"offerer@example.com", booking.user.email}
+
+
+@mock.patch("pcapi.core.bookings.api.update_external_pro")
+def test_retry_failed_side_effects_only(mocked_update_external_pro):
+    booking = bookings_factories.BookingFactory(stock__offer__bookingEmail="offerer@example.com")
+    mocked_update_external_pro.side_effect = [ConnectionError(), None]
+
+    run_book_offer_side_effects_job(booking.id, bookings_api.BOOK_OFFER_SIDE_EFFECTS, False)
+
+    assert mocked_update_external_pro.call_count == 2
+    assert len(mails_testing.outbox) == 2
+
+
+@mock.patch("pcapi.core.bookings.api.update_external_pro", side_effect=ConnectionError())
+def test_give_up_after_max_attempts(mocked_update_external_pro, caplog):
+    booking = bookings_factories.BookingFactory()
+
+    with caplog.at_level(logging.ERROR):
+        run_book_offer_side_effects_job(booking.id, ["external_pro"], False)
+
+    assert mocked_update_external_pro.call_count == 3
+    assert caplog.records[-1].message == "Giving up side effects of new booking"
+    assert caplog.records[-1].extra["side_effects"] == ["external_pro"]
+
+
+@mock.patch("pcapi.core.bookings.api.update_external_pro", side_effect=ConnectionError())
+def test_retry_in_low_queue(mocked_update_external_pro):
+    booking = bookings_factories.BookingFactory()
+
+    with mock.patch("pcapi.workers.worker.low_queue.enqueue") as mocked_enqueue:
+        run_book_offer_side_effects_job(booking.id, bookings_api.BOOK_OFFER_SIDE_EFFECTS, False)
+
+    mocked_enqueue.assert_called_once()
+    assert mocked_enqueue.call_args.args[1:] == (booking.id, ["external_pro"], False)
+    assert mocked_enqueue.call_args.kwargs == {"attempt": 2}